@@ -13,15 +13,49 @@ Version:
 
 Classes:
     Dobot: A class for controlling the Dobot robot arms using TCP/IP communication.
+    IOBatch: A class for sending several IO commands of the Dobot robot arm together.
     FlexGripper: A class for controlling the FlexGripper attached to the Dobot robot arm.
     ServoGripper: A class for controlling the ServoGripper attached to the Dobot robot arm.
+    ModbusPlanner: A class for reading declared Modbus registers with merged requests and a cache.
+    ModbusPoller: A class for polling Modbus registers at independent rates in the background.
+    RegisterMap: A class for reading and writing named bus registers in one exchange.
+    Tray: A class for computing all points of a tray locally.
+    MotionModel: A class modelling motion times with trapezoidal velocity profiles.
+    SequenceOptimizer: A class ordering points to minimize the total travel time.
+    CycleTimeEstimator: A class estimating the execution time of motion commands.
+    BlendOptimizer: A class choosing blend radii of motion sequences within a path tolerance.
     Feedback: A class for getting feedback from the Dobot robot arm.
+    FeedbackDecoder: A class for splitting the feedback stream into validated frames.
+    FeedbackFrame: A class for lazily decoding the fields of a raw feedback frame.
+    FeedbackEvent: A class describing a triggered feedback subscription.
+    FeedbackSubscription: A class for edge-triggered subscriptions on feedback fields.
+    FeedbackRecorder: A class for recording raw feedback frames to a memory-mapped file.
+    FeedbackReplay: A class for replaying recorded feedback frames through the Feedback interface.
+    FeedbackStatistics: A class for incremental rolling statistics over feedback fields.
+    FeedbackExporter: A class for exporting feedback history to chunked, compressed columnar files.
+    FeedbackPublisher: A class for publishing the latest feedback frame to shared memory.
+    SharedFeedback: A class for reading the latest feedback frame from shared memory in other processes.
+    RingBuffer: A class for a fixed-size NumPy ring buffer of signal samples.
+    FeedbackDerivatives: A class for derived kinematic signals (accelerations, jerk, tracking errors) from feedback.
+    DragRecorder: A class recording drag-taught paths and compressing them into motion programs.
+    TraceFile: A class for building, checking and previewing trajectory files for StartPath.
 '''
 
+import asyncio
+import bisect
+import json
+import mmap
+import os
 import socket
 import struct
+import threading
 import time
+import zipfile
+from collections import namedtuple
+from collections.abc import Mapping
+from multiprocessing import resource_tracker, shared_memory
 
+import numpy as np
 from multipledispatch import dispatch
 
 class Dobot:
@@ -35,6 +69,9 @@ class Dobot:
         isEnabled (bool): The state of the robot arm. True if the robot is enabled, False otherwise.
         debugLevel (int): The level of debug information to print. 0: No debug information, 1: Print basic information. 2: Print parse information as well.
         response (tuple): The response from the robot arm.
+        feedback (Feedback): Feedback used to answer IO reads without a round trip. None to always ask the robot. See UseFeedback().
+        batch (IOBatch): The active IO batch of the calling thread. None if IO commands are sent immediately. See IOBatch().
+        lock (RLock): Lock held while a command is sent and its response received, so several threads can share the connection.
     
     '''
     def __init__(self, ip='192.168.5.1', port=29999):
@@ -44,6 +81,20 @@ class Dobot:
         self.isEnabled = False
         self.debugLevel = 1
         self.response = ()
+        self.feedback = None
+        self.feedbackMaxAge = 0.05
+        self.toolDIBit = None
+        self.local = threading.local()
+        self.lock = threading.RLock()
+
+    @property
+    def batch(self):
+        # Batches are per thread, so IO commands of other threads are not pulled into them
+        return getattr(self.local, 'batch', None)
+
+    @batch.setter
+    def batch(self, batch):
+        self.local.batch = batch
 
     # Error Codes:
     error_codes = {
@@ -1012,6 +1063,8 @@ class Dobot:
             DO(1, 1)
         """
         if self.debugLevel > 0: print(f"  Setting digital output pin {index} to {status}")
+        if self.batch is not None:
+            return self.batch.SetDO(index, status)
         return self.SendCommand(f"DO({index},{status})")
 
     @dispatch(int, int, int)
@@ -1031,6 +1084,8 @@ class Dobot:
             DO(1, 1, 1000)
         """
         if self.debugLevel > 0: print(f"  Setting digital output pin {index} to {status} for {time} ms")
+        if self.batch is not None:
+            return self.batch.Add(f"DO({index},{status},{time})")
         return self.SendCommand(f"DO({index},{status},{time})")
 
     def DOInstant(self, index:int, status:int) -> tuple[str, str, str]:
@@ -1064,6 +1119,9 @@ class Dobot:
             GetDO(1)
         """
         if self.debugLevel > 0: print(f"  Getting digital output pin {index}")
+        value = self.FeedbackBit('DigitalOutputs', index - 1)
+        if value is not None:
+            return self.ParseError(0), str(value), f"GetDO({index})"
         return self.SendCommand(f"GetDO({index})")
 
     def DOGroup(self, values:str) -> tuple[str, str, str]:
@@ -1096,6 +1154,9 @@ class Dobot:
             GetDOGroup("1,2,3")
         """
         if self.debugLevel > 0: print(f"  Getting digital output group {values}")
+        bits = [self.FeedbackBit('DigitalOutputs', int(index) - 1) for index in values.split(",")]
+        if None not in bits:
+            return self.ParseError(0), ",".join(map(str, bits)), f"GetDOGroup({values})"
         return self.SendCommand(f"GetDOGroup({values})")
 
     def ToolDO(self, index:int, status:int) -> tuple[str, str, str]:
@@ -1113,6 +1174,8 @@ class Dobot:
             ToolDO(1, 1)
         """
         if self.debugLevel > 0: print(f"  Setting tool digital output pin {index} to {status}")
+        if self.batch is not None:
+            return self.batch.Add(f"ToolDO({index},{status})")
         return self.SendCommand(f"ToolDO({index},{status})")
 
     def ToolDOInstant(self, index:int, status:int) -> tuple[str, str, str]:
@@ -1163,6 +1226,8 @@ class Dobot:
             AO(1, 5)
         """
         if self.debugLevel > 0: print(f"  Setting analog output pin {index} to {value}")
+        if self.batch is not None:
+            return self.batch.Add(f"AO({index},{value})")
         return self.SendCommand(f"AO({index},{value})")
 
     def AOInstant(self, index:int, value:int) -> tuple[str, str, str]:
@@ -1212,6 +1277,9 @@ class Dobot:
             DI(1)
         """
         if self.debugLevel > 0: print(f"  Getting digital input pin {index}")
+        value = self.FeedbackBit('DigitalInputs', index - 1)
+        if value is not None:
+            return self.ParseError(0), str(value), f"DI({index})"
         return self.SendCommand(f"DI({index})")
 
     def DIGroup(self, values:str) -> tuple[str, str, str]:
@@ -1228,6 +1296,9 @@ class Dobot:
             DIGroup("1,2,3")
         """
         if self.debugLevel > 0: print(f"  Getting digital input group {values}")
+        bits = [self.FeedbackBit('DigitalInputs', int(index) - 1) for index in values.split(",")]
+        if None not in bits:
+            return self.ParseError(0), ",".join(map(str, bits)), f"DIGroup({values})"
         return self.SendCommand(f"DIGroup({values})")
 
     def ToolDI(self, index:int) -> tuple[str, str, str]:
@@ -1244,6 +1315,9 @@ class Dobot:
             ToolDI(1)
         """
         if self.debugLevel > 0: print(f"  Getting tool digital input pin {index}")
+        value = None if self.toolDIBit is None else self.FeedbackBit('DigitalInputs', self.toolDIBit + index - 1)
+        if value is not None:
+            return self.ParseError(0), str(value), f"ToolDI({index})"
         return self.SendCommand(f"ToolDI({index})")
 
     def AI(self, index:int) -> tuple[str, str, str]:
@@ -3036,8 +3110,9 @@ class Dobot:
         """
         if self.connection:
             try:
-                self.connection.sendall(command.encode() + b'\n')
-                response = self.connection.recv(1024).decode()
+                with self.lock:
+                    self.connection.sendall(command.encode() + b'\n')
+                    response = self.connection.recv(1024).decode()
                 return self.ParseResponse(response.strip())
             except Exception as e:
                 print(f"  Python error sending command: {e}")
@@ -3045,6 +3120,56 @@ class Dobot:
         else:
             raise Exception("  ! Not connected to Dobot Magician E6")
 
+    def SendCommands(self, commands:list) -> list:
+        """
+        Send several commands in one burst and receive all responses. Saves a round trip per command compared to SendCommand().
+
+        Args:
+            commands (list): The commands to send to the robot.
+
+        Returns:
+            The parsed responses in the order of the commands.
+
+        Raises:
+            Exception: If not connected to the Dobot Magician E6.
+
+        Example:
+            SendCommands(["DO(1,1)", "ToolDO(1,0)"])
+        """
+        if self.connection:
+            try:
+                with self.lock:
+                    self.connection.sendall("".join(command + "\n" for command in commands).encode())
+                    received = ""
+                    while received.count(";") < len(commands):
+                        chunk = self.connection.recv(1024).decode()
+                        if not chunk:
+                            break
+                        received += chunk
+                responses = [response.strip() + ";" for response in received.split(";") if response.strip()]
+                responses += [None] * (len(commands) - len(responses))
+                return [self.ParseResponse(response) for response in responses[:len(commands)]]
+            except Exception as e:
+                print(f"  Python error sending commands: {e}")
+                return [None] * len(commands)
+        else:
+            raise Exception("  ! Not connected to Dobot Magician E6")
+
+    def IOBatch(self):
+        """
+        Collect DO, ToolDO and AO commands of the calling thread and send them together. Plain DO writes are merged into a single DOGroup command, so all outputs switch at once. The commands are sent when the with block ends and dropped if it raises. Inside the block the IO commands return a placeholder (no error, "", command) instead of the robot response; a nested batch is sent with the outermost one.
+
+        Returns:
+            The IOBatch context manager.
+
+        Example:
+            with robot.IOBatch() as batch:
+                robot.DO(1,0)
+                robot.DO(2,1)
+            print(batch.response)
+        """
+        return IOBatch(self)
+
     def SetDebugLevel(self, debugLevel:int) -> tuple[str, str, str]:
         """
         Set the debug level for the Dobot Object.
@@ -3060,6 +3185,46 @@ class Dobot:
         """
         self.debugLevel = debugLevel
 
+    def UseFeedback(self, feedback, maxAge:float=0.05, toolDIBit:int=None) -> None:
+        """
+        Answer DI, DIGroup, GetDO, GetDOGroup and ToolDI from the feedback frames instead of sending a command, as long as the latest frame is fresh. Falls back to the command for stale feedback or indices outside the 64 feedback bits.
+
+        Args:
+            feedback (Feedback): Feedback that is read continuously, e.g. after Start(). None to always send commands.
+            maxAge (float): Maximum age of the latest frame. Unit: s. Default is 0.05.
+            toolDIBit (int): Bit of DigitalInputs holding tool DI 1 on this controller. Default is None (ToolDI always sends the command).
+
+        Returns:
+            None
+
+        Example:
+            UseFeedback(feedback, 0.02)
+        """
+        self.feedback = feedback
+        self.feedbackMaxAge = maxAge
+        self.toolDIBit = toolDIBit
+
+    def FeedbackBit(self, key:str, bit:int):
+        """
+        Get one IO bit from the latest feedback frame.
+
+        Args:
+            key (string): 'DigitalInputs' or 'DigitalOutputs'.
+            bit (int): Bit index. Range: [0,63].
+
+        Returns:
+            The bit (0 or 1) or None if no fresh feedback is available.
+
+        Example:
+            FeedbackBit('DigitalInputs', 0)
+        """
+        feedback = self.feedback
+        if feedback is None or not 0 <= bit < 64 or not isinstance(feedback.data, FeedbackFrame):
+            return None
+        if time.monotonic() - feedback.received > self.feedbackMaxAge:
+            return None
+        return (feedback.data[key] >> bit) & 1
+
     def MoveJJ(self,j1:float,j2:float,j3:float,j4:float,j5:float,j6:float) -> tuple[str, str, str]:
         """
         Move the robot to a specified joint position using joint motion.
@@ -3244,6 +3409,27 @@ class Dobot:
         # Return as a tuple
         return error, response, command
     
+    @staticmethod
+    def FormatPoint(values, decimals:int=3) -> str:
+        """
+        Format the values of a point for a command, rounded to a fixed number of decimals without trailing zeros or exponents.
+
+        Args:
+            values: The values, e.g. a pose or joint angles.
+            decimals (int): Number of decimals. Default is 3.
+
+        Returns:
+            The point in curly brackets.
+
+        Example:
+            FormatPoint([200, 0.5, 1e-7, 180, 0, 90]) -> "{200,0.5,0,180,0,90}"
+        """
+        texts = []
+        for value in values:
+            text = f"{float(value):.{decimals}f}".rstrip("0").rstrip(".")
+            texts.append("0" if text == "-0" else text)
+        return "{" + ",".join(texts) + "}"
+
     def ParseError(self, errcode:int) -> str:
         """
         Parse the error code to a human readable error message.
@@ -3294,6 +3480,125 @@ class Dobot:
 
 
 
+# Class for batching IO commands
+
+class IOBatch:
+    """
+    Class collecting IO commands of a robot while a with block is active. See Dobot.IOBatch().
+
+    Attributes:
+        outputs (dict): Digital outputs to set with DOGroup. Index -> status. The last write to an index wins.
+        commands (list): Other commands (ToolDO, AO, timed DO) sent in the same burst.
+        responses (list): Parsed responses after the batch was sent.
+        response (tuple): The last response after the batch was sent. For a nested batch the placeholder of its last command.
+        outer (IOBatch): The enclosing batch that sends the commands of a nested batch. None for the outermost batch.
+    """
+
+    def __init__(self, robot:Dobot):
+        """
+        Constructor for the IO batch.
+
+        Args:
+            robot (Dobot): The robot object.
+        """
+        self.robot = robot
+        self.outputs = {}
+        self.commands = []
+        self.responses = []
+        self.response = None
+        self.outer = None
+
+    def __enter__(self):
+        # Nested batches pass their commands on and are sent with the outermost batch
+        self.outer = self.robot.batch
+        self.robot.batch = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.robot.batch = self.outer
+        if self.outer is None and exc_type is None:
+            self.Commit()
+        return False
+
+    def Deferred(self, command:str) -> tuple[str, str, str]:
+        """
+        Placeholder response of a queued command, in the format of the parsed responses.
+
+        Args:
+            command (string): The queued command.
+
+        Returns:
+            (no error, "", command). The response is empty until the batch is sent.
+
+        Example:
+            Deferred("DO(1,1)")
+        """
+        self.response = (self.robot.error_codes[0], "", command)
+        return self.response
+
+    def SetDO(self, index:int, status:int) -> tuple[str, str, str]:
+        """
+        Queue a digital output write.
+
+        Args:
+            index (int): Digital output index.
+            status (int): Digital output status. 0: OFF, 1: ON.
+
+        Returns:
+            The placeholder response. See Deferred().
+
+        Example:
+            SetDO(1, 1)
+        """
+        if self.outer is not None:
+            self.outer.SetDO(index, status)
+        else:
+            self.outputs[index] = status
+        return self.Deferred(f"DO({index},{status})")
+
+    def Add(self, command:str) -> tuple[str, str, str]:
+        """
+        Queue a command.
+
+        Args:
+            command (string): The command.
+
+        Returns:
+            The placeholder response. See Deferred().
+
+        Example:
+            Add("ToolDO(1,1)")
+        """
+        if self.outer is not None:
+            self.outer.Add(command)
+        else:
+            self.commands.append(command)
+        return self.Deferred(command)
+
+    def Commit(self) -> list:
+        """
+        Send all queued commands.
+
+        Returns:
+            The parsed responses.
+
+        Example:
+            Commit()
+        """
+        commands = []
+        if self.outputs:
+            commands.append("DOGroup(" + ",".join(f"{index},{status}" for (index, status) in self.outputs.items()) + ")")
+        commands += self.commands
+        self.outputs = {}
+        self.commands = []
+        if not commands:
+            return []
+        if self.robot.debugLevel > 0: print(f"  Sending IO batch {commands}")
+        self.responses = self.robot.SendCommands(commands) if len(commands) > 1 else [self.robot.SendCommand(commands[0])]
+        self.response = self.responses[-1]
+        return self.responses
+
+
 # Class for the flexible gripper
 
 class FlexGripper:
@@ -3323,9 +3628,8 @@ class FlexGripper:
         Example:
             Open()
         """
-        if self.robot.isDebug: print(f"  Opening flexible gripper\n    ", end="")
-        self.robot.DO(self.DOvacuum,0)
-        return self.robot.DO(self.DOpressure,1)  
+        if self.robot.debugLevel > 0: print(f"  Opening flexible gripper\n    ", end="")
+        return self.SetOutputs(0, 1)
 
     def Close(self) -> tuple[str, str, str]:
         """
@@ -3337,9 +3641,8 @@ class FlexGripper:
         Example:
             Close()
         """
-        if self.robot.isDebug: print(f"  Closing flexible gripper\n    ", end="")
-        self.robot.DO(self.DOpressure,0)
-        return self.robot.DO(self.DOvacuum,1) 
+        if self.robot.debugLevel > 0: print(f"  Closing flexible gripper\n    ", end="")
+        return self.SetOutputs(1, 0)
     
     def Neutral(self) -> tuple[str, str, str]:
         """
@@ -3351,9 +3654,8 @@ class FlexGripper:
         Example:
             Neutral()
         """
-        if self.robot.isDebug: print(f"  Setting flexible gripper to neutral\n    ", end="")
-        self.robot.DO(self.DOpressure,0)
-        return self.robot.DO(self.DOvacuum,0)
+        if self.robot.debugLevel > 0: print(f"  Setting flexible gripper to neutral\n    ", end="")
+        return self.SetOutputs(0, 0)
     
     def SetState(self, state:int, vacuum:int=1, pressure:int=2) -> tuple[str, str, str]:
         """
@@ -3370,17 +3672,35 @@ class FlexGripper:
         Example:
             SetState(1)
         """
-        if self.robot.isDebug: print(f"  Setting flexible gripper to {state}\n    ", end="")
+        if self.robot.debugLevel > 0: print(f"  Setting flexible gripper to {state}\n    ", end="")
         match state:
             case -1:
-                self.robot.DO(pressure,0)
-                return self.robot.DO(vacuum,1)
+                return self.SetOutputs(1, 0, vacuum, pressure)
             case 0:
-                self.robot.DO(vacuum,0)
-                return self.robot.DO(pressure,0)
+                return self.SetOutputs(0, 0, vacuum, pressure)
             case 1:
-                self.robot.DO(vacuum,1)
-                return self.robot.DO(pressure,1)
+                return self.SetOutputs(1, 1, vacuum, pressure)
+
+    def SetOutputs(self, vacuumState:int, pressureState:int, vacuum:int=None, pressure:int=None) -> tuple[str, str, str]:
+        """
+        Switch the vacuum and pressure outputs together in one IO batch.
+
+        Args:
+            vacuumState (int): Vacuum output status. 0: OFF, 1: ON.
+            pressureState (int): Pressure output status. 0: OFF, 1: ON.
+            vacuum (int): Digital port for the vacuum. Default is DOvacuum.
+            pressure (int): Digital port for the pressure. Default is DOpressure.
+
+        Returns:
+            The response from the robot.
+
+        Example:
+            SetOutputs(0, 1)
+        """
+        with self.robot.IOBatch() as batch:
+            self.robot.DO(self.DOvacuum if vacuum is None else vacuum, vacuumState)
+            self.robot.DO(self.DOpressure if pressure is None else pressure, pressureState)
+        return batch.response
 
 
 # Class for the servo gripper
@@ -3410,7 +3730,7 @@ class ServoGripper:
     
     def SetState(self, state) -> tuple[str, str, str]:
         """
-        Set the state of the servo gripper.
+        Set the state of the servo gripper. Both inputs of the gripper are switched together in one IO batch.
 
         Args:
             state (int): IO State group of the gripper. Range: 1-4.
@@ -3421,26 +3741,22 @@ class ServoGripper:
         Example:
             SetState(1)
         """
-        if self.robot.isDebug: print(f"  Setting servo gripper group to {state}\n    ", end="")
+        if self.robot.debugLevel > 0: print(f"  Setting servo gripper group to {state}\n    ", end="")
         match state:
             case 1:
-                self.robot.DO(self.DOin1,0)
-                if self.robot.isDebug: print("    ", end="")
-                return self.robot.DO(self.DOin2,0)
+                (in1, in2) = (0, 0)
             case 2:
-                self.robot.DO(self.DOin1,1)
-                if self.robot.isDebug: print("    ", end="")
-                return self.robot.DO(self.DOin2,0)
+                (in1, in2) = (1, 0)
             case 3:
-                self.robot.DO(self.DOin1,0)
-                if self.robot.isDebug: print("    ", end="")
-                return self.robot.DO(self.DOin2,1)
+                (in1, in2) = (0, 1)
             case 4:
-                self.robot.DO(self.DOin1,1)
-                if self.robot.isDebug: print("    ", end="")
-                return self.robot.DO(self.DOin2,1)
+                (in1, in2) = (1, 1)
             case _:
                 return "    Invalid state group. Please choose a value between 1 and 4."
+        with self.robot.IOBatch() as batch:
+            self.robot.DO(self.DOin1, in1)
+            self.robot.DO(self.DOin2, in2)
+        return batch.response
             
     def GetState(self) -> tuple[str, str, str]:
         """
@@ -3452,7 +3768,7 @@ class ServoGripper:
         Example:
             GetState()
         """
-        if self.robot.isDebug: print(f"  Getting servo gripper state\n    ", end="")
+        if self.robot.debugLevel > 0: print(f"  Getting servo gripper state\n    ", end="")
         output1 = self.robot.GetDO(self.DIout1)
         output2 = self.robot.GetDO(self.DIout2)
         match (output1, output2):
@@ -3470,179 +3786,4511 @@ class ServoGripper:
                 return "Unknown state"
 
 
-# Class to receive feedback from the robot
+# Class for planning Modbus reads
 
-class Feedback:
+class ModbusPlanner:
     """
-    Class to receive feedback from the robot.
+    Class for reading declared Modbus registers of a slave with the minimum number of requests. Adjacent or overlapping registers of the same table are merged into one request within the count limit of the table, the raw values are decoded locally and kept in a cache with a freshness per register.
+
+    Attributes:
+        registers (dict): Declared registers. Name -> (table, address, type, ttl).
+        values (dict): Cached decoded values. Name -> value.
+        stamps (dict): Time the cached values were read (time.monotonic()). Name -> time.
+        requests (int): Number of Modbus requests sent.
+        hits (int): Number of values answered from the cache.
     """
 
-    def __init__(self, robot:Dobot, port=30004):
+    # Modbus tables: read command and maximum count per request
+    modbus_tables = {
+        'hold': ('GetHoldRegs', 4),
+        'input': ('GetInRegs', 4),
+        'coil': ('GetCoils', 16),
+        'inbits': ('GetInBits', 16)
+    }
+
+    # Modbus value types: number of 16-bit registers and struct format
+    modbus_types = {
+        'BOOL': (1, None),
+        'U16': (1, 'H'),
+        'S16': (1, 'h'),
+        'U32': (2, 'I'),
+        'S32': (2, 'i'),
+        'F32': (2, 'f'),
+        'F64': (4, 'd')
+    }
+
+    def __init__(self, robot:Dobot, index:int=0, ttl:float=0.1, limits:dict=None, gap:int=0, wordOrder:str='big'):
         """
-        Constructor for the feedback class.
+        Constructor for the Modbus read planner.
 
         Args:
-            robot (DobotTCP): The robot object.
-            port (int): Port to receive feedback. Different ports have different feedback timings. See TCP protocol for details. Default is port 30004.
+            robot (Dobot): The robot object.
+            index (int): Master station index returned by ModbusCreate(). Default is 0.
+            ttl (float): Default time a cached value stays fresh. Unit: s. Default is 0.1.
+            limits (dict): Maximum count per request for each table. Table -> count. Default is modbus_tables.
+            gap (int): Number of unused registers that may be read to merge two requests. Default is 0.
+            wordOrder (string): Order of the registers of 32 and 64-bit values. 'big': most significant register first, 'little': least significant register first. Default is 'big'.
         """
+        if wordOrder not in ('big', 'little'):
+            raise ValueError(f"Invalid word order {wordOrder}. Use 'big' or 'little'.")
         self.robot = robot
-        self.port = port
-        self.client = None
-        self.data = {}
+        self.index = index
+        self.ttl = ttl
+        self.limits = {table: count for (table, (_, count)) in self.modbus_tables.items()}
+        self.limits.update(limits or {})
+        self.gap = gap
+        self.wordOrder = wordOrder
+        self.registers = {}
+        self.values = {}
+        self.stamps = {}
+        self.requests = 0
+        self.hits = 0
 
-    def Connect(self) -> None:
+    def Add(self, name:str, address:int, type:str='U16', table:str='hold', ttl:float=None) -> None:
         """
-        Connect to the robot's feedback port.
+        Declare a register.
+
+        Args:
+            name (string): Name of the value.
+            address (int): Start address of the value.
+            type (string): Value type. BOOL for coils and contact registers. U16, S16, U32, S32, F32 or F64 for input and holding registers. Default is U16.
+            table (string): Register table. 'hold', 'input', 'coil' or 'inbits'. Default is 'hold'.
+            ttl (float): Time the cached value stays fresh. Unit: s. Default is None (use the planner default).
 
         Returns:
             None
 
+        Raises:
+            ValueError: If the table or type is invalid or the value does not fit in one request.
+
         Example:
-            Connect()
+            Add("speed", 3095, "F32", "hold", 0.5)
         """
-        self.client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.client.connect((self.robot.ip, self.port))
+        if table not in self.modbus_tables:
+            raise ValueError(f"Invalid Modbus table {table}. Use one of {list(self.modbus_tables)}.")
+        if type not in self.modbus_types:
+            raise ValueError(f"Invalid Modbus type {type}. Use one of {list(self.modbus_types)}.")
+        if (type == 'BOOL') != (table in ('coil', 'inbits')):
+            raise ValueError(f"Type {type} cannot be read from table {table}.")
+        if self.modbus_types[type][0] > self.limits[table]:
+            raise ValueError(f"Type {type} does not fit in one request of table {table}.")
+        self.registers[name] = (table, address, type, ttl)
+        self.Invalidate(name)
 
-    def Get(self) -> None:
+    def Remove(self, name:str) -> None:
         """
-        Get feedback from the robot. Data is stored in the data attribute.
+        Remove a declared register.
+
+        Args:
+            name (string): Name of the value.
 
         Returns:
             None
 
         Example:
-            Get()
+            Remove("speed")
         """
-        # Clear the buffer
-        self.client.setblocking(False)
-        while True:
-            try:
-                data = self.client.recv(1440)
-                if not data:
-                    break
-            except:
-                break
-        self.client.setblocking(True)
-        # wait 10 ms for the data to be ready
-        time.sleep(0.01)
-        rawdata = self.client.recv(1440)
-        self.data = self.ParseFeedback(rawdata)
+        self.registers.pop(name, None)
+        self.Invalidate(name)
 
-    def ParseFeedback(self, data) -> dict:
+    def Invalidate(self, name:str=None) -> None:
         """
-        Parse the feedback data from the robot.
-        
+        Drop cached values so the next read asks the slave.
+
         Args:
-            data (bytes): The feedback data from the robot.
-            
+            name (string): Name of the value. Default is None (all values).
+
         Returns:
-            A dictionary with the feedback data.
-        
+            None
+
         Example:
-            ParseFeedback(data)
+            Invalidate("speed")
+        """
+        if name is None:
+            self.values.clear()
+            self.stamps.clear()
+        else:
+            self.values.pop(name, None)
+            self.stamps.pop(name, None)
+
+    def Plan(self, names:list=None) -> list:
+        """
+        Merge the registers into the minimum number of requests.
+
+        Args:
+            names (list): Names of the values to read. Default is None (all declared values).
+
+        Returns:
+            The requests. List of (command, table, start, count, names).
+
+        Example:
+            Plan(["speed", "state"])
+        """
+        names = self.registers if names is None else names
+        spans = {}
+        for name in names:
+            (table, address, type, _) = self.registers[name]
+            spans.setdefault(table, []).append((address, address + self.modbus_types[type][0], name))
+        plan = []
+        for (table, entries) in spans.items():
+            entries.sort()
+            limit = self.limits[table]
+            request = None
+            for (start, end, name) in entries:
+                if request is not None and start <= request[1] + self.gap and max(end, request[1]) - request[0] <= limit:
+                    request[1] = max(end, request[1])
+                    request[2].append(name)
+                else:
+                    request = [start, end, [name]]
+                    plan.append((table, request))
+        requests = []
+        for (table, (start, end, members)) in plan:
+            command = self.modbus_tables[table][0]
+            if table in ('coil', 'inbits'):
+                requests.append((f"{command}({self.index},{start},{end - start})", table, start, end - start, members))
+            else:
+                requests.append((f"{command}({self.index},{start},{end - start},U16)", table, start, end - start, members))
+        return requests
+
+    def Decode(self, type:str, words:list):
+        """
+        Decode a value from raw register values.
+
+        Args:
+            type (string): Value type.
+            words (list): The raw 16-bit register values (or bits) of the value.
+
+        Returns:
+            The decoded value.
+
+        Example:
+            Decode("F32", [16968, 0])
+        """
+        (width, fmt) = self.modbus_types[type]
+        if fmt is None:
+            return int(words[0])
+        words = words[:width] if self.wordOrder == 'big' else words[width - 1::-1]
+        return struct.unpack('>' + fmt, struct.pack(f'>{width}H', *(word & 0xFFFF for word in words)))[0]
+
+    def Read(self, names:list=None, maxAge:float=None) -> dict:
+        """
+        Read values. Values that are still fresh are answered from the cache, all others are read with the minimum number of requests, sent together in one burst.
+
+        Args:
+            names (list): Names of the values to read. Default is None (all declared values).
+            maxAge (float): Maximum age of cached values. Unit: s. Default is None (use the ttl of each register).
+
+        Returns:
+            The decoded values. Name -> value. None for values whose request failed.
+
+        Example:
+            Read(["speed", "state"])
+        """
+        names = list(self.registers) if names is None else list(names)
+        now = time.monotonic()
+        stale = []
+        for name in names:
+            ttl = self.registers[name][3]
+            ttl = maxAge if maxAge is not None else (self.ttl if ttl is None else ttl)
+            if name in self.stamps and now - self.stamps[name] <= ttl:
+                self.hits += 1
+            else:
+                stale.append(name)
+        if stale:
+            self.Fetch(stale)
+        return {name: self.values.get(name) for name in names}
+
+    def Get(self, name:str, maxAge:float=None):
+        """
+        Read one value.
+
+        Args:
+            name (string): Name of the value.
+            maxAge (float): Maximum age of the cached value. Unit: s. Default is None (use the ttl of the register).
+
+        Returns:
+            The decoded value. None if the request failed.
+
+        Example:
+            Get("speed")
+        """
+        return self.Read([name], maxAge)[name]
+
+    def Fetch(self, names:list) -> None:
+        """
+        Read values from the slave and update the cache.
+
+        Args:
+            names (list): Names of the values to read.
+
+        Returns:
+            None
+
+        Example:
+            Fetch(["speed", "state"])
+        """
+        requests = self.Plan(names)
+        commands = [request[0] for request in requests]
+        if self.robot.debugLevel > 0: print(f"  Reading {len(names)} Modbus values from slave {self.index} with {len(commands)} requests")
+        responses = self.robot.SendCommands(commands) if len(commands) > 1 else [self.robot.SendCommand(commands[0])]
+        self.requests += len(commands)
+        stamp = time.monotonic()
+        for ((command, table, start, count, members), response) in zip(requests, responses):
+            words = None
+            if response is not None and response[0] == self.robot.ParseError(0):
+                try:
+                    words = [int(value) for value in response[1].split(",")]
+                except ValueError:
+                    words = None
+            if words is None or len(words) < count:
+                if self.robot.debugLevel > 0: print(f"  Modbus request {command} failed: {response}")
+                for name in members:
+                    self.Invalidate(name)
+                continue
+            for name in members:
+                (_, address, type, _) = self.registers[name]
+                offset = address - start
+                self.values[name] = self.Decode(type, words[offset:offset + self.modbus_types[type][0]])
+                self.stamps[name] = stamp
+
+
+# Class for polling Modbus registers in the background
+
+class ModbusPoller:
+    """
+    Class for polling groups of Modbus registers at independent rates in a background thread. The reads go through a ModbusPlanner, so groups that are due together are merged into the fewest requests. Groups start with spread phases and a pause is left after every read, so the polls do not block motion commands on the shared dashboard connection for long.
+
+    Attributes:
+        groups (list): Polled groups. List of [period, names, due, polls, first, last, overruns].
+        snapshot (dict): Latest decoded values. Name -> value.
+        stamps (dict): Time the latest values were read (time.monotonic()). Name -> time.
+        error (Exception): The error that stopped the polling thread. None if no error occurred.
+    """
+
+    def __init__(self, planner:ModbusPlanner, spacing:float=0.002):
+        """
+        Constructor for the Modbus poller.
+
+        Args:
+            planner (ModbusPlanner): The planner holding the declared registers.
+            spacing (float): Pause after every read so other commands can use the connection. Unit: s. Default is 0.002.
+        """
+        self.planner = planner
+        self.spacing = spacing
+        self.groups = []
+        self.snapshot = {}
+        self.stamps = {}
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+        self.error = None
+        self.wake = threading.Event()
+
+    def Add(self, period:float, names:list) -> int:
+        """
+        Add a group of registers polled with the same period.
+
+        Args:
+            period (float): Polling period. Unit: s.
+            names (list): Names of values declared in the planner.
+
+        Returns:
+            The index of the group.
+
+        Raises:
+            KeyError: If a name is not declared in the planner.
+
+        Example:
+            Add(0.01, ["state", "ready"])
+        """
+        for name in names:
+            if name not in self.planner.registers:
+                raise KeyError(f"Modbus value {name} is not declared in the planner.")
+        with self.lock:
+            self.groups.append([period, list(names), 0, 0, None, None, 0])
+            self.Spread()
+        self.wake.set()
+        return len(self.groups) - 1
+
+    def Spread(self) -> None:
+        """
+        Spread the phases of the groups evenly over the shortest period so their first polls do not coincide.
+
+        Returns:
+            None
+
+        Example:
+            Spread()
+        """
+        if not self.groups:
+            return
+        now = time.monotonic()
+        step = min(group[0] for group in self.groups) / len(self.groups)
+        for (i, group) in enumerate(self.groups):
+            group[2] = now + i * step
+
+    def Snapshot(self) -> dict:
+        """
+        Get a copy of the latest values.
+
+        Returns:
+            The latest decoded values. Name -> value.
+
+        Example:
+            Snapshot()
+        """
+        with self.lock:
+            return dict(self.snapshot)
+
+    def Rates(self) -> list:
+        """
+        Compare the achieved polling rate of every group with the requested one.
+
+        Returns:
+            List of (requested rate, achieved rate, overruns) per group. Unit: Hz. The achieved rate is None until a group was polled twice.
+
+        Example:
+            Rates()
+        """
+        rates = []
+        with self.lock:
+            for (period, names, due, polls, first, last, overruns) in self.groups:
+                achieved = (polls - 1) / (last - first) if polls > 1 and last > first else None
+                rates.append((1 / period, achieved, overruns))
+        return rates
+
+    def Poll(self) -> float:
+        """
+        Read all groups that are due.
+
+        Returns:
+            Time until the next group is due. Unit: s.
+
+        Example:
+            Poll()
+        """
+        now = time.monotonic()
+        with self.lock:
+            due = [group for group in self.groups if group[2] <= now]
+        if due:
+            names = list(dict.fromkeys(name for group in due for name in group[1]))
+            values = self.planner.Read(names, 0)
+            stamp = time.monotonic()
+            with self.lock:
+                self.snapshot.update(values)
+                for name in names:
+                    self.stamps[name] = stamp
+                for group in due:
+                    group[3] += 1
+                    group[4] = stamp if group[4] is None else group[4]
+                    group[5] = stamp
+                    group[2] += group[0]
+                    if group[2] < stamp:
+                        # Skip missed polls instead of catching up in a burst
+                        group[6] += 1
+                        group[2] = stamp + group[0]
+        with self.lock:
+            if not self.groups:
+                return 0.1
+            return max(min(group[2] for group in self.groups) - time.monotonic(), 0)
+
+    def Start(self) -> None:
+        """
+        Start polling in a background thread.
+
+        Returns:
+            None
+
+        Example:
+            Start()
+        """
+        if self.running:
+            return
+        self.running = True
+        self.error = None
+        with self.lock:
+            self.Spread()
+            for group in self.groups:
+                group[3:7] = [0, None, None, 0]
+        self.thread = threading.Thread(target=self.Run, daemon=True)
+        self.thread.start()
+
+    def Run(self) -> None:
+        """
+        Poll until Stop() is called or a read fails. The error is stored in the error attribute.
+
+        Returns:
+            None
+
+        Example:
+            Run()
+        """
+        try:
+            while self.running:
+                wait = self.Poll()
+                self.wake.wait(max(wait, self.spacing))
+                self.wake.clear()
+        except Exception as e:
+            if self.running:
+                self.error = e
+                if self.planner.robot.debugLevel > 0: print(f"  Modbus poller error: {e}")
+        finally:
+            self.running = False
+
+    def Stop(self) -> None:
+        """
+        Stop the background polling thread.
+
+        Returns:
+            None
+
+        Example:
+            Stop()
+        """
+        self.running = False
+        self.wake.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(1)
+        self.thread = None
+
+
+# Class for bulk access to the bus registers of the controller
+
+class RegisterMap:
+    """
+    Class for reading and writing named bus registers of the controller (GetInput*, GetOutput*, SetOutput*) in one pipelined exchange instead of one round trip per value.
+
+    Attributes:
+        registers (dict): Declared registers. Name -> (direction, address, type).
+        values (dict): Last value read or written. Name -> value.
+        skipped (int): Number of writes skipped because the value was unchanged.
+    """
+
+    # Register types: getter and setter suffix, address range and value type
+    register_types = {
+        'bool': ('Bool', 64, int),
+        'int': ('Int', 24, int),
+        'float': ('Float', 24, float)
+    }
+
+    def __init__(self, robot:Dobot):
+        """
+        Constructor for the register map.
+
+        Args:
+            robot (Dobot): The robot object.
+        """
+        self.robot = robot
+        self.registers = {}
+        self.values = {}
+        self.skipped = 0
+        self.snapshots = {}
+
+    def Add(self, name:str, address:int, type:str='int', direction:str='input') -> None:
+        """
+        Declare a bus register.
+
+        Args:
+            name (string): Name of the value. Must be a valid Python identifier.
+            address (int): Bus register address. Range: [0,63] for bool, [0,23] for int and float.
+            type (string): 'bool', 'int' or 'float'. Default is 'int'.
+            direction (string): 'input' or 'output'. Only outputs can be written. Default is 'input'.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the name, type, direction or address is invalid.
+
+        Example:
+            Add("partCount", 2, "int", "output")
+        """
+        if not name.isidentifier():
+            raise ValueError(f"Invalid register name {name}.")
+        if type not in self.register_types:
+            raise ValueError(f"Invalid register type {type}. Use one of {list(self.register_types)}.")
+        if direction not in ('input', 'output'):
+            raise ValueError(f"Invalid register direction {direction}. Use 'input' or 'output'.")
+        if not 0 <= address < self.register_types[type][1]:
+            raise ValueError(f"Invalid {type} register address {address}. Range: [0,{self.register_types[type][1] - 1}].")
+        self.registers[name] = (direction, address, type)
+        self.values.pop(name, None)
+        self.snapshots.clear()
+
+    def Snapshot(self, names:tuple):
+        """
+        Get the snapshot type for a set of names.
+
+        Args:
+            names (tuple): Names of the values.
+
+        Returns:
+            A named tuple type with one field per name.
+
+        Example:
+            Snapshot(("partCount", "ready"))
+        """
+        if names not in self.snapshots:
+            self.snapshots[names] = namedtuple('RegisterSnapshot', names)
+        return self.snapshots[names]
+
+    def Read(self, names:list=None):
+        """
+        Read registers in one pipelined exchange.
+
+        Args:
+            names (list): Names of the values to read. Default is None (all declared registers).
+
+        Returns:
+            Named tuple with the values. None for values whose command failed.
+
+        Example:
+            snapshot = Read()
+            print(snapshot.partCount)
+        """
+        names = tuple(self.registers) if names is None else tuple(names)
+        commands = []
+        for name in names:
+            (direction, address, type) = self.registers[name]
+            commands.append(f"Get{direction.capitalize()}{self.register_types[type][0]}({address})")
+        if self.robot.debugLevel > 0: print(f"  Reading {len(commands)} bus registers")
+        responses = self.robot.SendCommands(commands) if len(commands) > 1 else [self.robot.SendCommand(command) for command in commands]
+        values = []
+        for (name, command, response) in zip(names, commands, responses):
+            value = None
+            if response is not None and response[0] == self.robot.ParseError(0):
+                try:
+                    value = self.register_types[self.registers[name][2]][2](response[1])
+                except ValueError:
+                    value = None
+            if value is None:
+                if self.robot.debugLevel > 0: print(f"  Bus register command {command} failed: {response}")
+                self.values.pop(name, None)
+            else:
+                self.values[name] = value
+            values.append(value)
+        return self.Snapshot(names)(*values)
+
+    def Write(self, values:dict, force:bool=False) -> list:
+        """
+        Write output registers in one pipelined exchange. Values equal to the last value read or written are skipped.
+
+        Args:
+            values (dict): Values to write. Name -> value.
+            force (bool): Write all values, even unchanged ones. Default is False.
+
+        Returns:
+            The parsed responses of the sent commands.
+
+        Raises:
+            ValueError: If a register is not an output.
+
+        Example:
+            Write({"partCount": 12, "done": 1})
+        """
+        commands = []
+        names = []
+        for (name, value) in values.items():
+            (direction, address, type) = self.registers[name]
+            if direction != 'output':
+                raise ValueError(f"Register {name} is not an output.")
+            value = self.register_types[type][2](value)
+            if not force and self.values.get(name) == value:
+                self.skipped += 1
+                continue
+            commands.append(f"SetOutput{self.register_types[type][0]}({address},{value})")
+            names.append((name, value))
+        if not commands:
+            return []
+        if self.robot.debugLevel > 0: print(f"  Writing {len(commands)} bus registers")
+        responses = self.robot.SendCommands(commands) if len(commands) > 1 else [self.robot.SendCommand(commands[0])]
+        for ((name, value), response) in zip(names, responses):
+            if response is not None and response[0] == self.robot.ParseError(0):
+                self.values[name] = value
+            else:
+                self.values.pop(name, None)
+        return responses
+
+
+# Class for computing tray points locally
+
+class Tray:
+    """
+    Class computing all points of a 1D, 2D or 3D tray locally from the same corner points as Create1DTray(), Create2DTray() and Create3DTray(), so the points do not have to be fetched one at a time with GetTrayPoint().
+
+    Assumed point order (check once with Validate()):
+        1D: P1 and P2 are the endpoints.
+        2D: P1, P2, P3 and P4 are the corners in order around the tray. The row points run from P1 to P2, the column points from P1 to P4.
+        3D: P1 to P4 are the corners of the bottom layer as for 2D, P5 to P8 the corners above them. The layers run from P1 to P5.
+    Point indices start at 1 and run along the row first, then the columns, then the layers. All six pose values (including rx, ry, rz) are interpolated linearly between the corners.
+
+    Attributes:
+        name (string): Name of the tray on the controller.
+        count (tuple): Number of points per direction. (n,), (row, col) or (row, col, layer).
+        corners (ndarray): Corner poses. Shape (2|4|8, 6).
+        points (ndarray): All tray poses x, y, z, rx, ry, rz in index order. Shape (N, 6).
+    """
+
+    def __init__(self, name:str, count, corners):
+        """
+        Constructor for the tray.
+
+        Args:
+            name (string): Name of the tray. Up to 32 bytes. No pure numbers or spaces.
+            count (int | tuple): Number of points. n, (row, col) or (row, col, layer).
+            corners: Corner poses. Shape (2|4|8, 6).
+
+        Raises:
+            ValueError: If the number of corners does not match the dimension of count.
+        """
+        self.name = name
+        self.count = tuple(np.atleast_1d(count).astype(int).tolist())
+        self.corners = np.asarray(corners, dtype=np.float64).reshape(-1, 6)
+        if len(self.count) not in (1, 2, 3) or len(self.corners) != 2 ** len(self.count):
+            raise ValueError(f"A tray with count {self.count} needs {2 ** len(self.count)} corner points, got {len(self.corners)}.")
+        if min(self.count) < 1:
+            raise ValueError(f"Invalid tray count {self.count}.")
+        self.points = self.Weights(self.count) @ self.corners
+
+    def __len__(self):
+        return len(self.points)
+
+    def __getitem__(self, index):
+        return self.points[index]
+
+    @staticmethod
+    def Weights(count:tuple):
+        """
+        Get the interpolation weights of all tray points.
+
+        Args:
+            count (tuple): Number of points per direction.
+
+        Returns:
+            Weights of the corner points. Shape (N, 2|4|8).
+
+        Example:
+            Weights((4, 5))
+        """
+        # Weights of the first and last point of every direction
+        (u, v, w) = [np.linspace(0, 1, n) if n > 1 else np.zeros(1) for n in tuple(count) + (1,) * (3 - len(count))]
+        (w, v, u) = np.meshgrid(w, v, u, indexing='ij')
+        (u, v, w) = (u.ravel(), v.ravel(), w.ravel())
+        # Corner order around the tray: P1 (0,0), P2 (1,0), P3 (1,1), P4 (0,1)
+        layer = np.stack([(1 - u) * (1 - v), u * (1 - v), u * v, (1 - u) * v], axis=1)
+        match len(count):
+            case 1:
+                return np.stack([1 - u, u], axis=1)
+            case 2:
+                return layer
+            case _:
+                return np.hstack([layer * (1 - w)[:, None], layer * w[:, None]])
+
+    @classmethod
+    def FromCommand(cls, Trayname:str, Count:str, Points:str):
+        """
+        Create the tray from the arguments of Create1DTray(), Create2DTray() or Create3DTray().
+
+        Args:
+            Trayname (string): The name of the tray.
+            Count (string): Number of points in curled brackets. Example: {4,5}
+            Points (string): The corner points. Format for each point: pose={x,y,z,rx,ry,rz}
+
+        Returns:
+            The tray.
+
+        Example:
+            Tray.FromCommand("t1", "{5}", "{pose={0,0,0,0,0,0},pose={100,0,0,0,0,0}}")
+        """
+        count = [int(value) for value in Count.strip("{} ").split(",")]
+        values = [float(value) for value in Points.replace("pose", "").replace("=", "").replace("{", " ").replace("}", " ").replace(",", " ").split()]
+        return cls(Trayname, count, values)
+
+    def Count(self) -> str:
+        """
+        Get the count in the format of the Create*Tray commands.
+
+        Returns:
+            The count. Example: {4,5}
+        """
+        return "{" + ",".join(str(n) for n in self.count) + "}"
+
+    def Points(self) -> str:
+        """
+        Get the corner points in the format of the Create*Tray commands.
+
+        Returns:
+            The corner points. Example: {pose={x1,y1,z1,rx1,ry1,rz1},pose={x2,y2,z2,rx2,ry2,rz2}}
+        """
+        return "{" + ",".join("pose=" + Dobot.FormatPoint(corner) for corner in self.corners) + "}"
+
+    def Create(self, robot:Dobot) -> tuple[str, str, str]:
+        """
+        Create the tray on the controller.
+
+        Args:
+            robot (Dobot): The robot object.
+
+        Returns:
+            The response from the robot.
+
+        Example:
+            Create(robot)
+        """
+        match len(self.count):
+            case 1:
+                return robot.Create1DTray(self.name, self.Count(), self.Points())
+            case 2:
+                return robot.Create2DTray(self.name, self.Count(), self.Points())
+            case _:
+                return robot.Create3DTray(self.name, self.Count(), self.Points())
+
+    def Point(self, index:int):
+        """
+        Get one tray pose.
+
+        Args:
+            index (int): Index of the point, starting at 1 as in GetTrayPoint().
+
+        Returns:
+            The pose x, y, z, rx, ry, rz.
+
+        Example:
+            Point(1)
+        """
+        return self.points[index - 1]
+
+    def Validate(self, robot:Dobot, indices:list=None, tolerance:float=0.01) -> float:
+        """
+        Compare local points with GetTrayPoint() of the controller. The tray must have been created on the controller (see Create()).
+
+        Args:
+            robot (Dobot): The robot object.
+            indices (list): Indices to compare, starting at 1. Default is None (first, last and the point after the first row).
+            tolerance (float): Maximum allowed deviation of a pose value. Default is 0.01.
+
+        Returns:
+            The largest deviation of a pose value.
+
+        Raises:
+            ValueError: If the controller reports an error or a point deviates more than the tolerance.
+
+        Example:
+            Validate(robot)
+        """
+        if indices is None:
+            indices = sorted({1, min(self.count[0] + 1, len(self)), len(self)})
+        responses = robot.SendCommands([f"GetTrayPoint({self.name},{index})" for index in indices])
+        deviation = 0.0
+        for (index, response) in zip(indices, responses):
+            values = [float(value) for value in response[1].split(",")] if response is not None and response[1] else []
+            if len(values) != 7 or values[0] != 0:
+                raise ValueError(f"GetTrayPoint({self.name},{index}) failed: {response}")
+            deviation = max(deviation, float(np.max(np.abs(np.array(values[1:]) - self.Point(index)))))
+        if deviation > tolerance:
+            raise ValueError(f"Tray {self.name} deviates {deviation} from the controller. Check the point order.")
+        return deviation
+
+
+# Class for modelling the motion timing of the robot
+
+class MotionModel:
+    """
+    Class modelling motion times of the robot with trapezoidal velocity profiles. A MovJ moves all joints synchronized, so its time is the time of the slowest joint. A linear motion takes the longer of its translation and its rotation. The maximum values are scaled by the VelJ, AccJ, VelL, AccL and SpeedFactor ratios like on the controller.
+
+    Attributes:
+        jointVelocity (ndarray): Maximum joint velocities at 100 %. Unit: degree/s.
+        jointAcceleration (ndarray): Maximum joint accelerations at 100 %. Unit: degree/s².
+        velJ (float): Joint velocity ratio (VelJ). Unit: %.
+        accJ (float): Joint acceleration ratio (AccJ). Unit: %.
+        speedFactor (float): Global speed ratio (SpeedFactor). Unit: %.
+        linearVelocity (float): Maximum TCP velocity at 100 %. Unit: mm/s.
+        linearAcceleration (float): Maximum TCP acceleration at 100 %. Unit: mm/s².
+        rotationVelocity (float): Maximum TCP rotation velocity at 100 %. Unit: degree/s.
+        rotationAcceleration (float): Maximum TCP rotation acceleration at 100 %. Unit: degree/s².
+        velL (float): Linear velocity ratio (VelL). Unit: %.
+        accL (float): Linear acceleration ratio (AccL). Unit: %.
+    """
+
+    def __init__(self, jointVelocity=180.0, jointAcceleration=720.0, velJ:float=100, accJ:float=100, speedFactor:float=100, linearVelocity:float=500.0, linearAcceleration:float=2000.0, rotationVelocity:float=180.0, rotationAcceleration:float=720.0, velL:float=100, accL:float=100):
+        """
+        Constructor for the motion model. The default maximum values are estimates; see CycleTimeEstimator.Calibrate() to fit them to a robot.
+
+        Args:
+            jointVelocity (float | list): Maximum velocity of every joint at 100 %. Unit: degree/s. Default is 180.
+            jointAcceleration (float | list): Maximum acceleration of every joint at 100 %. Unit: degree/s². Default is 720.
+            velJ (float): Joint velocity ratio as set with VelJ(). Range: [1,100]. Default is 100.
+            accJ (float): Joint acceleration ratio as set with AccJ(). Range: [1,100]. Default is 100.
+            speedFactor (float): Global speed ratio as set with SpeedFactor(). Range: [1,100]. Default is 100.
+            linearVelocity (float): Maximum TCP velocity at 100 %. Unit: mm/s. Default is 500.
+            linearAcceleration (float): Maximum TCP acceleration at 100 %. Unit: mm/s². Default is 2000.
+            rotationVelocity (float): Maximum TCP rotation velocity at 100 %. Unit: degree/s. Default is 180.
+            rotationAcceleration (float): Maximum TCP rotation acceleration at 100 %. Unit: degree/s². Default is 720.
+            velL (float): Linear velocity ratio as set with VelL(). Range: [1,100]. Default is 100.
+            accL (float): Linear acceleration ratio as set with AccL(). Range: [1,100]. Default is 100.
+        """
+        self.jointVelocity = np.broadcast_to(np.asarray(jointVelocity, dtype=np.float64), (6,)).copy()
+        self.jointAcceleration = np.broadcast_to(np.asarray(jointAcceleration, dtype=np.float64), (6,)).copy()
+        self.velJ = velJ
+        self.accJ = accJ
+        self.speedFactor = speedFactor
+        self.linearVelocity = linearVelocity
+        self.linearAcceleration = linearAcceleration
+        self.rotationVelocity = rotationVelocity
+        self.rotationAcceleration = rotationAcceleration
+        self.velL = velL
+        self.accL = accL
+
+    @staticmethod
+    def Profile(distance, velocity, acceleration):
+        """
+        Time of trapezoidal velocity profiles. Falls back to a triangular profile if the maximum velocity is not reached.
+
+        Args:
+            distance: Distances to travel (any shape).
+            velocity: Maximum velocities (broadcast to distance).
+            acceleration: Accelerations (broadcast to distance).
+
+        Returns:
+            The motion times. Same shape as distance.
+
+        Example:
+            Profile(90, 180, 720)
+        """
+        distance = np.abs(distance)
+        return np.where(distance * acceleration >= velocity ** 2, distance / velocity + velocity / acceleration, 2 * np.sqrt(distance / acceleration))
+
+    def JointLimits(self, v=100, a=100, velJ=None, accJ=None, speedFactor=None) -> tuple:
+        """
+        Get the effective joint velocity and acceleration. All ratios may be arrays, one value per motion.
+
+        Args:
+            v (float): Velocity ratio of the command. Unit: %. Default is 100.
+            a (float): Acceleration ratio of the command. Unit: %. Default is 100.
+            velJ (float): Joint velocity ratio. Unit: %. Default is None (model setting).
+            accJ (float): Joint acceleration ratio. Unit: %. Default is None (model setting).
+            speedFactor (float): Global speed ratio. Unit: %. Default is None (model setting).
+
+        Returns:
+            (velocity, acceleration) of every joint. Shape (..., 6).
+
+        Example:
+            JointLimits(50, 50)
+        """
+        velJ = self.velJ if velJ is None else velJ
+        accJ = self.accJ if accJ is None else accJ
+        scale = np.asarray(self.speedFactor if speedFactor is None else speedFactor, dtype=np.float64) / 100
+        velocity = self.jointVelocity * (np.asarray(velJ) / 100 * np.asarray(v) / 100 * scale)[..., None]
+        acceleration = self.jointAcceleration * (np.asarray(accJ) / 100 * np.asarray(a) / 100 * scale ** 2)[..., None]
+        return (velocity, acceleration)
+
+    def JointTime(self, start, end, v=100, a=100, velJ=None, accJ=None, speedFactor=None):
+        """
+        Time of MovJ motions.
+
+        Args:
+            start: Start joint angles. Shape (..., 6). Unit: degree.
+            end: End joint angles. Shape (..., 6). Unit: degree.
+            v (float): Velocity ratio of the command. Unit: %. Default is 100.
+            a (float): Acceleration ratio of the command. Unit: %. Default is 100.
+            velJ (float): Joint velocity ratio. Unit: %. Default is None (model setting).
+            accJ (float): Joint acceleration ratio. Unit: %. Default is None (model setting).
+            speedFactor (float): Global speed ratio. Unit: %. Default is None (model setting).
+
+        Returns:
+            The motion times. Shape (...). Unit: s.
+
+        Example:
+            JointTime([0,0,0,0,0,0], [90,0,0,0,0,0])
+        """
+        (velocity, acceleration) = self.JointLimits(v, a, velJ, accJ, speedFactor)
+        distance = np.asarray(end, dtype=np.float64) - np.asarray(start, dtype=np.float64)
+        return self.Profile(distance, velocity, acceleration).max(axis=-1)
+
+    def LinearLimits(self, v=100, a=100, speed=0, velL=None, accL=None, speedFactor=None) -> tuple:
+        """
+        Get the effective TCP velocity and acceleration of linear motions. All arguments may be arrays, one value per motion.
+
+        Args:
+            v (float): Velocity ratio of the command. Unit: %. Default is 100.
+            a (float): Acceleration ratio of the command. Unit: %. Default is 100.
+            speed (float): Absolute target speed of the command. Replaces v if larger than 0. Unit: mm/s. Default is 0.
+            velL (float): Linear velocity ratio. Unit: %. Default is None (model setting).
+            accL (float): Linear acceleration ratio. Unit: %. Default is None (model setting).
+            speedFactor (float): Global speed ratio. Unit: %. Default is None (model setting).
+
+        Returns:
+            (velocity, acceleration, rotation velocity, rotation acceleration).
+
+        Example:
+            LinearLimits(50, 50)
+        """
+        velL = np.asarray(self.velL if velL is None else velL, dtype=np.float64) / 100
+        accL = np.asarray(self.accL if accL is None else accL, dtype=np.float64) / 100
+        scale = np.asarray(self.speedFactor if speedFactor is None else speedFactor, dtype=np.float64) / 100
+        ratio = np.asarray(v) / 100 * velL * scale
+        acceleration = np.asarray(a) / 100 * accL * scale ** 2
+        speed = np.asarray(speed, dtype=np.float64)
+        velocity = np.where(speed > 0, np.minimum(speed, self.linearVelocity) * scale, self.linearVelocity * ratio)
+        return (velocity, self.linearAcceleration * acceleration, self.rotationVelocity * ratio, self.rotationAcceleration * acceleration)
+
+    def LinearTime(self, distance, angle, v=100, a=100, speed=0, velL=None, accL=None, speedFactor=None):
+        """
+        Time of linear motions (MovL, Arc, Circle). All arguments may be arrays, one value per motion.
+
+        Args:
+            distance: Path length of the TCP. Unit: mm.
+            angle: Rotation of the TCP. Unit: degree.
+            v (float): Velocity ratio of the command. Unit: %. Default is 100.
+            a (float): Acceleration ratio of the command. Unit: %. Default is 100.
+            speed (float): Absolute target speed of the command. Replaces v if larger than 0. Unit: mm/s. Default is 0.
+            velL (float): Linear velocity ratio. Unit: %. Default is None (model setting).
+            accL (float): Linear acceleration ratio. Unit: %. Default is None (model setting).
+            speedFactor (float): Global speed ratio. Unit: %. Default is None (model setting).
+
+        Returns:
+            The motion times. Unit: s.
+
+        Example:
+            LinearTime(300, 0, v=50)
+        """
+        (velocity, acceleration, rotationVelocity, rotationAcceleration) = self.LinearLimits(v, a, speed, velL, accL, speedFactor)
+        return np.maximum(self.Profile(distance, velocity, acceleration), self.Profile(angle, rotationVelocity, rotationAcceleration))
+
+    def CostMatrix(self, joints, v:float=100, a:float=100):
+        """
+        MovJ times between all pairs of joint positions.
+
+        Args:
+            joints: Joint angles. Shape (N, 6). Unit: degree.
+            v (float): Velocity ratio of the command. Unit: %. Default is 100.
+            a (float): Acceleration ratio of the command. Unit: %. Default is 100.
+
+        Returns:
+            The motion times. Shape (N, N). Unit: s.
+
+        Example:
+            CostMatrix(joints)
+        """
+        joints = np.asarray(joints, dtype=np.float64)
+        return self.JointTime(joints[:, None, :], joints[None, :, :], v, a)
+
+
+# Class for optimizing the order of visited points
+
+class SequenceOptimizer:
+    """
+    Class ordering pick and place points to minimize the total MovJ travel time. A nearest-neighbour tour is improved with 2-opt and Or-opt moves on the time-cost matrix of a MotionModel.
+
+    Attributes:
+        model (MotionModel): The motion model for the travel times.
+        cost (ndarray): Cost matrix of the last optimization. Unit: s.
+        time (float): Total travel time of the last optimized sequence. Unit: s.
+    """
+
+    def __init__(self, model:MotionModel=None):
+        """
+        Constructor for the sequence optimizer.
+
+        Args:
+            model (MotionModel): The motion model for the travel times. Default is a MotionModel with default limits.
+        """
+        self.model = model if model is not None else MotionModel()
+        self.cost = None
+        self.time = None
+
+    @staticmethod
+    def Joints(robot:Dobot, poses, user:int=0, tool:int=0, chunk:int=50):
+        """
+        Get the joint angles of Cartesian poses with pipelined InverseKin commands.
+
+        Args:
+            robot (Dobot): The robot object.
+            poses: Poses x, y, z, rx, ry, rz. Shape (N, 6).
+            user (int): User coordinate system index. Default is 0.
+            tool (int): Tool coordinate system index. Default is 0.
+            chunk (int): Number of commands sent in one burst. Default is 50.
+
+        Returns:
+            The joint angles. Shape (N, 6).
+
+        Raises:
+            ValueError: If the inverse kinematics of a pose fails.
+
+        Example:
+            Joints(robot, tray.points)
+        """
+        poses = np.asarray(poses, dtype=np.float64).reshape(-1, 6)
+        commands = [f"InverseKin({X},{Y},{Z},{Rx},{Ry},{Rz},user={user},tool={tool},useJointNear=0,JointNear=)" for (X, Y, Z, Rx, Ry, Rz) in poses.tolist()]
+        joints = []
+        for i in range(0, len(commands), chunk):
+            for (command, response) in zip(commands[i:i + chunk], robot.SendCommands(commands[i:i + chunk])):
+                if response is None or response[0] != robot.ParseError(0):
+                    raise ValueError(f"{command} failed: {response}")
+                joints.append([float(value) for value in response[1].split(",")])
+        return np.array(joints).reshape(-1, 6)
+
+    def Optimize(self, joints, start:int=None, closed:bool=False, timeLimit:float=1.0) -> list:
+        """
+        Find a fast order to visit all points.
+
+        Args:
+            joints: Joint angles of the points. Shape (N, 6). Unit: degree.
+            start (int): Index of the point the sequence must start with, e.g. the current position. Default is None (any point).
+            closed (bool): Return to the first point at the end. Default is False.
+            timeLimit (float): Maximum time spent on improving the sequence. Unit: s. Default is 1.0.
+
+        Returns:
+            The indices of the points in visiting order.
+
+        Example:
+            order = Optimize(joints, start=0)
+        """
+        self.cost = self.model.CostMatrix(joints)
+        n = len(self.cost)
+        if n < 3:
+            order = list(range(n)) if start in (None, 0) else [start] + [i for i in range(n) if i != start]
+            self.time = self.Time(order, closed)
+            return order
+        if closed:
+            cost = self.cost
+        else:
+            # An open path is a closed tour through a dummy point without travel time
+            cost = np.zeros((n + 1, n + 1))
+            cost[:n, :n] = self.cost
+            if start is not None:
+                # Forces the dummy point next to the start point
+                cost[n, start] = cost[start, n] = -(self.cost.max() * n + 1)
+        tour = self.NearestNeighbour(cost, n if not closed else (start or 0))
+        deadline = time.perf_counter() + timeLimit
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = self.TwoOpt(cost, tour, deadline)
+            improved = self.OrOpt(cost, tour, deadline) or improved
+        tour = tour.tolist()
+        first = n if not closed else (start or 0)
+        tour = tour[tour.index(first):] + tour[:tour.index(first)]
+        if not closed:
+            tour = tour[1:]
+            if start is not None and tour[0] != start:
+                tour.reverse()
+        self.time = self.Time(tour, closed)
+        return tour
+
+    def Time(self, order:list, closed:bool=False) -> float:
+        """
+        Total travel time of a sequence on the last cost matrix.
+
+        Args:
+            order (list): The indices of the points in visiting order.
+            closed (bool): Include the return to the first point. Default is False.
+
+        Returns:
+            The travel time. Unit: s.
+
+        Example:
+            Time([0, 2, 1])
+        """
+        order = np.asarray(order)
+        if len(order) < 2:
+            return 0.0
+        end = np.roll(order, -1) if closed else order[1:]
+        return float(self.cost[order[:len(end)], end].sum())
+
+    @staticmethod
+    def NearestNeighbour(cost, start:int=0):
+        """
+        Build a tour by always moving to the closest unvisited point.
+
+        Args:
+            cost: Cost matrix. Shape (N, N).
+            start (int): First point of the tour. Default is 0.
+
+        Returns:
+            The tour.
+
+        Example:
+            NearestNeighbour(cost)
+        """
+        n = len(cost)
+        visited = np.zeros(n, dtype=bool)
+        tour = np.empty(n, dtype=np.int64)
+        current = start
+        for i in range(n):
+            tour[i] = current
+            visited[current] = True
+            if i < n - 1:
+                current = int(np.argmin(np.where(visited, np.inf, cost[current])))
+        return tour
+
+    @staticmethod
+    def TwoOpt(cost, tour, deadline:float=np.inf) -> bool:
+        """
+        Improve a closed tour in place by reversing sections while that makes it shorter.
+
+        Args:
+            cost: Cost matrix. Shape (N, N).
+            tour: The tour. Changed in place.
+            deadline (float): Time at which to stop (time.perf_counter()). Default is no limit.
+
+        Returns:
+            True if the tour was improved.
+
+        Example:
+            TwoOpt(cost, tour)
+        """
+        n = len(tour)
+        improved = False
+        for i in range(n - 2):
+            if time.perf_counter() > deadline:
+                break
+            # Candidate edges (tour[j], tour[j+1]) that do not touch edge (tour[i], tour[i+1])
+            j = np.arange(i + 2, n if i > 0 else n - 1)
+            (a, b) = (tour[i], tour[i + 1])
+            c = tour[j]
+            d = tour[(j + 1) % n]
+            delta = cost[a, c] + cost[b, d] - cost[a, b] - cost[c, d]
+            best = int(np.argmin(delta))
+            if delta[best] < -1e-9:
+                tour[i + 1:j[best] + 1] = tour[i + 1:j[best] + 1][::-1].copy()
+                improved = True
+        return improved
+
+    @staticmethod
+    def OrOpt(cost, tour, deadline:float=np.inf, length:int=3) -> bool:
+        """
+        Improve a closed tour in place by moving short segments to a better position, optionally reversed.
+
+        Args:
+            cost: Cost matrix. Shape (N, N).
+            tour: The tour. Changed in place.
+            deadline (float): Time at which to stop (time.perf_counter()). Default is no limit.
+            length (int): Maximum length of moved segments. Default is 3.
+
+        Returns:
+            True if the tour was improved.
+
+        Example:
+            OrOpt(cost, tour)
+        """
+        n = len(tour)
+        improved = False
+        for k in range(1, min(length, n - 3) + 1):
+            i = 1
+            while i + k <= n:
+                if time.perf_counter() > deadline:
+                    return improved
+                segment = tour[i:i + k]
+                (before, after) = (tour[i - 1], tour[(i + k) % n])
+                gain = cost[before, segment[0]] + cost[segment[-1], after] - cost[before, after]
+                rest = np.concatenate((tour[:i], tour[i + k:]))
+                (x, y) = (rest, np.roll(rest, -1))
+                forward = cost[x, segment[0]] + cost[segment[-1], y] - cost[x, y]
+                backward = cost[x, segment[-1]] + cost[segment[0], y] - cost[x, y]
+                # Inserting between before and after restores the current tour
+                forward[i - 1] = backward[i - 1] = np.inf
+                best = int(np.argmin(np.minimum(forward, backward)))
+                if min(forward[best], backward[best]) - gain < -1e-9:
+                    moved = segment if forward[best] <= backward[best] else segment[::-1]
+                    tour[:] = np.concatenate((rest[:best + 1], moved, rest[best + 1:]))
+                    improved = True
+                else:
+                    i += 1
+        return improved
+
+    @staticmethod
+    def Commands(points, order:list, mode:str="pose", parameters:str="") -> list:
+        """
+        Build MovJ commands for a sequence, ready for SendCommand() or SendCommands().
+
+        Args:
+            points: Poses or joint angles of the points. Shape (N, 6).
+            order (list): The indices of the points in visiting order.
+            mode (string): 'pose' or 'joint'. Default is 'pose'.
+            parameters (string): Additional parameters. Format: user={user},tool={tool},a={a},v={v},cp={cp}. Default is none.
+
+        Returns:
+            The MovJ commands.
+
+        Example:
+            Commands(tray.points, order, "pose", "v=50,cp=50")
+        """
+        points = np.asarray(points, dtype=np.float64)
+        suffix = f",{parameters}" if parameters else ""
+        return [f"MovJ({mode}={Dobot.FormatPoint(points[index])}{suffix})" for index in order]
+
+
+# Class for estimating the cycle time of motion commands
+
+class CycleTimeEstimator:
+    """
+    Class predicting the execution time of a list of motion commands without running the robot. Every motion is modelled with the trapezoidal profiles of a MotionModel; the profiles of the whole sequence are computed together. VelJ, AccJ, VelL, AccL and SpeedFactor commands in the list change the ratios of the following motions. Blending (cp, r) is not modelled, so the estimate is an upper bound for blended paths.
+
+    Motions between a pose and a joint target need the kinematics of the robot: pass a connected robot to resolve them with InverseKin and PositiveKin, pass offline kinematics functions, or give joint targets to MovJ and pose targets to linear motions. Joint angles and poses that belong together (the start state and every kinematics result) are remembered, so returning to a known point needs no kinematics.
+
+    Attributes:
+        model (MotionModel): The motion model.
+        robot (Dobot): Robot used for kinematics. None if no kinematics are available.
+        forward (callable): Offline forward kinematics, joints -> pose. None to use the robot.
+        inverse (callable): Offline inverse kinematics, (pose, joints near the solution or None) -> joints. None to use the robot.
+        known (list): Pairs of (joints, pose) that belong together.
+        joints (ndarray): Start joint angles of the next estimate. None if unknown.
+        pose (ndarray): Start pose of the next estimate. None if unknown.
+        scale (dict): Calibrated time factors. 'joint' and 'linear' -> factor.
+        overhead (float): Calibrated time added to every motion. Unit: s.
+    """
+
+    # Motion commands and their kind
+    motion_commands = {
+        'MovJ': 'joint',
+        'RelMovJTool': 'joint',
+        'RelMovJUser': 'joint',
+        'RelJointMovJ': 'joint',
+        'MovL': 'linear',
+        'RelMovLTool': 'linear',
+        'RelMovLUser': 'linear',
+        'Arc': 'linear',
+        'Circle': 'linear'
+    }
+
+    def __init__(self, model:MotionModel=None, robot:Dobot=None, joints=None, pose=None, forward=None, inverse=None):
+        """
+        Constructor for the cycle time estimator.
+
+        Args:
+            model (MotionModel): The motion model. Default is a MotionModel with default limits.
+            robot (Dobot): Connected robot used for kinematics. Default is None.
+            joints: Start joint angles. Default is None (read with GetAngle() if a robot is given).
+            pose: Start pose. Default is None (read with GetPose() if a robot is given).
+            forward (callable): Offline forward kinematics taking joint angles and returning the pose. Default is None.
+            inverse (callable): Offline inverse kinematics taking a pose and the joint angles near the solution (or None) and returning the joint angles. Default is None.
+        """
+        self.model = model if model is not None else MotionModel()
+        self.robot = robot
+        self.forward = forward
+        self.inverse = inverse
+        self.known = []
+        self.joints = None if joints is None else np.asarray(joints, dtype=np.float64)
+        self.pose = None if pose is None else np.asarray(pose, dtype=np.float64)
+        if robot is not None and self.joints is None and self.pose is None:
+            self.joints = self.Values(robot.GetAngle())
+        self.Remember(self.joints, self.pose)
+        self.scale = {'joint': 1.0, 'linear': 1.0}
+        self.overhead = 0.0
+
+    @staticmethod
+    def Parse(command:str) -> tuple:
+        """
+        Split a command string into its name, positional arguments and named parameters.
+
+        Args:
+            command (string): The command. Example: MovJ(pose={200,200,200,0,0,0},v=50)
+
+        Returns:
+            (name, arguments, parameters). Point arguments are (kind, values), e.g. ('pose', [200,200,200,0,0,0]).
+
+        Example:
+            Parse("MovL(pose={200,200,200,0,0,0},speed=100)")
+        """
+        command = command.strip().rstrip(";")
+        name = command[:command.index("(")].strip()
+        body = command[command.index("(") + 1:command.rindex(")")]
+        # Split at commas outside of curly brackets
+        tokens = []
+        (depth, token) = (0, "")
+        for char in body:
+            if char == "," and depth == 0:
+                tokens.append(token.strip())
+                token = ""
+                continue
+            depth += (char == "{") - (char == "}")
+            token += char
+        if token.strip():
+            tokens.append(token.strip())
+        arguments = []
+        parameters = {}
+        for token in tokens:
+            (key, _, value) = token.partition("=")
+            if value and value.strip().startswith("{"):
+                arguments.append((key.strip(), [float(v) for v in value.strip("{} ").split(",")]))
+            elif value:
+                parameters[key.strip()] = float(value)
+            elif token.startswith("{"):
+                arguments.append(("values", [float(v) for v in token.strip("{} ").split(",")]))
+            else:
+                arguments.append(float(token))
+        return (name, arguments, parameters)
+
+    @staticmethod
+    def Values(response) -> np.ndarray:
+        """
+        Get the numbers of a robot response.
+
+        Args:
+            response (tuple): The parsed response.
+
+        Returns:
+            The values.
+
+        Raises:
+            ValueError: If the robot reported an error.
+        """
+        if response is None or response[1] is None or not response[1]:
+            raise ValueError(f"Invalid response from robot: {response}")
+        return np.array([float(value) for value in response[1].split(",")])
+
+    @staticmethod
+    def Rotation(rx:float, ry:float, rz:float) -> np.ndarray:
+        """
+        Rotation matrix of an orientation given as Rx, Ry, Rz (rotations about the fixed X, Y and Z axes).
+
+        Args:
+            rx (float): Rotation around the X axis. Unit: degree.
+            ry (float): Rotation around the Y axis. Unit: degree.
+            rz (float): Rotation around the Z axis. Unit: degree.
+
+        Returns:
+            The 3x3 rotation matrix.
+        """
+        (a, b, c) = np.radians([rx, ry, rz])
+        x = np.array([[1, 0, 0], [0, np.cos(a), -np.sin(a)], [0, np.sin(a), np.cos(a)]])
+        y = np.array([[np.cos(b), 0, np.sin(b)], [0, 1, 0], [-np.sin(b), 0, np.cos(b)]])
+        z = np.array([[np.cos(c), -np.sin(c), 0], [np.sin(c), np.cos(c), 0], [0, 0, 1]])
+        return z @ y @ x
+
+    def Angle(self, start, end) -> float:
+        """
+        Rotation angle between two orientations.
+
+        Args:
+            start: Start pose. Shape (6,).
+            end: End pose. Shape (6,).
+
+        Returns:
+            The angle. Unit: degree.
+        """
+        relative = self.Rotation(*start[3:6]).T @ self.Rotation(*end[3:6])
+        return float(np.degrees(np.arccos(np.clip((np.trace(relative) - 1) / 2, -1, 1))))
+
+    @staticmethod
+    def ArcLength(start, middle, end, full:bool=False) -> float:
+        """
+        Length of the circular arc from start through middle to end.
+
+        Args:
+            start: Start point. Shape (3,).
+            middle: Middle point. Shape (3,).
+            end: End point. Shape (3,).
+            full (bool): Length of the full circle instead. Default is False.
+
+        Returns:
+            The length. Unit: mm.
+        """
+        (a, b) = (middle - start, end - start)
+        cross = np.linalg.norm(np.cross(a, b))
+        if cross < 1e-9:
+            return 0.0 if full else float(np.linalg.norm(b))
+        radius = np.linalg.norm(a) * np.linalg.norm(b) * np.linalg.norm(a - b) / (2 * cross)
+        if full:
+            return float(2 * np.pi * radius)
+        # The inscribed angle at the middle point spans the arc that does not contain it
+        (u, v) = (start - middle, end - middle)
+        inscribed = np.arccos(np.clip(u @ v / (np.linalg.norm(u) * np.linalg.norm(v)), -1, 1))
+        return float(radius * (2 * np.pi - 2 * inscribed))
+
+    def Remember(self, joints, pose) -> None:
+        """
+        Remember joint angles and a pose that belong together.
+
+        Args:
+            joints: The joint angles. Shape (6,). Nothing is remembered if None.
+            pose: The pose. Shape (6,). Nothing is remembered if None.
+
+        Returns:
+            None
+        """
+        if joints is not None and pose is not None and self.Known(joints, 0) is None:
+            self.known.append((np.asarray(joints, dtype=np.float64), np.asarray(pose, dtype=np.float64)))
+
+    def Known(self, values, index:int):
+        """
+        Look up a remembered pair.
+
+        Args:
+            values: Joint angles (index 0) or pose (index 1) to look up.
+            index (int): 0 to look up joint angles, 1 to look up a pose.
+
+        Returns:
+            The other half of the pair or None if unknown.
+        """
+        for pair in self.known:
+            if np.allclose(pair[index], values, atol=1e-6):
+                return pair[1 - index]
+        return None
+
+    def ForwardKin(self, joints):
+        """
+        Get the pose of joint angles from the remembered pairs, the offline kinematics or PositiveKin.
+
+        Args:
+            joints: The joint angles. Shape (6,).
+
+        Returns:
+            The pose. Shape (6,).
+
+        Raises:
+            ValueError: If no kinematics are available.
+        """
+        pose = self.Known(joints, 0)
+        if pose is None:
+            if self.forward is not None:
+                pose = np.asarray(self.forward(joints), dtype=np.float64)
+            elif self.robot is not None:
+                pose = self.Values(self.robot.PositiveKin(*joints.tolist()))
+            else:
+                raise ValueError("The pose after a joint motion is unknown. Give forward kinematics or a robot for PositiveKin.")
+            self.Remember(joints, pose)
+        return pose
+
+    def CurrentPose(self):
+        """
+        Get the current pose of the estimate, computed from the joint angles if only they are known.
+
+        Returns:
+            The pose. Shape (6,).
+
+        Raises:
+            ValueError: If the pose cannot be determined.
+        """
+        if self.pose is None:
+            if self.joints is None:
+                raise ValueError("The start pose is unknown. Give a start pose or joint angles.")
+            self.pose = self.ForwardKin(self.joints)
+        return self.pose
+
+    def CurrentJoints(self):
+        """
+        Get the current joint angles of the estimate, computed with InverseKin if only the pose is known.
+
+        Returns:
+            The joint angles. Shape (6,).
+
+        Raises:
+            ValueError: If the joint angles cannot be determined.
+        """
+        if self.joints is None:
+            self.joints = self.InverseKin(self.CurrentPose())
+        return self.joints
+
+    def InverseKin(self, pose):
+        """
+        Get the joint angles of a pose from the remembered pairs, the offline kinematics or InverseKin, using the current joint angles to select the solution.
+
+        Args:
+            pose: The pose. Shape (6,).
+
+        Returns:
+            The joint angles. Shape (6,).
+
+        Raises:
+            ValueError: If no kinematics are available.
+        """
+        joints = self.Known(pose, 1)
+        if joints is not None:
+            return joints
+        if self.inverse is not None:
+            joints = np.asarray(self.inverse(pose, self.joints), dtype=np.float64)
+        elif self.robot is not None:
+            near = Dobot.FormatPoint(self.joints) if self.joints is not None else ""
+            joints = self.Values(self.robot.InverseKin(*pose.tolist(), 1 if near else 0, near))
+        else:
+            raise ValueError("A pose target of a joint motion needs inverse kinematics or a robot for InverseKin. Give joint targets instead.")
+        self.Remember(joints, pose)
+        return joints
+
+    def Target(self, point) -> tuple:
+        """
+        Get the joint angles and pose of a point argument.
+
+        Args:
+            point (tuple): Point argument from Parse(). Example: ('pose', [200,200,200,0,0,0])
+
+        Returns:
+            (joints, pose). The unknown one is None.
+        """
+        (kind, values) = point
+        values = np.asarray(values, dtype=np.float64)
+        return (values, None) if kind == "joint" else (None, values)
+
+    def Segments(self, commands:list) -> dict:
+        """
+        Walk through the commands and collect the geometry and ratios of every motion.
+
+        Args:
+            commands (list): The command strings.
+
+        Returns:
+            Arrays of the motions: index, kind, start and end joints, distance, angle, v, a, speed and the ratios at the time of the motion.
+
+        Raises:
+            ValueError: If a motion needs kinematics that are not available.
+        """
+        ratios = {'VelJ': self.model.velJ, 'AccJ': self.model.accJ, 'VelL': self.model.velL, 'AccL': self.model.accL, 'SpeedFactor': self.model.speedFactor}
+        joint = {'index': [], 'start': [], 'end': [], 'v': [], 'a': [], 'VelJ': [], 'AccJ': [], 'SpeedFactor': []}
+        linear = {'index': [], 'distance': [], 'angle': [], 'v': [], 'a': [], 'speed': [], 'VelL': [], 'AccL': [], 'SpeedFactor': []}
+        for (index, command) in enumerate(commands):
+            (name, arguments, parameters) = self.Parse(command)
+            if name in ratios:
+                ratios[name] = arguments[0]
+                continue
+            kind = self.motion_commands.get(name)
+            if kind is None:
+                continue
+            if kind == 'joint':
+                start = self.CurrentJoints()
+                if name == 'MovJ':
+                    (end, pose) = self.Target(arguments[0])
+                    if end is None:
+                        end = self.InverseKin(pose)
+                elif name == 'RelJointMovJ':
+                    (end, pose) = (start + np.asarray(arguments[:6]), None)
+                else:
+                    pose = self.RelativePose(name, arguments)
+                    end = self.InverseKin(pose)
+                (self.joints, self.pose) = (end, pose)
+                group = joint
+                group['start'].append(start)
+                group['end'].append(end)
+                group['VelJ'].append(ratios['VelJ'])
+                group['AccJ'].append(ratios['AccJ'])
+            else:
+                start = self.CurrentPose()
+                if name in ('Arc', 'Circle'):
+                    middle = self.Target(arguments[0])[1]
+                    end = self.Target(arguments[1])[1]
+                    if middle is None or end is None:
+                        raise ValueError(f"{name} needs pose points: {command}")
+                    if name == 'Arc':
+                        (distance, angle) = (self.ArcLength(start[:3], middle[:3], end[:3]), self.Angle(start, end))
+                    else:
+                        count = arguments[2] if len(arguments) > 2 else 1
+                        (distance, angle, end) = (self.ArcLength(start[:3], middle[:3], end[:3], True) * count, 0.0, start)
+                elif name == 'MovL':
+                    (joints, end) = self.Target(arguments[0])
+                    if end is None:
+                        end = self.ForwardKin(joints)
+                    (distance, angle) = (float(np.linalg.norm(end[:3] - start[:3])), self.Angle(start, end))
+                else:
+                    end = self.RelativePose(name, arguments)
+                    (distance, angle) = (float(np.linalg.norm(np.asarray(arguments[:3]))), self.Angle(start, end))
+                (self.joints, self.pose) = (None, end)
+                group = linear
+                group['distance'].append(distance)
+                group['angle'].append(angle)
+                group['speed'].append(parameters.get('speed', 0))
+                group['VelL'].append(ratios['VelL'])
+                group['AccL'].append(ratios['AccL'])
+            group['index'].append(index)
+            group['v'].append(parameters.get('v', 100))
+            group['a'].append(parameters.get('a', 100))
+            group['SpeedFactor'].append(ratios['SpeedFactor'])
+        return {'joint': {key: np.array(values) for (key, values) in joint.items()}, 'linear': {key: np.array(values) for (key, values) in linear.items()}}
+
+    def RelativePose(self, name:str, arguments:list):
+        """
+        Get the target pose of a relative motion in the user or tool coordinate system.
+
+        Args:
+            name (string): Name of the command.
+            arguments (list): The offsets x, y, z, rx, ry, rz.
+
+        Returns:
+            The target pose. Shape (6,).
+        """
+        start = self.CurrentPose()
+        offset = np.asarray(arguments[:6], dtype=np.float64)
+        end = start + offset
+        if name.endswith('Tool'):
+            # Tool offsets are given in the orientation of the tool
+            end[:3] = start[:3] + self.Rotation(*start[3:6]) @ offset[:3]
+        return end
+
+    def Estimate(self, commands:list) -> np.ndarray:
+        """
+        Estimate the time of every command. Non-motion commands take no time. The start state is advanced to the end of the commands.
+
+        Args:
+            commands (list): The command strings.
+
+        Returns:
+            The time of every command. Unit: s.
+
+        Example:
+            Estimate(["MovJ(joint={0,0,0,0,0,0})", "MovL(pose={300,0,200,180,0,0},v=50)"])
+        """
+        segments = self.Segments(commands)
+        times = np.zeros(len(commands))
+        (joint, linear) = (segments['joint'], segments['linear'])
+        if len(joint['index']):
+            times[joint['index']] = self.model.JointTime(joint['start'], joint['end'], joint['v'], joint['a'], joint['VelJ'], joint['AccJ'], joint['SpeedFactor']) * self.scale['joint'] + self.overhead
+        if len(linear['index']):
+            times[linear['index']] = self.model.LinearTime(linear['distance'], linear['angle'], linear['v'], linear['a'], linear['speed'], linear['VelL'], linear['AccL'], linear['SpeedFactor']) * self.scale['linear'] + self.overhead
+        return times
+
+    def Total(self, commands:list) -> float:
+        """
+        Estimate the time of a sequence.
+
+        Args:
+            commands (list): The command strings.
+
+        Returns:
+            The estimated cycle time. Unit: s.
+
+        Example:
+            Total(commands)
+        """
+        return float(self.Estimate(commands).sum())
+
+    def Calibrate(self, commands:list, measured:list, joints=None, pose=None) -> dict:
+        """
+        Fit the time factors and the overhead per motion to measured times with least squares. Estimate() uses the result afterwards.
+
+        Args:
+            commands (list): The command strings that were executed.
+            measured (list): Measured time of every motion command in order, or the (command ID, time) pairs returned by Measure(). Unit: s.
+            joints: Start joint angles of the executed sequence. Default is None (current start state).
+            pose: Start pose of the executed sequence. Default is None (current start state).
+
+        Returns:
+            The fitted time factors and overhead.
+
+        Example:
+            Calibrate(commands, CycleTimeEstimator.Measure(replay.Replay()))
+        """
+        if joints is not None or pose is not None:
+            self.joints = None if joints is None else np.asarray(joints, dtype=np.float64)
+            self.pose = None if pose is None else np.asarray(pose, dtype=np.float64)
+            self.Remember(self.joints, self.pose)
+        (scale, overhead) = (self.scale, self.overhead)
+        (self.scale, self.overhead) = ({'joint': 1.0, 'linear': 1.0}, 0.0)
+        try:
+            times = self.Estimate(commands)
+        finally:
+            (self.scale, self.overhead) = (scale, overhead)
+        kinds = [self.motion_commands.get(self.Parse(command)[0]) for command in commands]
+        motions = [i for (i, kind) in enumerate(kinds) if kind is not None]
+        measured = np.array([entry[1] if isinstance(entry, (tuple, list)) else entry for entry in measured], dtype=np.float64)
+        if len(measured) != len(motions):
+            raise ValueError(f"Got {len(measured)} measured times for {len(motions)} motion commands.")
+        columns = [kind for kind in ('joint', 'linear') if kind in (kinds[i] for i in motions)]
+        matrix = np.array([[times[i] if kinds[i] == kind else 0.0 for kind in columns] + [1.0] for i in motions])
+        solution = np.linalg.lstsq(matrix, measured, rcond=None)[0]
+        for (kind, factor) in zip(columns, solution):
+            self.scale[kind] = float(factor)
+        self.overhead = float(solution[-1])
+        return {'scale': dict(self.scale), 'overhead': self.overhead}
+
+    @staticmethod
+    def Measure(frames) -> list:
+        """
+        Measure the time of every executed command from feedback frames, using the change of CurrentCommandID. The last command ends with the last frame, so the recording should stop when the program has finished.
+
+        Args:
+            frames: Feedback frames (FeedbackFrame, bytes or dictionaries), e.g. FeedbackReplay.Replay().
+
+        Returns:
+            List of (command ID, time) for every command within the frames. Unit: s.
+
+        Example:
+            Measure(replay.Replay())
+        """
+        durations = []
+        (current, started, stamp) = (None, None, None)
+        for frame in frames:
+            if not isinstance(frame, Mapping):
+                frame = FeedbackFrame(frame, cache=False)
+            (command, stamp) = (frame['CurrentCommandID'], frame['TimeStamp'])
+            if command != current:
+                if current is not None:
+                    durations.append((current, (stamp - started) / 1000))
+                (current, started) = (command, stamp)
+        if current is not None and stamp > started:
+            durations.append((current, (stamp - started) / 1000))
+        return durations
+
+
+# Class for choosing blend radii of motion sequences
+
+class BlendOptimizer:
+    """
+    Class choosing the blending (r for MovL, cp for MovJ) at every waypoint of a sequence to minimize the estimated cycle time while the path stays within a maximum deviation from each waypoint.
+
+    Model: a blend of radius r replaces the corner with a circular arc starting r before and ending r after the waypoint. For a turn angle θ the arc passes the waypoint at a distance of r·tan(θ/4) and is driven at most at the speed allowed by the acceleration on its radius. Blend zones of neighbouring waypoints may not overlap. The path is modelled in Cartesian space with the linear limits of the MotionModel, also for MovJ segments, and the orientation is ignored. For MovJ the cp ratio is assumed to blend over cp % of half the shorter neighbouring segment.
+
+    Attributes:
+        model (MotionModel): The motion model for the velocity and acceleration.
+        radii (ndarray): Blend radius of every waypoint of the last optimization. Unit: mm.
+        time (float): Estimated time of the last optimized sequence. Unit: s.
+        baseline (float): Estimated time of the last sequence without blending. Unit: s.
+    """
+
+    def __init__(self, model:MotionModel=None, candidates:int=16, passes:int=3):
+        """
+        Constructor for the blend optimizer.
+
+        Args:
+            model (MotionModel): The motion model. Default is a MotionModel with default limits.
+            candidates (int): Number of radii tried per waypoint and pass. Default is 16.
+            passes (int): Number of passes over all waypoints. Default is 3.
+        """
+        self.model = model if model is not None else MotionModel()
+        self.candidates = candidates
+        self.passes = passes
+        self.radii = None
+        self.time = None
+        self.baseline = None
+
+    @staticmethod
+    def Geometry(poses) -> tuple:
+        """
+        Get the segment lengths and turn angles of a waypoint sequence.
+
+        Args:
+            poses: Waypoint poses x, y, z, (rx, ry, rz). Shape (N, 3+).
+
+        Returns:
+            (lengths, angles). Segment lengths, shape (N-1,), unit: mm. Turn angle at every waypoint, shape (N,), zero at both ends, unit: rad.
+        """
+        points = np.asarray(poses, dtype=np.float64)[:, :3]
+        segments = np.diff(points, axis=0)
+        lengths = np.linalg.norm(segments, axis=1)
+        directions = segments / np.where(lengths > 0, lengths, 1)[:, None]
+        angles = np.zeros(len(points))
+        angles[1:-1] = np.arccos(np.clip(np.sum(directions[:-1] * directions[1:], axis=1), -1, 1))
+        return (lengths, angles)
+
+    def Time(self, lengths, angles, radii, v=100, a=100):
+        """
+        Estimate the time of a sequence for one or many sets of blend radii.
+
+        Args:
+            lengths: Segment lengths. Shape (N-1,). Unit: mm.
+            angles: Turn angle at every waypoint. Shape (N,). Unit: rad.
+            radii: Blend radius at every waypoint. Shape (N,) or (K, N). Unit: mm.
+            v (float): Velocity ratio of the commands. Unit: %. Default is 100.
+            a (float): Acceleration ratio of the commands. Unit: %. Default is 100.
+
+        Returns:
+            The estimated times. Shape () or (K,). Unit: s.
+        """
+        (velocity, acceleration, _, _) = self.model.LinearLimits(v, a)
+        single = np.ndim(radii) == 1
+        radii = np.atleast_2d(np.asarray(radii, dtype=np.float64))
+        half = np.tan(angles / 2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Radius and length of the circular blend arcs
+            curvature = np.where(half > 1e-9, radii / np.where(half > 1e-9, half, 1), np.inf)
+            arcs = np.where(half > 1e-9, curvature * angles, 2 * radii)
+        corner = np.where(radii > 0, np.minimum(velocity, np.sqrt(acceleration * curvature)), 0.0)
+        distance = lengths - radii[:, :-1] - radii[:, 1:] + arcs[:, :-1] / 2 + arcs[:, 1:] / 2
+        distance = np.maximum(distance, 0)
+        # Limit the corner speeds to what can be reached from the neighbouring corners
+        speed = corner.copy()
+        for i in range(1, speed.shape[1]):
+            speed[:, i] = np.minimum(speed[:, i], np.sqrt(speed[:, i - 1] ** 2 + 2 * acceleration * distance[:, i - 1]))
+        for i in range(speed.shape[1] - 2, -1, -1):
+            speed[:, i] = np.minimum(speed[:, i], np.sqrt(speed[:, i + 1] ** 2 + 2 * acceleration * distance[:, i]))
+        (start, end) = (speed[:, :-1], speed[:, 1:])
+        ramps = (2 * velocity ** 2 - start ** 2 - end ** 2) / (2 * acceleration)
+        peak = np.minimum(velocity, np.sqrt((2 * acceleration * distance + start ** 2 + end ** 2) / 2))
+        cruise = np.where(ramps <= distance, (distance - ramps) / velocity, 0.0)
+        times = ((2 * peak - start - end) / acceleration + cruise).sum(axis=1)
+        return times[0] if single else times
+
+    def Optimize(self, poses, tolerance, v=100, a=100) -> np.ndarray:
+        """
+        Choose the blend radius of every waypoint.
+
+        Args:
+            poses: Waypoint poses x, y, z, rx, ry, rz, including the start point. Shape (N, 6).
+            tolerance (float | list): Maximum allowed path deviation at every waypoint. Unit: mm.
+            v (float): Velocity ratio of the commands. Unit: %. Default is 100.
+            a (float): Acceleration ratio of the commands. Unit: %. Default is 100.
+
+        Returns:
+            The blend radius of every waypoint. Zero at the first and last waypoint. Unit: mm.
+
+        Example:
+            radii = Optimize(poses, 2.0)
+        """
+        (lengths, angles) = self.Geometry(poses)
+        n = len(angles)
+        tolerance = np.broadcast_to(np.asarray(tolerance, dtype=np.float64), (n,))
+        # Largest radius per waypoint within the tolerance and the neighbouring segments
+        limit = np.zeros(n)
+        if n > 2:
+            with np.errstate(divide='ignore'):
+                limit[1:-1] = np.minimum(np.where(angles[1:-1] > 1e-9, tolerance[1:-1] / np.tan(angles[1:-1] / 4), np.inf), np.minimum(lengths[:-1], lengths[1:]))
+        radii = limit.copy()
+        if n > 2:
+            radii[1:-1] = np.minimum(limit[1:-1], np.minimum(lengths[:-1], lengths[1:]) / 2)
+        self.baseline = float(self.Time(lengths, angles, np.zeros(n), v, a))
+        for _ in range(self.passes):
+            for i in range(1, n - 1):
+                upper = min(limit[i], lengths[i - 1] - radii[i - 1], lengths[i] - radii[i + 1])
+                candidates = np.tile(radii, (self.candidates, 1))
+                candidates[:, i] = np.linspace(0, max(upper, 0), self.candidates)
+                radii[i] = candidates[int(np.argmin(self.Time(lengths, angles, candidates, v, a))), i]
+        self.radii = radii
+        self.time = float(self.Time(lengths, angles, radii, v, a))
+        return radii
+
+    def Commands(self, poses, radii=None, kinds="MovL", parameters:str="") -> list:
+        """
+        Build the blended motion commands of a sequence, ready for SendCommand() or SendCommands().
+
+        Args:
+            poses: Waypoint poses x, y, z, rx, ry, rz, including the start point. Shape (N, 6).
+            radii: Blend radius of every waypoint. Default is None (result of the last Optimize()).
+            kinds (string | list): 'MovL' or 'MovJ' for every motion (N-1 values) or for all. Default is 'MovL'.
+            parameters (string): Additional parameters. Format: user={user},tool={tool},a={a},v={v}. Default is none.
+
+        Returns:
+            The motion commands to waypoints 2 to N, with r (MovL) or cp (MovJ).
+
+        Example:
+            Commands(poses, radii, "MovL", "v=80")
+        """
+        poses = np.asarray(poses, dtype=np.float64)
+        radii = self.radii if radii is None else np.asarray(radii, dtype=np.float64)
+        (lengths, _) = self.Geometry(poses)
+        kinds = [kinds] * (len(poses) - 1) if isinstance(kinds, str) else list(kinds)
+        suffix = f",{parameters}" if parameters else ""
+        commands = []
+        for i in range(1, len(poses)):
+            point = "pose=" + Dobot.FormatPoint(poses[i])
+            if kinds[i - 1] == "MovJ":
+                shorter = min(lengths[i - 1], lengths[i]) if i < len(poses) - 1 else 0
+                cp = int(np.clip(np.floor(100 * radii[i] / (shorter / 2)), 0, 100)) if shorter > 0 else 0
+                commands.append(f"MovJ({point}{suffix},cp={cp})")
+            else:
+                commands.append(f"MovL({point}{suffix},r={int(np.floor(radii[i]))})")
+        return commands
+
+
+# Class to receive feedback from the robot
+
+class Feedback:
+    """
+    Class to receive feedback from the robot.
+    """
+
+    # Size of one feedback frame in bytes
+    frameSize = 1440
+
+    # Feedback ports and their feedback period in ms
+    feedback_ports = {
+        30004: 8,       # Real-time feedback
+        30005: 200,     # Slow feedback
+        30006: 50       # Configurable feedback (default period)
+    }
+
+    def __init__(self, robot:Dobot, port=30004, period:float=None):
+        """
+        Constructor for the feedback class.
+
+        Args:
+            robot (DobotTCP): The robot object.
+            port (int): Port to receive feedback. Different ports have different feedback timings. See TCP protocol for details. Default is port 30004.
+            period (float): Feedback period of the port in ms. Only needed if the period of port 30006 was changed on the controller. Default is the period listed in feedback_ports.
+        """
+        self.robot = robot
+        self.port = port
+        self.period = period if period is not None else self.feedback_ports.get(port, 8)
+        self.client = None
+        self.data = {}
+        self.raw = None
+        self.received = 0
+        self.listeners = []
+        self.subscriptions = []
+        self.running = False
+        self.thread = None
+        self.error = None
+        self.decoder = FeedbackDecoder(self.frameSize)
+
+    def Connect(self) -> None:
+        """
+        Connect to the robot's feedback port.
+
+        Returns:
+            None
+
+        Example:
+            Connect()
+        """
+        self.client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.client.connect((self.robot.ip, self.port))
+        self.decoder.Reset()
+
+    def Get(self) -> None:
+        """
+        Get feedback from the robot. Data is stored in the data attribute.
+
+        Returns:
+            None
+
+        Example:
+            Get()
+        """
+        # Clear the buffer, keeping a partially received frame
+        self.client.setblocking(False)
+        try:
+            while True:
+                self.decoder.Receive(self.client)
+                while self.decoder.Next() is not None:
+                    pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        finally:
+            self.client.setblocking(True)
+        self.Read()
+
+    def Read(self) -> None:
+        """
+        Read the next complete feedback frame from the robot without flushing older frames. Use this instead of Get() when every frame is needed (e.g. for recording). Data is stored in the data attribute.
+
+        Returns:
+            None
+
+        Raises:
+            ConnectionError: If the feedback connection was closed by the robot.
+
+        Example:
+            Read()
+        """
+        rawdata = self.decoder.Next()
+        while rawdata is None:
+            self.decoder.Receive(self.client)
+            rawdata = self.decoder.Next()
+        self.Dispatch(rawdata)
+
+    def Dispatch(self, rawdata:bytes) -> None:
+        """
+        Store a raw feedback frame as a lazily decoded FeedbackFrame in the data attribute, evaluate all subscriptions and pass the frame on to all listeners.
+
+        Args:
+            rawdata (bytes): One raw feedback frame.
+
+        Returns:
+            None
+
+        Example:
+            Dispatch(rawdata)
+        """
+        self.raw = rawdata
+        self.data = FeedbackFrame(rawdata)
+        self.received = time.monotonic()
+        for subscription in self.subscriptions:
+            subscription.Check(self.data)
+        for entry in self.listeners:
+            (listener, interval, due) = entry
+            if interval:
+                # Decimate on the controller timestamp, keeping the average rate
+                stamp = self.data['TimeStamp']
+                if stamp < due - interval:
+                    # The timestamps went back (replay seek, controller reset), re-anchor
+                    entry[2] = stamp + interval
+                elif stamp < due - self.period / 2:
+                    continue
+                else:
+                    entry[2] = due + interval if stamp - due < interval else stamp + interval
+            try:
+                listener(rawdata)
+            except Exception as e:
+                # A failing listener must not stop the stream for the others
+                print(f"  Feedback listener error: {e}")
+
+    def AddListener(self, listener, rate:float=None) -> None:
+        """
+        Add a function that is called with the raw feedback frames received by Get() or Read(). Several listeners with different rates can share one feedback connection.
+
+        Args:
+            listener (callable): Function taking the raw frame (bytes) as its only argument.
+            rate (float): Desired rate in Hz. Frames are skipped so the listener is called at about this rate. Default is every frame.
+
+        Returns:
+            None
+
+        Example:
+            AddListener(recorder.Write)
+            AddListener(update_display, 20)
+        """
+        interval = 1000 / rate if rate else None
+        if interval is not None and interval <= self.period:
+            interval = None
+        self.listeners.append([listener, interval, 0])
+
+    def RemoveListener(self, listener) -> None:
+        """
+        Remove a previously added listener.
+
+        Args:
+            listener (callable): The listener to remove.
+
+        Returns:
+            None
+
+        Example:
+            RemoveListener(recorder.Write)
+        """
+        self.listeners = [entry for entry in self.listeners if entry[0] != listener]
+
+    @classmethod
+    def PortForRate(cls, rate:float=None) -> int:
+        """
+        Get the feedback port with the lowest rate that still delivers the desired rate.
+
+        Args:
+            rate (float): Desired rate in Hz. Default is the highest available rate.
+
+        Returns:
+            The feedback port.
+
+        Example:
+            PortForRate(20)
+        """
+        ports = sorted(cls.feedback_ports, key=cls.feedback_ports.get, reverse=True)
+        for port in ports:
+            if rate and cls.feedback_ports[port] <= 1000 / rate:
+                return port
+        return ports[-1]
+
+    def OnChange(self, key:str, callback, initial:bool=False, loop=None):
+        """
+        Subscribe to changes of a feedback field. Evaluated once per received frame.
+
+        Args:
+            key (string): Feedback field name. Example: 'RobotMode'
+            callback (callable or asyncio.Queue): Function called with a FeedbackEvent, or queue the event is put into.
+            initial (bool): Also trigger on the first received frame. Default is False.
+            loop (asyncio.AbstractEventLoop): Event loop of the queue. Default is the running loop when subscribing.
+
+        Returns:
+            The FeedbackSubscription.
+
+        Example:
+            OnChange('RobotMode', print)
+        """
+        return self.Subscribe(FeedbackSubscription(key, FeedbackSubscription.Change, callback, initial, loop))
+
+    def OnRising(self, key:str, callback, initial:bool=False, loop=None):
+        """
+        Subscribe to a feedback field becoming non-zero. Evaluated once per received frame.
+
+        Args:
+            key (string): Feedback field name. Example: 'CollisionState'
+            callback (callable or asyncio.Queue): Function called with a FeedbackEvent, or queue the event is put into.
+            initial (bool): Also trigger if the field is already non-zero in the first received frame. Default is False.
+            loop (asyncio.AbstractEventLoop): Event loop of the queue. Default is the running loop when subscribing.
+
+        Returns:
+            The FeedbackSubscription.
+
+        Example:
+            OnRising('CollisionState', on_collision)
+        """
+        return self.Subscribe(FeedbackSubscription(key, FeedbackSubscription.Rising, callback, initial, loop))
+
+    def OnFalling(self, key:str, callback, initial:bool=False, loop=None):
+        """
+        Subscribe to a feedback field becoming zero. Evaluated once per received frame.
+
+        Args:
+            key (string): Feedback field name. Example: 'EnableStatus'
+            callback (callable or asyncio.Queue): Function called with a FeedbackEvent, or queue the event is put into.
+            initial (bool): Also trigger if the field is already zero in the first received frame. Default is False.
+            loop (asyncio.AbstractEventLoop): Event loop of the queue. Default is the running loop when subscribing.
+
+        Returns:
+            The FeedbackSubscription.
+
+        Example:
+            OnFalling('EnableStatus', on_disabled)
+        """
+        return self.Subscribe(FeedbackSubscription(key, FeedbackSubscription.Falling, callback, initial, loop))
+
+    def OnCondition(self, key:str, predicate, callback, initial:bool=False, loop=None):
+        """
+        Subscribe to a condition on a feedback field becoming true. Evaluated once per received frame.
+
+        Args:
+            key (string): Feedback field name. Example: 'RobotMode'
+            predicate (callable): Function taking the field value and returning True or False.
+            callback (callable or asyncio.Queue): Function called with a FeedbackEvent, or queue the event is put into.
+            initial (bool): Also trigger if the condition is already true in the first received frame. Default is False.
+            loop (asyncio.AbstractEventLoop): Event loop of the queue. Default is the running loop when subscribing.
+
+        Returns:
+            The FeedbackSubscription.
+
+        Example:
+            OnCondition('RobotMode', lambda mode: mode in (9, 11), on_error)
+        """
+        return self.Subscribe(FeedbackSubscription(key, predicate, callback, initial, loop))
+
+    def Subscribe(self, subscription):
+        """
+        Add a subscription to be evaluated on every received frame.
+
+        Args:
+            subscription (FeedbackSubscription): The subscription.
+
+        Returns:
+            The subscription.
+
+        Example:
+            Subscribe(FeedbackSubscription('RobotMode', FeedbackSubscription.Change, print))
+        """
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def Unsubscribe(self, subscription) -> None:
+        """
+        Remove a subscription.
+
+        Args:
+            subscription (FeedbackSubscription): The subscription returned by OnChange, OnRising, OnFalling or OnCondition.
+
+        Returns:
+            None
+
+        Example:
+            Unsubscribe(subscription)
+        """
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+
+    def Start(self) -> None:
+        """
+        Start reading every feedback frame in a background thread. Subscriptions and listeners are called from this thread.
+
+        Returns:
+            None
+
+        Example:
+            Start()
+        """
+        if self.running:
+            return
+        self.running = True
+        self.error = None
+        self.thread = threading.Thread(target=self.Run, daemon=True)
+        self.thread.start()
+
+    def Run(self) -> None:
+        """
+        Read feedback frames until Stop() is called or the connection fails. The error is stored in the error attribute.
+
+        Returns:
+            None
+
+        Example:
+            Run()
+        """
+        try:
+            while self.running:
+                self.Read()
+        except Exception as e:
+            if self.running:
+                self.error = e
+                if self.robot is not None and self.robot.debugLevel > 0: print(f"  Feedback error: {e}")
+        finally:
+            self.running = False
+
+    def Stop(self) -> None:
+        """
+        Stop the background reading thread.
+
+        Returns:
+            None
+
+        Example:
+            Stop()
+        """
+        self.running = False
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(1)
+        self.thread = None
+
+    def ParseFeedback(self, data) -> dict:
+        """
+        Parse the feedback data from the robot.
+        
+        Args:
+            data (bytes): The feedback data from the robot.
+            
+        Returns:
+            A dictionary with the feedback data.
+        
+        Example:
+            ParseFeedback(data)
+        """
+        return FeedbackFrame(data, cache=False).ToDict()
+
+
+# Class to split the feedback stream into frames
+
+class FeedbackDecoder:
+    """
+    Class to split the feedback byte stream into frames. Data is received into a reusable buffer and every frame header is validated. After a misalignment the decoder resynchronizes by scanning for the next plausible header.
+
+    Attributes:
+        frames (int): Number of valid frames decoded.
+        dropped (int): Number of torn or misaligned frames that were discarded.
+        skipped (int): Number of bytes skipped while resynchronizing.
+        resyncs (int): Number of resynchronizations.
+        failures (int): Number of resynchronizations since the last valid frame.
+    """
+
+    # Byte offsets of the header fields used for validation
+    robotModeOffset = 24
+    timeStampOffset = 32
+    headerSize = 40
+
+    # Maximum plausible jump of the controller timestamp between frames in ms
+    maxTimeJump = 60000
+
+    # Resynchronizations without a valid frame after which the timestamp check is re-anchored, e.g. after a long gap or a controller clock change
+    maxFailures = 3
+
+    def __init__(self, frameSize:int=1440, capacity:int=16):
+        """
+        Constructor for the feedback decoder.
+
+        Args:
+            frameSize (int): Size of one frame in bytes. Default is 1440.
+            capacity (int): Size of the receive buffer in frames. Default is 16.
+        """
+        self.frameSize = frameSize
+        self.header = struct.pack('<H', frameSize)
+        self.buffer = bytearray(capacity * frameSize)
+        self.view = memoryview(self.buffer)
+        self.frames = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.resyncs = 0
+        self.Reset()
+
+    def Reset(self) -> None:
+        """
+        Discard all buffered data, e.g. after reconnecting. The counters are kept.
+
+        Returns:
+            None
+
+        Example:
+            Reset()
+        """
+        self.start = 0
+        self.end = 0
+        self.lastStamp = None
+        self.failures = 0
+
+    def Compact(self) -> None:
+        """
+        Move buffered data to the front of the buffer to make room for new data.
+
+        Returns:
+            None
+
+        Example:
+            Compact()
+        """
+        if self.start > 0:
+            length = self.end - self.start
+            self.view[:length] = self.view[self.start:self.end]
+            self.start = 0
+            self.end = length
+
+    def Receive(self, client) -> int:
+        """
+        Receive available data from a socket directly into the buffer.
+
+        Args:
+            client (socket): The feedback socket.
+
+        Returns:
+            The number of bytes received.
+
+        Raises:
+            ConnectionError: If the connection was closed.
+
+        Example:
+            Receive(feedback.client)
+        """
+        if self.end == len(self.buffer):
+            self.Compact()
+        count = client.recv_into(self.view[self.end:])
+        if count == 0:
+            raise ConnectionError("Feedback connection closed")
+        self.end += count
+        return count
+
+    def Feed(self, data:bytes) -> None:
+        """
+        Add received data to the buffer. Frames have to be taken with Next() before the buffer is full.
+
+        Args:
+            data (bytes): Received data.
+
+        Returns:
+            None
+
+        Example:
+            Feed(data)
+        """
+        if self.end + len(data) > len(self.buffer):
+            self.Compact()
+        if self.end + len(data) > len(self.buffer):
+            raise BufferError("Feedback decoder buffer is full")
+        self.view[self.end:self.end + len(data)] = data
+        self.end += len(data)
+
+    def Valid(self, offset:int) -> bool:
+        """
+        Check if a plausible frame header starts at a buffer offset.
+
+        Args:
+            offset (int): Buffer offset.
+
+        Returns:
+            True if the header is plausible.
+
+        Example:
+            Valid(0)
+        """
+        (size,) = struct.unpack_from('<H', self.buffer, offset)
+        (mode,) = struct.unpack_from('<Q', self.buffer, offset + self.robotModeOffset)
+        (stamp,) = struct.unpack_from('<Q', self.buffer, offset + self.timeStampOffset)
+        if size != self.frameSize or mode > max(Dobot.robot_modes):
+            return False
+        return self.lastStamp is None or abs(stamp - self.lastStamp) <= self.maxTimeJump
+
+    def Next(self):
+        """
+        Take the next complete frame from the buffer.
+
+        Returns:
+            The frame (bytes) or None if no complete frame is buffered.
+
+        Example:
+            Next()
+        """
+        while self.end - self.start >= self.headerSize:
+            if not self.Valid(self.start):
+                self.Resync()
+                continue
+            if self.end - self.start < self.frameSize:
+                return None
+            torn = self.Torn(self.start)
+            if torn != -1:
+                # The frame was cut off by the start of the next frame
+                self.resyncs += 1
+                self.dropped += 1
+                self.skipped += torn - self.start
+                self.start = torn
+                continue
+            frame = bytes(self.view[self.start:self.start + self.frameSize])
+            self.start += self.frameSize
+            self.frames += 1
+            self.failures = 0
+            (self.lastStamp,) = struct.unpack_from('<Q', frame, self.timeStampOffset)
+            return frame
+        return None
+
+    def Torn(self, offset:int) -> int:
+        """
+        Search a complete frame for the header of a following frame, which means the frame is torn. Only possible once a valid frame was decoded, because the check relies on the previous timestamp.
+
+        Args:
+            offset (int): Buffer offset of the frame.
+
+        Returns:
+            The offset of the embedded header or -1 if the frame is intact.
+
+        Example:
+            Torn(0)
+        """
+        if self.lastStamp is None:
+            return -1
+        stop = offset + self.frameSize
+        embedded = self.buffer.find(self.header, offset + 1, stop)
+        while embedded != -1 and embedded + self.headerSize <= self.end:
+            if self.Valid(embedded):
+                return embedded
+            embedded = self.buffer.find(self.header, embedded + 1, stop)
+        return -1
+
+    def Resync(self) -> None:
+        """
+        Skip to the next plausible frame header after a misalignment. The torn frame is counted as dropped. If no valid frame was found after maxFailures resynchronizations, the previous timestamp is forgotten so frames after a timestamp jump are accepted again.
+
+        Returns:
+            None
+
+        Example:
+            Resync()
+        """
+        self.resyncs += 1
+        self.dropped += 1
+        self.failures += 1
+        if self.failures > self.maxFailures:
+            self.lastStamp = None
+        offset = self.buffer.find(self.header, self.start + 1, self.end)
+        while offset != -1 and self.end - offset >= self.headerSize and not self.Valid(offset):
+            offset = self.buffer.find(self.header, offset + 1, self.end)
+        if offset == -1:
+            # Keep the last byte, it may be the first byte of a header
+            offset = max(self.start + 1, self.end - 1)
+        self.skipped += offset - self.start
+        self.start = offset
+
+
+# Class for lazily decoded feedback frames
+
+class FeedbackFrame(Mapping):
+    """
+    Read-only view of one raw feedback frame. Fields are decoded from the raw bytes only when they are accessed, using a precomputed offset table.
+
+    The frame behaves like the dictionary returned by Feedback.ParseFeedback (get, items, keys, [] access).
+    """
+
+    __slots__ = ('buffer', 'cache')
+
+    # Frame layout as (field name, struct format) based on the "Meaning" in the TCP protocol. Reserved bytes have no name.
+    layout = [
+        ('MessageSize', 'H'),                   # Message size (2 bytes)
+        (None, '6x'),                           # Reserved (6 bytes)
+        ('DigitalInputs', 'Q'),                 # Digital inputs (8 bytes)
+        ('DigitalOutputs', 'Q'),                # Digital outputs (8 bytes)
+        ('RobotMode', 'Q'),                     # Robot mode (8 bytes)
+        ('TimeStamp', 'Q'),                     # Timestamp in milliseconds (8 bytes)
+        ('RunTime', 'Q'),                       # Robot running time in milliseconds (8 bytes)
+        ('TestValue', 'Q'),                     # Memory test value (8 bytes)
+        (None, '8x'),                           # Reserved (8 bytes)
+        ('SpeedScaling', 'd'),                  # Speed scaling (8 bytes)
+        (None, '16x'),                          # Reserved (16 bytes)
+        ('VRobot', 'd'),                        # Robot voltage (8 bytes)
+        ('IRobot', 'd'),                        # Robot current (8 bytes)
+        ('ProgramState', 'd'),                  # Script running status (8 bytes)
+        ('SafetyIOIn', '2B'),                   # Safety IO input (2 bytes)
+        ('SafetyIOOut', '2B'),                  # Safety IO output (2 bytes)
+        (None, '76x'),                          # Reserved (76 bytes)
+        ('QTarget', '6d'),                      # Target joint position (6 doubles)
+        ('QDTarget', '6d'),                     # Target joint speed (6 doubles)
+        ('QDDTarget', '6d'),                    # Target joint acceleration (6 doubles)
+        ('ITarget', '6d'),                      # Target joint current (6 doubles)
+        ('MTarget', '6d'),                      # Target joint torque (6 doubles)
+        ('QActual', '6d'),                      # Actual joint position (6 doubles)
+        ('QDActual', '6d'),                     # Actual joint speed (6 doubles)
+        ('IActual', '6d'),                      # Actual joint current (6 doubles)
+        ('ActualTCPForce', '6d'),               # TCP actual force (6 doubles)
+        ('ToolVectorActual', '6d'),             # TCP actual Cartesian (6 doubles)
+        ('TCPSpeedActual', '6d'),               # TCP actual speed (6 doubles)
+        ('TCPForce', '6d'),                     # TCP force (6 doubles)
+        ('ToolVectorTarget', '6d'),             # TCP target Cartesian (6 doubles)
+        ('TCPSpeedTarget', '6d'),               # TCP target speed (6 doubles)
+        ('MotorTemperatures', '6d'),            # Joint temperatures (6 doubles)
+        ('JointModes', '6d'),                   # Joint modes (6 doubles)
+        ('VActual', '6d'),                      # Joint voltage (6 doubles)
+        (None, '4x'),                           # Reserved (4 bytes)
+        ('UserCoordinateSystem', 'B'),          # User coordinate system (1 byte)
+        ('ToolCoordinateSystem', 'B'),          # Tool coordinate system (1 byte)
+        ('RunQueuedCmd', 'B'),                  # Run queued command flag (1 byte)
+        ('PauseCmdFlag', 'B'),                  # Pause command flag (1 byte)
+        ('VelocityRatio', 'B'),                 # Joint velocity ratio (1 byte)
+        ('AccelerationRatio', 'B'),             # Joint acceleration ratio (1 byte)
+        (None, '1x'),                           # Reserved (1 byte)
+        ('XYZVelocityRatio', 'B'),              # Cartesian velocity ratio (1 byte)
+        ('RVelocityRatio', 'B'),                # Cartesian posture speed ratio (1 byte)
+        ('XYZAccelerationRatio', 'B'),          # Cartesian acceleration ratio (1 byte)
+        ('RAccelerationRatio', 'B'),            # Cartesian posture acceleration ratio (1 byte)
+        ('BrakeStatus', 'B'),                   # Brake status (1 byte)
+        ('EnableStatus', 'B'),                  # Enable status (1 byte)
+        ('DragStatus', 'B'),                    # Drag status (1 byte)
+        ('RunningStatus', 'B'),                 # Running status (1 byte)
+        ('ErrorStatus', 'B'),                   # Error status (1 byte)
+        ('JogStatus', 'B'),                     # Jog status (1 byte)
+        ('RobotType', 'B'),                     # Robot type (1 byte)
+        ('DragButtonSignal', 'B'),              # Drag button signal (1 byte)
+        ('EnableButtonSignal', 'B'),            # Enable button signal (1 byte)
+        ('RecordButtonSignal', 'B'),            # Record button signal (1 byte)
+        ('ReappearButtonSignal', 'B'),          # Playback signal (1 byte)
+        ('JawButtonSignal', 'B'),               # Gripper control signal (1 byte)
+        ('SixForceOnline', 'B'),                # Six-axis force sensor status (1 byte)
+        ('CollisionState', 'B'),                # Collision state (1 byte)
+        ('ArmApproachState', 'B'),              # Forearm approach pause (1 byte)
+        ('J4ApproachState', 'B'),               # J4 approach pause (1 byte)
+        ('J5ApproachState', 'B'),               # J5 approach pause (1 byte)
+        ('J6ApproachState', 'B'),               # J6 approach pause (1 byte)
+        (None, '61x'),                          # Reserved (61 bytes)
+        ('ZAxisJitter', 'd'),                   # Z-axis jitter displacement (8 bytes)
+        ('CurrentCommandID', 'Q'),              # Current command ID (8 bytes)
+        ('ActualTorque', '6d'),                 # Actual torque (6 doubles)
+        ('Payload', 'd'),                       # Payload (8 bytes)
+        ('CenterX', 'd'),                       # Eccentric X (8 bytes)
+        ('CenterY', 'd'),                       # Eccentric Y (8 bytes)
+        ('CenterZ', 'd'),                       # Eccentric Z (8 bytes)
+        ('UserCoordinates', '6d'),              # User coordinates (6 doubles)
+        ('ToolCoordinates', '6d'),              # Tool coordinates (6 doubles)
+        (None, '8x'),                           # Reserved (8 bytes)
+        ('SixAxisForce', '6d'),                 # Six-axis force (6 doubles)
+        ('TargetQuaternion', '4d'),             # Target quaternion (4 doubles)
+        ('ActualQuaternion', '4d'),             # Actual quaternion (4 doubles)
+        ('AutoManualMode', '2B'),               # Manual/Automatic mode (2 bytes)
+        ('ExportStatus', 'H'),                  # USB export status (2 bytes)
+        ('SafetyStatus', 'B'),                  # Safety status (1 byte)
+    ]
+
+    # NumPy types of the struct formats
+    numpy_types = {'B': 'u1', 'H': '<u2', 'Q': '<u8', 'd': '<f8'}
+
+    # Offset table: field name -> (byte offset, struct, single value) and the matching NumPy structured type
+    fields = {}
+    size = 0
+    columns = {'names': [], 'formats': [], 'offsets': []}
+    for (name, fmt) in layout:
+        if name is not None:
+            unpacker = struct.Struct('<' + fmt)
+            fields[name] = (size, unpacker, len(unpacker.unpack(bytes(unpacker.size))) == 1)
+            columns['names'].append(name)
+            columns['formats'].append((numpy_types[fmt[-1]], (int(fmt[:-1]),)) if len(fmt) > 1 else numpy_types[fmt])
+            columns['offsets'].append(size)
+        size += struct.calcsize('<' + fmt)
+    dtype = np.dtype(dict(columns, itemsize=Feedback.frameSize))
+    del name, fmt, unpacker, columns
+
+    def __init__(self, data, cache:bool=True):
+        """
+        Constructor for the feedback frame.
+
+        Args:
+            data (bytes): One raw feedback frame. The bytes are referenced, not copied, and must not be modified afterwards.
+            cache (bool): Keep decoded fields so repeated access does not decode again. Default is True.
+        """
+        self.buffer = memoryview(data)
+        self.cache = {} if cache else None
+
+    def __getitem__(self, key):
+        if self.cache is not None and key in self.cache:
+            return self.cache[key]
+        (offset, unpacker, single) = self.fields[key]
+        value = unpacker.unpack_from(self.buffer, offset)
+        value = value[0] if single else list(value)
+        if self.cache is not None:
+            self.cache[key] = value
+        return value
+
+    def __contains__(self, key):
+        return key in self.fields
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def __repr__(self):
+        return f"FeedbackFrame(TimeStamp={self['TimeStamp']}, RobotMode={self['RobotMode']})"
+
+    def DI(self, index:int) -> int:
+        """
+        Get a digital input from the DigitalInputs field.
+
+        Args:
+            index (int): Digital input index. Range: [1,64]
+
+        Returns:
+            The digital input status. 0: no signal, 1: signal.
+
+        Example:
+            DI(1)
+        """
+        return (self['DigitalInputs'] >> (index - 1)) & 1
+
+    def DO(self, index:int) -> int:
+        """
+        Get a digital output from the DigitalOutputs field.
+
+        Args:
+            index (int): Digital output index. Range: [1,64]
+
+        Returns:
+            The digital output status. 0: OFF, 1: ON.
+
+        Example:
+            DO(1)
+        """
+        return (self['DigitalOutputs'] >> (index - 1)) & 1
+
+    @staticmethod
+    def DecodeBits(values):
+        """
+        Decode 64-bit IO words into bits, vectorized over many frames.
+
+        Args:
+            values (array): DigitalInputs or DigitalOutputs values, e.g. ToArray(rawframes)['DigitalInputs'].
+
+        Returns:
+            A boolean array of shape (N, 64). Column k is IO index k+1.
+
+        Example:
+            DecodeBits(FeedbackFrame.ToArray(rawframes)['DigitalInputs'])[:, 0]
+        """
+        words = np.ascontiguousarray(values, dtype='<u8').reshape(-1)
+        return np.unpackbits(words.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little').astype(bool)
+
+    @classmethod
+    def ToArray(cls, data):
+        """
+        Decode many raw frames at once.
+
+        Args:
+            data (bytes): Raw feedback frames stored back to back.
+
+        Returns:
+            A NumPy structured array with one record per frame and one column per field.
+
+        Example:
+            ToArray(rawframes)['QActual']
+        """
+        return np.frombuffer(data, dtype=cls.dtype, count=len(data) // Feedback.frameSize)
+
+    def ToDict(self) -> dict:
+        """
+        Decode all fields.
+
+        Returns:
+            A dictionary with the feedback data.
+
+        Example:
+            ToDict()
+        """
+        return {key: self[key] for key in self.fields}
+
+
+# Classes for feedback subscriptions
+
+class FeedbackEvent:
+    """
+    Class describing a triggered feedback subscription.
+
+    Attributes:
+        key (string): Feedback field name.
+        old: Field value in the previous frame. None for the first frame.
+        new: Field value in the current frame.
+        frame (FeedbackFrame): The frame that triggered the event.
+    """
+
+    __slots__ = ('key', 'old', 'new', 'frame')
+
+    def __init__(self, key:str, old, new, frame):
+        self.key = key
+        self.old = old
+        self.new = new
+        self.frame = frame
+
+    def __repr__(self):
+        return f"FeedbackEvent({self.key}: {self.old} -> {self.new})"
+
+
+class FeedbackSubscription:
+    """
+    Class for an edge-triggered subscription on one feedback field. The field offset and decoder are looked up once, so every frame only costs one unpack and one comparison.
+
+    Attributes:
+        errors (int): Number of exceptions raised by the callback.
+        error (Exception): The last exception raised by the callback. None if there was none.
+    """
+
+    __slots__ = ('key', 'offset', 'unpacker', 'single', 'trigger', 'edge', 'neutral', 'callback', 'loop', 'initial', 'last', 'active', 'errors', 'error')
+
+    # Triggers: function of (old value, new value) -> bool
+    @staticmethod
+    def Change(old, new) -> bool:
+        return old != new
+
+    @staticmethod
+    def Rising(old, new) -> bool:
+        return bool(new) and not old
+
+    @staticmethod
+    def Falling(old, new) -> bool:
+        return bool(old) and not new
+
+    def __init__(self, key:str, trigger, callback, initial:bool=False, loop=None):
+        """
+        Constructor for the feedback subscription.
+
+        Args:
+            key (string): Feedback field name.
+            trigger (callable): Change, Rising, Falling or a predicate taking the field value. A predicate triggers when it becomes true.
+            callback (callable or asyncio.Queue): Function called with a FeedbackEvent, or queue the event is put into.
+            initial (bool): Also trigger on the first received frame if the field is already in the triggering state. Default is False.
+            loop (asyncio.AbstractEventLoop): Event loop of the queue. Default is the running loop when subscribing.
+
+        Raises:
+            KeyError: If the field does not exist.
+        """
+        (self.offset, self.unpacker, self.single) = FeedbackFrame.fields[key]
+        self.key = key
+        self.trigger = trigger
+        self.edge = trigger in (FeedbackSubscription.Change, FeedbackSubscription.Rising, FeedbackSubscription.Falling)
+        # Previous value assumed for the first frame
+        self.neutral = {FeedbackSubscription.Rising: 0, FeedbackSubscription.Falling: 1}.get(trigger)
+        self.callback = callback
+        self.initial = initial
+        self.last = None
+        self.active = False
+        self.errors = 0
+        self.error = None
+        self.loop = loop
+        if isinstance(callback, asyncio.Queue) and loop is None:
+            self.loop = asyncio.get_running_loop()
+
+    def Check(self, frame) -> None:
+        """
+        Evaluate the subscription on a frame and dispatch an event if it triggers.
+
+        Args:
+            frame (FeedbackFrame): The received frame.
+
+        Returns:
+            None
+
+        Example:
+            Check(feedback.data)
+        """
+        value = self.unpacker.unpack_from(frame.buffer, self.offset)
+        value = value[0] if self.single else list(value)
+        old = self.last
+        self.last = value
+        if self.edge:
+            if old is None:
+                fired = self.initial and self.trigger(self.neutral, value)
+            else:
+                fired = self.trigger(old, value)
+        else:
+            active = bool(self.trigger(value))
+            fired = active and not self.active and (self.initial or old is not None)
+            self.active = active
+        if fired:
+            self.Notify(FeedbackEvent(self.key, old, value, frame))
+
+    def Notify(self, event) -> None:
+        """
+        Pass an event to the callback or queue. An exception of the callback is printed and stored in the error attribute, so it does not stop the feedback stream for the other subscriptions and listeners.
+
+        Args:
+            event (FeedbackEvent): The event.
+
+        Returns:
+            None
+
+        Example:
+            Notify(event)
+        """
+        try:
+            if self.loop is not None:
+                self.loop.call_soon_threadsafe(self.callback.put_nowait, event)
+            else:
+                self.callback(event)
+        except Exception as e:
+            self.errors += 1
+            self.error = e
+            print(f"  Feedback subscription error ({self.key}): {e}")
+
+
+# Class to record feedback frames to a file
+
+class FeedbackRecorder:
+    """
+    Class to record raw feedback frames to a preallocated, memory-mapped file.
+
+    The frames are stored back to back in the data file. A side index file (<path>.idx) holds the controller TimeStamp of every frame. The position of a timestamp in the index is the position of its frame in the data file.
+    """
+
+    # Index file header: magic, frame size, number of recorded frames
+    indexHeader = struct.Struct('<4sIQ')
+    indexMagic = b'DFBI'
+
+    # Byte offset of the TimeStamp field in a feedback frame
+    timeStampOffset = FeedbackFrame.fields['TimeStamp'][0]
+
+    def __init__(self, path:str, capacity:int=450000):
+        """
+        Constructor for the feedback recorder.
+
+        Args:
+            path (string): Path of the data file. The index is stored next to it as <path>.idx.
+            capacity (int): Number of frames to preallocate. The files grow automatically when full. Default is 450000 (1 hour at 8 ms).
+        """
+        self.path = path
+        self.indexPath = path + ".idx"
+        self.capacity = capacity
+        self.frameSize = Feedback.frameSize
+        self.count = 0
+        self.dataFile = None
+        self.indexFile = None
+        self.dataMap = None
+        self.indexMap = None
+
+    def Open(self) -> None:
+        """
+        Create (or overwrite) the data and index files and map them into memory.
+
+        Returns:
+            None
+
+        Example:
+            Open()
+        """
+        self.count = 0
+        self.dataFile = open(self.path, "w+b")
+        self.indexFile = open(self.indexPath, "w+b")
+        self.Map()
+
+    def Map(self) -> None:
+        """
+        Resize the files to the current capacity and map them into memory.
+
+        Returns:
+            None
+
+        Example:
+            Map()
+        """
+        self.dataFile.truncate(self.capacity * self.frameSize)
+        self.indexFile.truncate(self.indexHeader.size + self.capacity * 8)
+        self.dataMap = mmap.mmap(self.dataFile.fileno(), 0)
+        self.indexMap = mmap.mmap(self.indexFile.fileno(), 0)
+        self.indexHeader.pack_into(self.indexMap, 0, self.indexMagic, self.frameSize, self.count)
+
+    def Unmap(self) -> None:
+        """
+        Flush and unmap the data and index files.
+
+        Returns:
+            None
+
+        Example:
+            Unmap()
+        """
+        for mapping in (self.dataMap, self.indexMap):
+            if mapping is not None:
+                mapping.flush()
+                mapping.close()
+        self.dataMap = None
+        self.indexMap = None
+
+    def Write(self, frame:bytes) -> None:
+        """
+        Append one raw feedback frame. Can be added directly as a listener to a Feedback object.
+
+        Args:
+            frame (bytes): One raw feedback frame.
+
+        Returns:
+            None
+
+        Example:
+            feedback.AddListener(recorder.Write)
+        """
+        if len(frame) != self.frameSize:
+            raise ValueError(f"Feedback frame has {len(frame)} bytes, expected {self.frameSize}")
+        if self.count == self.capacity:
+            self.Unmap()
+            self.capacity *= 2
+            self.Map()
+        offset = self.count * self.frameSize
+        self.dataMap[offset:offset + self.frameSize] = frame
+        timestamp = struct.unpack_from('<Q', frame, self.timeStampOffset)[0]
+        struct.pack_into('<Q', self.indexMap, self.indexHeader.size + self.count * 8, timestamp)
+        self.count += 1
+        self.indexHeader.pack_into(self.indexMap, 0, self.indexMagic, self.frameSize, self.count)
+
+    def Flush(self) -> None:
+        """
+        Flush recorded frames to disk.
+
+        Returns:
+            None
+
+        Example:
+            Flush()
+        """
+        if self.dataMap is not None:
+            self.dataMap.flush()
+            self.indexMap.flush()
+
+    def Close(self) -> None:
+        """
+        Flush the recording and shrink the files to the recorded size.
+
+        Returns:
+            None
+
+        Example:
+            Close()
+        """
+        if self.dataFile is None:
+            return
+        self.Unmap()
+        self.dataFile.truncate(self.count * self.frameSize)
+        self.indexFile.truncate(self.indexHeader.size + self.count * 8)
+        self.dataFile.close()
+        self.indexFile.close()
+        self.dataFile = None
+        self.indexFile = None
+
+
+# Class to replay recorded feedback frames
+
+class FeedbackReplay(Feedback):
+    """
+    Class to replay feedback frames recorded by FeedbackRecorder. Provides the same interface as Feedback (Connect, Get, Read, data, listeners).
+    """
+
+    def __init__(self, path:str, speed:float=1.0):
+        """
+        Constructor for the feedback replay.
+
+        Args:
+            path (string): Path of the recorded data file.
+            speed (float): Replay speed multiplier. 1.0 is real time, 0 replays as fast as possible. Default is 1.0.
+        """
+        super().__init__(None, None)
+        self.path = path
+        self.indexPath = path + ".idx"
+        self.speed = speed
+        self.count = 0
+        self.position = 0
+        self.dataFile = None
+        self.indexFile = None
+        self.dataMap = None
+        self.indexMap = None
+        self.startClock = None
+        self.startStamp = None
+
+    def Connect(self) -> None:
+        """
+        Open and memory-map the recording.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the index file is not a feedback recording index.
+
+        Example:
+            Connect()
+        """
+        self.dataFile = open(self.path, "rb")
+        self.indexFile = open(self.indexPath, "rb")
+        self.indexMap = mmap.mmap(self.indexFile.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, frameSize, count) = FeedbackRecorder.indexHeader.unpack_from(self.indexMap, 0)
+        if magic != FeedbackRecorder.indexMagic or frameSize != self.frameSize:
+            raise ValueError(f"{self.indexPath} is not a feedback recording index")
+        self.count = count
+        self.position = 0
+        if count > 0:
+            self.dataMap = mmap.mmap(self.dataFile.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def Disconnect(self) -> None:
+        """
+        Close the recording.
+
+        Returns:
+            None
+
+        Example:
+            Disconnect()
+        """
+        for mapping in (self.dataMap, self.indexMap):
+            if mapping is not None:
+                mapping.close()
+        for file in (self.dataFile, self.indexFile):
+            if file is not None:
+                file.close()
+        self.dataMap = None
+        self.indexMap = None
+        self.dataFile = None
+        self.indexFile = None
+
+    def TimeStamp(self, index:int) -> int:
+        """
+        Get the controller timestamp of a recorded frame.
+
+        Args:
+            index (int): Frame index.
+
+        Returns:
+            The controller timestamp in milliseconds.
+
+        Example:
+            TimeStamp(0)
+        """
+        return struct.unpack_from('<Q', self.indexMap, FeedbackRecorder.indexHeader.size + index * 8)[0]
+
+    def Frame(self, index:int) -> bytes:
+        """
+        Get a recorded raw frame.
+
+        Args:
+            index (int): Frame index.
+
+        Returns:
+            The raw feedback frame.
+
+        Example:
+            Frame(0)
+        """
+        offset = index * self.frameSize
+        return self.dataMap[offset:offset + self.frameSize]
+
+    def Find(self, start:int=None, end:int=None) -> tuple[int, int]:
+        """
+        Find the frames within a time range by binary search on the index.
+
+        Args:
+            start (int): First controller timestamp (inclusive). Default is the start of the recording.
+            end (int): Last controller timestamp (inclusive). Default is the end of the recording.
+
+        Returns:
+            The index range (first, stop) of the matching frames. stop is exclusive.
+
+        Example:
+            Find(1737100000000, 1737100060000)
+        """
+        first = 0 if start is None else bisect.bisect_left(range(self.count), start, key=self.TimeStamp)
+        stop = self.count if end is None else bisect.bisect_right(range(self.count), end, key=self.TimeStamp)
+        return first, stop
+
+    def Seek(self, timestamp:int) -> int:
+        """
+        Move the replay position to the first frame at or after a controller timestamp.
+
+        Args:
+            timestamp (int): Controller timestamp in milliseconds.
+
+        Returns:
+            The new frame index.
+
+        Example:
+            Seek(1737100000000)
+        """
+        (self.position, _) = self.Find(timestamp)
+        self.startClock = None
+        return self.position
+
+    def Get(self) -> None:
+        """
+        Replay the next recorded frame. Waits according to the replay speed. Data is stored in the data attribute.
+
+        Returns:
+            None
+
+        Raises:
+            EOFError: If the end of the recording is reached.
+
+        Example:
+            Get()
+        """
+        if self.position >= self.count:
+            raise EOFError("End of feedback recording")
+        self.Pace(self.TimeStamp(self.position))
+        frame = self.Frame(self.position)
+        self.position += 1
+        self.Dispatch(frame)
+
+    def Read(self) -> None:
+        """
+        Replay the next recorded frame. Same as Get() for a replay.
+
+        Returns:
+            None
+
+        Example:
+            Read()
+        """
+        self.Get()
+
+    def Replay(self, start:int=None, end:int=None):
+        """
+        Replay all frames within a time range.
+
+        Args:
+            start (int): First controller timestamp (inclusive). Default is the start of the recording.
+            end (int): Last controller timestamp (inclusive). Default is the end of the recording.
+
+        Returns:
+            A generator yielding the parsed data of every replayed frame.
+
+        Example:
+            for data in Replay(start, end): print(data['QActual'])
+        """
+        (self.position, stop) = self.Find(start, end)
+        self.startClock = None
+        while self.position < stop:
+            self.Get()
+            yield self.data
+
+    def Pace(self, timestamp:int) -> None:
+        """
+        Wait until a frame is due according to the replay speed.
+
+        Args:
+            timestamp (int): Controller timestamp of the next frame.
+
+        Returns:
+            None
+
+        Example:
+            Pace(1737100000008)
+        """
+        if not self.speed:
+            return
+        if self.startClock is None:
+            self.startClock = time.monotonic()
+            self.startStamp = timestamp
+            return
+        delay = self.startClock + (timestamp - self.startStamp) / 1000 / self.speed - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+# Class for rolling statistics over feedback fields
+
+class FeedbackStatistics:
+    """
+    Class for incremental statistics over feedback fields. Keeps mean and variance (Welford), min, max, an exponentially weighted moving average and a fixed window for percentiles.
+
+    All fields are packed into one vector, so an update costs a few NumPy operations per frame regardless of the number of fields.
+    """
+
+    # Derived fields: name -> (width, function of a FeedbackFrame)
+    derived_fields = {
+        'TrackingError': (6, lambda frame: np.subtract(frame['QTarget'], frame['QActual'])),
+    }
+
+    def __init__(self, fields:list=None, alpha:float=0.05, window:int=1000):
+        """
+        Constructor for the feedback statistics.
+
+        Args:
+            fields (list): Feedback field names or derived field names. Default is IActual, MotorTemperatures, VRobot, IRobot and TrackingError (QTarget - QActual).
+            alpha (float): Smoothing factor of the moving average. Range: (0,1]. Default is 0.05.
+            window (int): Number of most recent frames kept for percentiles. Default is 1000 (8 s at 8 ms).
+        """
+        self.fields = fields if fields is not None else ['IActual', 'MotorTemperatures', 'VRobot', 'IRobot', 'TrackingError']
+        self.alpha = alpha
+        self.window = window
+        self.slices = {}
+        width = 0
+        for key in self.fields:
+            if key in self.derived_fields:
+                size = self.derived_fields[key][0]
+            else:
+                (_, unpacker, single) = FeedbackFrame.fields[key]
+                size = 1 if single else len(unpacker.unpack(bytes(unpacker.size)))
+            self.slices[key] = slice(width, width + size)
+            width += size
+        self.width = width
+        self.values = np.zeros(width)
+        self.lock = threading.RLock()
+        self.Reset()
+
+    def Reset(self) -> None:
+        """
+        Clear all statistics.
+
+        Returns:
+            None
+
+        Example:
+            Reset()
+        """
+        with self.lock:
+            self.count = 0
+            self.mean = np.zeros(self.width)
+            self.m2 = np.zeros(self.width)
+            self.min = np.full(self.width, np.inf)
+            self.max = np.full(self.width, -np.inf)
+            self.ewma = np.zeros(self.width)
+            self.history = np.zeros((self.window, self.width))
+            self.position = 0
+
+    def Update(self, frame) -> None:
+        """
+        Add one feedback frame. Can be added directly as a listener to a Feedback object.
+
+        Args:
+            frame (bytes or FeedbackFrame): One raw or decoded feedback frame.
+
+        Returns:
+            None
+
+        Example:
+            feedback.AddListener(statistics.Update)
+        """
+        if not isinstance(frame, FeedbackFrame):
+            frame = FeedbackFrame(frame)
+        values = self.values
+        for key in self.fields:
+            if key in self.derived_fields:
+                values[self.slices[key]] = self.derived_fields[key][1](frame)
+            else:
+                values[self.slices[key]] = frame[key]
+        with self.lock:
+            self.count += 1
+            delta = values - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (values - self.mean)
+            np.minimum(self.min, values, out=self.min)
+            np.maximum(self.max, values, out=self.max)
+            if self.count == 1:
+                self.ewma[:] = values
+            else:
+                self.ewma += self.alpha * (values - self.ewma)
+            self.history[self.position % self.window] = values
+            self.position += 1
+
+    def Select(self, key:str, values):
+        """
+        Select the values of one field from a statistics vector.
+
+        Args:
+            key (string): Field name.
+            values (numpy.ndarray): Statistics vector.
+
+        Returns:
+            The value of a scalar field or an array with one value per joint.
+
+        Example:
+            Select('IActual', statistics.mean)
+        """
+        value = values[self.slices[key]].copy()
+        return value[0] if len(value) == 1 else value
+
+    def Mean(self, key:str):
+        """
+        Get the mean of a field.
+
+        Args:
+            key (string): Field name.
+
+        Returns:
+            The mean (float or array per joint).
+
+        Example:
+            Mean('IActual')
+        """
+        with self.lock:
+            return self.Select(key, self.mean)
+
+    def Variance(self, key:str):
+        """
+        Get the sample variance of a field.
+
+        Args:
+            key (string): Field name.
+
+        Returns:
+            The variance (float or array per joint). NaN if less than two frames were added.
+
+        Example:
+            Variance('IActual')
+        """
+        with self.lock:
+            if self.count < 2:
+                return self.Select(key, np.full(self.width, np.nan))
+            return self.Select(key, self.m2 / (self.count - 1))
+
+    def Std(self, key:str):
+        """
+        Get the sample standard deviation of a field.
+
+        Args:
+            key (string): Field name.
+
+        Returns:
+            The standard deviation (float or array per joint).
+
+        Example:
+            Std('IActual')
+        """
+        return np.sqrt(self.Variance(key))
+
+    def Min(self, key:str):
+        """
+        Get the minimum of a field.
+
+        Args:
+            key (string): Field name.
+
+        Returns:
+            The minimum (float or array per joint).
+
+        Example:
+            Min('MotorTemperatures')
+        """
+        with self.lock:
+            return self.Select(key, self.min)
+
+    def Max(self, key:str):
+        """
+        Get the maximum of a field.
+
+        Args:
+            key (string): Field name.
+
+        Returns:
+            The maximum (float or array per joint).
+
+        Example:
+            Max('MotorTemperatures')
+        """
+        with self.lock:
+            return self.Select(key, self.max)
+
+    def EWMA(self, key:str):
+        """
+        Get the exponentially weighted moving average of a field.
+
+        Args:
+            key (string): Field name.
+
+        Returns:
+            The moving average (float or array per joint).
+
+        Example:
+            EWMA('IRobot')
+        """
+        with self.lock:
+            return self.Select(key, self.ewma)
+
+    def Percentile(self, key:str, q):
+        """
+        Get percentiles of a field over the most recent window of frames. Unlike the other statistics this is not incremental: every call sorts the stored window, so it costs O(window) per call. Query it at display rate, not per frame.
+
+        Args:
+            key (string): Field name.
+            q (float or list): Percentile(s). Range: [0,100].
+
+        Returns:
+            The percentile(s) (per joint for joint fields). NaN if no frames were added.
+
+        Example:
+            Percentile('TrackingError', [50, 95, 99])
+        """
+        with self.lock:
+            history = self.history[:min(self.position, self.window), self.slices[key]]
+            if len(history) == 0:
+                return np.full(np.shape(q) + (history.shape[1],), np.nan).squeeze()
+            return np.percentile(history, q, axis=0).squeeze()
+
+    def Summary(self) -> dict:
+        """
+        Get all statistics of all fields as one consistent snapshot. Percentiles are not included because they are an O(window) query (see Percentile).
+
+        Returns:
+            A dictionary per field with count, mean, std, min, max and ewma.
+
+        Example:
+            Summary()
+        """
+        with self.lock:
+            return {key: {'count': self.count, 'mean': self.Mean(key), 'std': self.Std(key), 'min': self.Min(key), 'max': self.Max(key), 'ewma': self.EWMA(key)} for key in self.fields}
+
+
+# Class to export feedback history to columnar files
+
+class FeedbackExporter:
+    """
+    Class to export feedback frames into chunked, compressed columnar files. Every field is stored as its own column, so single fields can be loaded without reading the others.
+
+    Each chunk is a .npz file (zlib or lzma compressed) or a Parquet file (requires pyarrow). A manifest.json lists the chunks with their row count and TimeStamp range.
+    """
+
+    # Zip compression of the npz chunks
+    compressions = {
+        None: zipfile.ZIP_STORED,
+        'zlib': zipfile.ZIP_DEFLATED,
+        'lzma': zipfile.ZIP_LZMA
+    }
+
+    def __init__(self, directory:str, fields:list=None, chunkSize:int=7500, compression:str='zlib', format:str='npz'):
+        """
+        Constructor for the feedback exporter.
+
+        Args:
+            directory (string): Output directory.
+            fields (list): Feedback fields to export. TimeStamp is always exported. Default is all fields.
+            chunkSize (int): Number of frames per chunk. Default is 7500 (1 minute at 8 ms).
+            compression (string): 'zlib', 'lzma' or None for npz chunks. Parquet codec name (e.g. 'zstd', 'snappy') for Parquet chunks. Default is 'zlib'.
+            format (string): 'npz' or 'parquet'. Default is 'npz'.
+        """
+        if format not in ('npz', 'parquet'):
+            raise ValueError(f"Unknown export format {format}")
+        if format == 'npz' and compression not in self.compressions:
+            raise ValueError(f"Unknown npz compression {compression}")
+        self.directory = directory
+        self.fields = list(fields) if fields is not None else list(FeedbackFrame.fields)
+        if 'TimeStamp' not in self.fields:
+            self.fields.insert(0, 'TimeStamp')
+        self.chunkSize = chunkSize
+        self.compression = compression
+        self.format = format
+        self.buffer = bytearray(chunkSize * Feedback.frameSize)
+        self.rows = 0
+        self.manifest = None
+
+    def Open(self) -> None:
+        """
+        Create the output directory and start a new manifest.
+
+        Returns:
+            None
+
+        Example:
+            Open()
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self.rows = 0
+        self.manifest = {'format': self.format, 'fields': self.fields, 'chunks': []}
+        self.WriteManifest()
+
+    def Write(self, frame:bytes) -> None:
+        """
+        Add one raw feedback frame. Can be added directly as a listener to a Feedback object.
+
+        Args:
+            frame (bytes): One raw feedback frame.
+
+        Returns:
+            None
+
+        Example:
+            feedback.AddListener(exporter.Write)
+        """
+        offset = self.rows * Feedback.frameSize
+        self.buffer[offset:offset + Feedback.frameSize] = frame
+        self.rows += 1
+        if self.rows == self.chunkSize:
+            self.WriteChunk()
+
+    def ExportRecording(self, replay, start:int=None, end:int=None) -> None:
+        """
+        Export the frames of a recording within a time range.
+
+        Args:
+            replay (FeedbackReplay): The connected recording.
+            start (int): First controller timestamp (inclusive). Default is the start of the recording.
+            end (int): Last controller timestamp (inclusive). Default is the end of the recording.
+
+        Returns:
+            None
+
+        Example:
+            ExportRecording(replay)
+        """
+        (first, stop) = replay.Find(start, end)
+        for index in range(first, stop):
+            self.Write(replay.Frame(index))
+
+    def WriteChunk(self) -> None:
+        """
+        Write the buffered frames as one chunk.
+
+        Returns:
+            None
+
+        Example:
+            WriteChunk()
+        """
+        if self.rows == 0:
+            return
+        frames = FeedbackFrame.ToArray(bytes(self.buffer[:self.rows * Feedback.frameSize]))
+        name = f"chunk_{len(self.manifest['chunks']):05d}.{self.format}"
+        path = os.path.join(self.directory, name)
+        if self.format == 'npz':
+            with zipfile.ZipFile(path, 'w', compression=self.compressions[self.compression]) as archive:
+                for key in self.fields:
+                    with archive.open(f"{key}.npy", 'w', force_zip64=True) as file:
+                        np.lib.format.write_array(file, np.ascontiguousarray(frames[key]))
+        else:
+            (pa, pq) = self.ImportArrow()
+            columns = {}
+            for key in self.fields:
+                column = np.ascontiguousarray(frames[key])
+                if column.ndim > 1:
+                    columns[key] = pa.FixedSizeListArray.from_arrays(pa.array(column.ravel()), column.shape[1])
+                else:
+                    columns[key] = pa.array(column)
+            pq.write_table(pa.table(columns), path, compression=self.compression or 'none')
+        stamps = frames['TimeStamp']
+        self.manifest['chunks'].append({'file': name, 'rows': self.rows, 'start': int(stamps.min()), 'end': int(stamps.max())})
+        self.WriteManifest()
+        self.rows = 0
+
+    def WriteManifest(self) -> None:
+        """
+        Write the manifest file.
+
+        Returns:
+            None
+
+        Example:
+            WriteManifest()
+        """
+        path = os.path.join(self.directory, "manifest.json")
+        with open(path + ".tmp", 'w') as file:
+            json.dump(self.manifest, file, indent=1)
+        os.replace(path + ".tmp", path)
+
+    def Close(self) -> None:
+        """
+        Write the remaining buffered frames.
+
+        Returns:
+            None
+
+        Example:
+            Close()
+        """
+        self.WriteChunk()
+
+    @staticmethod
+    def ImportArrow():
+        """
+        Import pyarrow for Parquet chunks.
+
+        Returns:
+            The pyarrow and pyarrow.parquet modules.
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+        """
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow. Install it with: pip install pyarrow")
+        return pyarrow, pyarrow.parquet
+
+    @staticmethod
+    def Load(directory:str, fields:list, start:int=None, end:int=None) -> dict:
+        """
+        Load fields of an export. Only the requested columns of the chunks within the time range are read.
+
+        Args:
+            directory (string): Export directory.
+            fields (list): Feedback fields to load.
+            start (int): First controller timestamp (inclusive). Default is the start of the export.
+            end (int): Last controller timestamp (inclusive). Default is the end of the export.
+
+        Returns:
+            A dictionary with one NumPy array per field and the TimeStamp.
+
+        Example:
+            Load("export", ["QActual", "IActual"])
+        """
+        with open(os.path.join(directory, "manifest.json")) as file:
+            manifest = json.load(file)
+        keys = ['TimeStamp'] + [key for key in fields if key != 'TimeStamp']
+        parts = {key: [] for key in keys}
+        for chunk in manifest['chunks']:
+            if (start is not None and chunk['end'] < start) or (end is not None and chunk['start'] > end):
+                continue
+            path = os.path.join(directory, chunk['file'])
+            if manifest['format'] == 'npz':
+                with np.load(path) as archive:
+                    columns = {key: archive[key] for key in keys}
+            else:
+                (_, pq) = FeedbackExporter.ImportArrow()
+                table = pq.read_table(path, columns=keys)
+                columns = {}
+                for key in keys:
+                    column = table.column(key).combine_chunks()
+                    if hasattr(column.type, 'list_size'):
+                        columns[key] = np.asarray(column.flatten()).reshape(-1, column.type.list_size)
+                    else:
+                        columns[key] = np.asarray(column)
+            mask = np.ones(chunk['rows'], dtype=bool)
+            if start is not None:
+                mask &= columns['TimeStamp'] >= start
+            if end is not None:
+                mask &= columns['TimeStamp'] <= end
+            for key in keys:
+                parts[key].append(columns[key][mask])
+        return {key: np.concatenate(parts[key]) if parts[key] else np.empty(0) for key in keys}
+
+
+# Classes to share the latest feedback frame between processes
+
+class FeedbackPublisher:
+    """
+    Class to publish the latest raw feedback frame to a shared memory slot. Readers in other processes attach with SharedFeedback and need no own feedback connection.
+
+    The slot is guarded by a sequence lock: the sequence number is odd while a frame is written and even when the frame is complete.
+    """
+
+    # Slot header: sequence number
+    header = struct.Struct('<Q')
+
+    def __init__(self, name:str):
+        """
+        Constructor for the feedback publisher.
+
+        Args:
+            name (string): Name of the shared memory slot. Example: SharedFeedback.SlotName(robot)
+        """
+        self.name = name
+        self.memory = None
+        self.sequence = 0
+
+    def Open(self) -> None:
+        """
+        Create the shared memory slot, or reuse it if it already exists.
+
+        Returns:
+            None
+
+        Example:
+            Open()
+        """
+        size = self.header.size + Feedback.frameSize
+        try:
+            self.memory = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        except FileExistsError:
+            self.memory = SharedFeedback.Attach(self.name)
+        (self.sequence,) = self.header.unpack_from(self.memory.buf, 0)
+        self.sequence += self.sequence % 2
+
+    def Write(self, frame:bytes) -> None:
+        """
+        Publish one raw feedback frame. Can be added directly as a listener to a Feedback object.
+
+        Args:
+            frame (bytes): One raw feedback frame.
+
+        Returns:
+            None
+
+        Example:
+            feedback.AddListener(publisher.Write)
+        """
+        buffer = self.memory.buf
+        self.header.pack_into(buffer, 0, self.sequence + 1)
+        buffer[self.header.size:self.header.size + Feedback.frameSize] = frame
+        self.sequence += 2
+        self.header.pack_into(buffer, 0, self.sequence)
+
+    def Close(self, unlink:bool=True) -> None:
+        """
+        Close the shared memory slot.
+
+        Args:
+            unlink (bool): Remove the slot so no new readers can attach. Default is True.
+
+        Returns:
+            None
+
+        Example:
+            Close()
+        """
+        if self.memory is None:
+            return
+        self.memory.close()
+        if unlink:
+            if getattr(self.memory, '_track', True):
+                # A reader in this process may have unregistered the slot from the resource tracker
+                resource_tracker.register(self.memory._name, "shared_memory")
+            try:
+                self.memory.unlink()
+            except FileNotFoundError:
+                pass
+        self.memory = None
+
+
+class SharedFeedback(Feedback):
+    """
+    Class to read the latest feedback frame published by a FeedbackPublisher in another process. Provides the same interface as Feedback (Connect, Get, Read, data, listeners, subscriptions).
+    """
+
+    def __init__(self, name:str, poll:float=0.0005, timeout:float=0.1):
+        """
+        Constructor for the shared feedback reader.
+
+        Args:
+            name (string): Name of the shared memory slot.
+            poll (float): Polling interval while waiting for a new frame in Read(). Unit: s. Default is 0.0005.
+            timeout (float): Maximum time to wait for a write in progress to finish, e.g. if the publisher died while writing. Unit: s. Default is 0.1.
+        """
+        super().__init__(None, None)
+        self.name = name
+        self.poll = poll
+        self.timeout = timeout
+        self.memory = None
+        self.sequence = 0
+
+    @staticmethod
+    def SlotName(robot:Dobot, port:int=30004) -> str:
+        """
+        Get the default shared memory slot name for a robot.
+
+        Args:
+            robot (Dobot): The robot object.
+            port (int): Feedback port. Default is 30004.
+
+        Returns:
+            The slot name.
+
+        Example:
+            SlotName(robot)
+        """
+        return f"DobotFeedback_{robot.ip.replace('.', '_')}_{port}"
+
+    @staticmethod
+    def Attach(name:str):
+        """
+        Attach to an existing shared memory slot without taking ownership, so the slot is not removed when this process exits.
+
+        Args:
+            name (string): Name of the shared memory slot.
+
+        Returns:
+            The SharedMemory object.
+
+        Raises:
+            FileNotFoundError: If the slot does not exist.
+        """
+        try:
+            return shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13 always registers the slot with the resource tracker
+            memory = shared_memory.SharedMemory(name=name)
+            resource_tracker.unregister(memory._name, "shared_memory")
+            return memory
+
+    def Connect(self) -> None:
+        """
+        Attach to the shared memory slot.
+
+        Returns:
+            None
+
+        Raises:
+            FileNotFoundError: If no publisher created the slot.
+
+        Example:
+            Connect()
+        """
+        self.memory = self.Attach(self.name)
+        self.sequence = 0
+
+    def Disconnect(self) -> None:
+        """
+        Detach from the shared memory slot.
+
+        Returns:
+            None
+
+        Example:
+            Disconnect()
+        """
+        if self.memory is not None:
+            self.memory.close()
+            self.memory = None
+
+    def Take(self):
+        """
+        Copy the newest frame out of the slot.
+
+        Returns:
+            The sequence number and the frame (bytes). The frame is None if nothing was published yet.
+
+        Raises:
+            TimeoutError: If a write stays in progress for longer than the timeout.
+
+        Example:
+            Take()
+        """
+        buffer = self.memory.buf
+        start = FeedbackPublisher.header.size
+        deadline = None
+        while True:
+            (before,) = FeedbackPublisher.header.unpack_from(buffer, 0)
+            if before == 0:
+                return 0, None
+            if before % 2:
+                # A write is in progress, give the publisher time to finish it
+                if deadline is None:
+                    deadline = time.monotonic() + self.timeout
+                    time.sleep(0)
+                elif time.monotonic() > deadline:
+                    raise TimeoutError(f"Feedback publisher of slot {self.name} did not finish writing within {self.timeout} s.")
+                else:
+                    time.sleep(self.poll)
+                continue
+            frame = bytes(buffer[start:start + self.frameSize])
+            (after,) = FeedbackPublisher.header.unpack_from(buffer, 0)
+            if before == after:
+                return after, frame
+
+    def Get(self) -> None:
+        """
+        Get the newest published frame. Waits until the first frame is published. Data is stored in the data attribute.
+
+        Returns:
+            None
+
+        Example:
+            Get()
+        """
+        (sequence, frame) = self.Take()
+        while frame is None:
+            time.sleep(self.poll)
+            (sequence, frame) = self.Take()
+        self.sequence = sequence
+        self.Dispatch(frame)
+
+    def Read(self) -> None:
+        """
+        Wait for a frame newer than the last one read. Frames published in between are skipped. Data is stored in the data attribute.
+
+        Returns:
+            None
+
+        Example:
+            Read()
+        """
+        (sequence, frame) = self.Take()
+        while frame is None or sequence == self.sequence:
+            time.sleep(self.poll)
+            (sequence, frame) = self.Take()
+        self.sequence = sequence
+        self.Dispatch(frame)
+
+
+# Class for a fixed-size ring buffer of samples
+
+class RingBuffer:
+    """
+    Class for a fixed-size ring buffer of samples stored in a NumPy array. Appending overwrites the oldest sample once the buffer is full.
+    """
+
+    def __init__(self, size:int, width:int=1):
+        """
+        Constructor for the ring buffer.
+
+        Args:
+            size (int): Maximum number of samples.
+            width (int): Number of values per sample. Default is 1.
+        """
+        self.size = size
+        self.width = width
+        self.data = np.full((size, width), np.nan)
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def Append(self, values) -> None:
+        """
+        Add one sample.
+
+        Args:
+            values: Sample values (scalar or sequence of length width).
+
+        Returns:
+            None
+
+        Example:
+            Append([1, 2, 3, 4, 5, 6])
+        """
+        self.data[self.count % self.size] = values
+        self.count += 1
+
+    def Latest(self):
+        """
+        Get the most recent sample.
+
+        Returns:
+            The sample as an array of length width. NaN if the buffer is empty.
+
+        Example:
+            Latest()
+        """
+        if self.count == 0:
+            return np.full(self.width, np.nan)
+        return self.data[(self.count - 1) % self.size].copy()
+
+    def Last(self, n:int=None):
+        """
+        Get the most recent samples in chronological order.
+
+        Args:
+            n (int): Number of samples. Default is all stored samples.
+
+        Returns:
+            An array of shape (n, width).
+
+        Example:
+            Last(10)
+        """
+        n = len(self) if n is None else min(n, len(self))
+        return self.data[np.arange(self.count - n, self.count) % self.size]
+
+    def Clear(self) -> None:
+        """
+        Remove all samples.
+
+        Returns:
+            None
+
+        Example:
+            Clear()
+        """
+        self.data[:] = np.nan
+        self.count = 0
+
+
+# Class for derived kinematic signals from feedback
+
+class FeedbackDerivatives:
+    """
+    Class for derived kinematic signals computed incrementally from the feedback stream:
+
+        TCPAcceleration: Derivative of TCPSpeedActual (6 values).
+        TCPJerk: Derivative of TCPAcceleration (6 values).
+        JointAcceleration: Derivative of QDActual (6 values).
+        JointTrackingError: Norm of QTarget - QActual. Unit: degree.
+        TCPTrackingError: Norm of the position part of ToolVectorTarget - ToolVectorActual. Unit: mm.
+        OrientationTrackingError: Norm of the orientation part of ToolVectorTarget - ToolVectorActual. Unit: degree.
+
+    Speeds and accelerations are smoothed with a moving average before differentiating, because finite differences amplify the measurement noise.
+    """
+
+    # Derived channels and their number of values
+    channels = {
+        'TCPAcceleration': 6,
+        'TCPJerk': 6,
+        'JointAcceleration': 6,
+        'JointTrackingError': 1,
+        'TCPTrackingError': 1,
+        'OrientationTrackingError': 1
+    }
+
+    def __init__(self, window:int=1000, filter:int=5):
+        """
+        Constructor for the feedback derivatives.
+
+        Args:
+            window (int): Number of derived samples kept per channel. Default is 1000 (8 s at 8 ms).
+            filter (int): Length of the moving average filter in samples. 1 disables filtering. Default is 5.
+        """
+        self.window = window
+        self.filter = filter
+        self.time = RingBuffer(window)
+        self.signals = {key: RingBuffer(window, width) for (key, width) in self.channels.items()}
+        self.Reset()
+
+    def Reset(self) -> None:
+        """
+        Clear all samples.
+
+        Returns:
+            None
+
+        Example:
+            Reset()
+        """
+        self.time.Clear()
+        for signal in self.signals.values():
+            signal.Clear()
+        self.speed = RingBuffer(self.filter, 6)
+        self.jointSpeed = RingBuffer(self.filter, 6)
+        self.acceleration = RingBuffer(self.filter, 6)
+        self.previous = None
+
+    def Update(self, frame) -> None:
+        """
+        Add one feedback frame. Can be added directly as a listener to a Feedback object.
+
+        Args:
+            frame (bytes or FeedbackFrame): One raw or decoded feedback frame.
+
+        Returns:
+            None
+
+        Example:
+            feedback.AddListener(derivatives.Update)
+        """
+        if not isinstance(frame, FeedbackFrame):
+            frame = FeedbackFrame(frame)
+        t = frame['TimeStamp'] / 1000
+        if self.previous is not None and t <= self.previous[0]:
+            return
+        self.speed.Append(frame['TCPSpeedActual'])
+        self.jointSpeed.Append(frame['QDActual'])
+        speed = self.speed.Last().mean(axis=0)
+        jointSpeed = self.jointSpeed.Last().mean(axis=0)
+        acceleration = np.full(6, np.nan)
+        jointAcceleration = np.full(6, np.nan)
+        jerk = np.full(6, np.nan)
+        if self.previous is not None:
+            (previousTime, previousSpeed, previousJointSpeed, previousAcceleration) = self.previous
+            dt = t - previousTime
+            acceleration = (speed - previousSpeed) / dt
+            jointAcceleration = (jointSpeed - previousJointSpeed) / dt
+            self.acceleration.Append(acceleration)
+            smoothed = self.acceleration.Last().mean(axis=0)
+            jerk = (smoothed - previousAcceleration) / dt
+            acceleration = smoothed
+        self.previous = (t, speed, jointSpeed, acceleration)
+        toolError = np.subtract(frame['ToolVectorTarget'], frame['ToolVectorActual'])
+        self.time.Append(t)
+        self.signals['TCPAcceleration'].Append(acceleration)
+        self.signals['TCPJerk'].Append(jerk)
+        self.signals['JointAcceleration'].Append(jointAcceleration)
+        self.signals['JointTrackingError'].Append(np.linalg.norm(np.subtract(frame['QTarget'], frame['QActual'])))
+        self.signals['TCPTrackingError'].Append(np.linalg.norm(toolError[:3]))
+        self.signals['OrientationTrackingError'].Append(np.linalg.norm(toolError[3:]))
+
+    def Latest(self, key:str):
+        """
+        Get the most recent value of a channel.
+
+        Args:
+            key (string): Channel name.
+
+        Returns:
+            The value (float or array of 6 values). NaN until enough frames were received.
+
+        Example:
+            Latest('TCPAcceleration')
+        """
+        value = self.signals[key].Latest()
+        return value[0] if len(value) == 1 else value
+
+    def Window(self, key:str) -> tuple:
+        """
+        Get the stored samples of a channel in chronological order.
+
+        Args:
+            key (string): Channel name.
+
+        Returns:
+            The controller times in s and the values as arrays.
+
+        Example:
+            (t, jerk) = Window('TCPJerk')
+        """
+        values = self.signals[key].Last()
+        return self.time.Last()[:, 0], values[:, 0] if values.shape[1] == 1 else values
+
+    def Peak(self, key:str):
+        """
+        Get the peak absolute value of a channel over the stored window.
+
+        Args:
+            key (string): Channel name.
+
+        Returns:
+            The peak (float or array of 6 values).
+
+        Example:
+            Peak('JointAcceleration')
+        """
+        values = self.signals[key].Last()
+        if len(values) == 0 or np.all(np.isnan(values)):
+            return np.nan if values.shape[1] == 1 else np.full(values.shape[1], np.nan)
+        peak = np.nanmax(np.abs(values), axis=0)
+        return peak[0] if len(peak) == 1 else peak
+
+
+# Class for recording drag-taught paths
+
+class DragRecorder:
+    """
+    Class recording the path an operator teaches in drag mode from the feedback stream and compressing it into a short MovL or MovJ program. The dense samples are reduced with the Ramer-Douglas-Peucker algorithm to the points needed to stay within a tolerance, so playback runs as a few blended motions instead of thousands of tiny segments.
+
+    Attributes:
+        recording (bool): True while samples are recorded.
+        times (ndarray): Controller time of the samples. Unit: s.
+        joints (ndarray): Recorded QActual. Shape (N, 6). Unit: degree.
+        poses (ndarray): Recorded ToolVectorActual. Shape (N, 6). Unit: mm and degree.
+    """
+
+    def __init__(self, robot:Dobot=None, dragOnly:bool=True):
+        """
+        Constructor for the drag recorder.
+
+        Args:
+            robot (Dobot): The robot object used to switch drag mode on and off. Default is None (drag mode is switched by the operator).
+            dragOnly (bool): Only record frames while the robot is in drag mode (RobotMode 6). Default is True.
+        """
+        self.robot = robot
+        self.dragOnly = dragOnly
+        self.recording = False
+        self.samples = []
+        self.times = np.zeros(0)
+        self.joints = np.zeros((0, 6))
+        self.poses = np.zeros((0, 6))
+
+    def Update(self, frame) -> None:
+        """
+        Add one feedback frame. Can be added directly as a listener to a Feedback object.
+
+        Args:
+            frame (bytes or FeedbackFrame): One raw or decoded feedback frame.
+
+        Returns:
+            None
+
+        Example:
+            feedback.AddListener(recorder.Update)
+        """
+        if not self.recording:
+            return
+        if not isinstance(frame, FeedbackFrame):
+            frame = FeedbackFrame(frame)
+        if self.dragOnly and frame['RobotMode'] != 6:
+            return
+        self.samples.append((frame['TimeStamp'] / 1000,) + tuple(frame['QActual']) + tuple(frame['ToolVectorActual']))
+
+    def Start(self) -> None:
+        """
+        Clear the previous recording, switch drag mode on (if a robot was given) and start recording.
+
+        Returns:
+            None
+
+        Example:
+            Start()
+        """
+        self.samples = []
+        self.recording = True
+        if self.robot is not None:
+            self.robot.StartDrag()
+
+    def Stop(self) -> int:
+        """
+        Stop recording and switch drag mode off (if a robot was given).
+
+        Returns:
+            The number of recorded samples.
+
+        Example:
+            Stop()
+        """
+        self.recording = False
+        if self.robot is not None:
+            self.robot.StopDrag()
+        samples = np.array(self.samples, dtype=np.float64).reshape(-1, 13)
+        self.times = samples[:, 0]
+        self.joints = samples[:, 1:7]
+        self.poses = samples[:, 7:13]
+        return len(samples)
+
+    @staticmethod
+    def Simplify(points, tolerance:float) -> np.ndarray:
+        """
+        Reduce a polyline with the Ramer-Douglas-Peucker algorithm. Works in any number of dimensions.
+
+        Args:
+            points: The points. Shape (N, D).
+            tolerance (float): Maximum distance of a removed point from the simplified polyline.
+
+        Returns:
+            Indices of the kept points, including the first and last point.
+
+        Example:
+            Simplify(poses[:, :3], 1.0)
+        """
+        points = np.asarray(points, dtype=np.float64)
+        if len(points) < 3:
+            return np.arange(len(points))
+        keep = np.zeros(len(points), dtype=bool)
+        keep[[0, -1]] = True
+        stack = [(0, len(points) - 1)]
+        while stack:
+            (start, end) = stack.pop()
+            if end - start < 2:
+                continue
+            (a, b) = (points[start], points[end])
+            inner = points[start + 1:end]
+            direction = b - a
+            length = direction @ direction
+            t = np.clip((inner - a) @ direction / length, 0, 1) if length > 0 else np.zeros(len(inner))
+            distance = np.linalg.norm(inner - (a + t[:, None] * direction), axis=1)
+            farthest = int(np.argmax(distance))
+            if distance[farthest] > tolerance:
+                index = start + 1 + farthest
+                keep[index] = True
+                stack.append((start, index))
+                stack.append((index, end))
+        return np.flatnonzero(keep)
+
+    def Compress(self, tolerance:float=1.0, space:str='pose', angleTolerance:float=1.0) -> np.ndarray:
+        """
+        Select the recorded samples needed to reproduce the path within a tolerance.
+
+        Args:
+            tolerance (float): Maximum deviation. Unit: mm for 'pose', degree for 'joint'. Default is 1.0.
+            space (string): 'pose' to compress the TCP path, 'joint' to compress the joint path. Default is 'pose'.
+            angleTolerance (float): Maximum orientation deviation for 'pose'. Unit: degree. Default is 1.0.
+
+        Returns:
+            Indices of the kept samples.
+
+        Raises:
+            ValueError: If a tolerance is not positive.
+
+        Example:
+            Compress(0.5)
+        """
+        if tolerance <= 0 or angleTolerance <= 0:
+            raise ValueError(f"Tolerances must be greater than 0, got {tolerance} and {angleTolerance}.")
+        if space == 'joint':
+            return self.Simplify(self.joints, tolerance)
+        # Orientation is scaled so both tolerances map to the same distance
+        orientation = np.degrees(np.unwrap(np.radians(self.poses[:, 3:]), axis=0)) * (tolerance / angleTolerance)
+        return self.Simplify(np.hstack((self.poses[:, :3], orientation)), tolerance)
+
+    def Program(self, tolerance:float=1.0, space:str='pose', cp:int=50, parameters:str="", angleTolerance:float=1.0) -> list:
+        """
+        Build a compact motion program of the recording: MovL through the compressed TCP path or MovJ through the compressed joint path, blended with cp.
+
+        Args:
+            tolerance (float): Maximum deviation. Unit: mm for 'pose', degree for 'joint'. Default is 1.0.
+            space (string): 'pose' for MovL commands, 'joint' for MovJ commands. Default is 'pose'.
+            cp (int): Continuous path rate of all but the last motion. Range: [0,100]. Default is 50.
+            parameters (string): Additional parameters. Format: user={user},tool={tool},a={a},v={v}. Default is none.
+            angleTolerance (float): Maximum orientation deviation for 'pose'. Unit: degree. Default is 1.0.
+
+        Returns:
+            The motion commands, starting with the first recorded point.
+
+        Example:
+            robot.SendCommands(recorder.Program(0.5, cp=80))
+        """
+        indices = self.Compress(tolerance, space, angleTolerance)
+        (command, kind, points) = ("MovJ", "joint", self.joints) if space == 'joint' else ("MovL", "pose", self.poses)
+        suffix = f",{parameters}" if parameters else ""
+        program = []
+        for (i, index) in enumerate(indices):
+            blend = cp if 0 < i < len(indices) - 1 else 0
+            program.append(f"{command}({kind}={Dobot.FormatPoint(points[index])}{suffix},cp={blend})")
+        return program
+
+
+# Class for building trace files for StartPath
+
+class TraceFile:
+    """
+    Class building, checking and previewing trajectory files played back with StartPath(). Traces can be made from recorded feedback or from generated joint trajectories, resampled to the sample period of StartPath().
+
+    The trace file format of the controller is not documented in the TCP protocol. Write() stores one CSV row per point with a header: time (ms), j1 to j6 (degree) and x, y, z, rx, ry, rz (mm, degree). Check a file against a trace recorded on the controller before producing traces in bulk.
+
+    Attributes:
+        times (ndarray): Time of every point from the start. Unit: s.
+        joints (ndarray): Joint angles of every point. Shape (N, 6). Unit: degree.
+        poses (ndarray): Poses of every point. Shape (N, 6). None if unknown. Unit: mm and degree.
+    """
+
+    # Columns of the written trace file
+    columns = ('time', 'j1', 'j2', 'j3', 'j4', 'j5', 'j6', 'x', 'y', 'z', 'rx', 'ry', 'rz')
+
+    def __init__(self, times, joints, poses=None):
+        """
+        Constructor for the trace.
+
+        Args:
+            times: Time of every point. Unit: s.
+            joints: Joint angles of every point. Shape (N, 6). Unit: degree.
+            poses: Poses of every point. Shape (N, 6). Default is None.
+        """
+        self.times = np.asarray(times, dtype=np.float64) - (times[0] if len(times) else 0)
+        self.joints = np.asarray(joints, dtype=np.float64).reshape(-1, 6)
+        self.poses = None if poses is None else np.asarray(poses, dtype=np.float64).reshape(-1, 6)
+
+    def __len__(self):
+        return len(self.times)
+
+    @classmethod
+    def FromFrames(cls, frames):
+        """
+        Create a trace from feedback frames, e.g. FeedbackReplay.Replay() or the frames of a FeedbackRecorder file.
+
+        Args:
+            frames: Feedback frames (bytes, FeedbackFrame or dictionaries).
+
+        Returns:
+            The trace.
+
+        Example:
+            TraceFile.FromFrames(replay.Replay(start, end))
+        """
+        rows = []
+        for frame in frames:
+            if not isinstance(frame, Mapping):
+                frame = FeedbackFrame(frame, cache=False)
+            rows.append((frame['TimeStamp'] / 1000,) + tuple(frame['QActual']) + tuple(frame['ToolVectorActual']))
+        rows = np.array(rows, dtype=np.float64).reshape(-1, 13)
+        return cls(rows[:, 0], rows[:, 1:7], rows[:, 7:13])
+
+    @classmethod
+    def FromRecorder(cls, recorder):
+        """
+        Create a trace from a stopped DragRecorder.
+
+        Args:
+            recorder (DragRecorder): The recorder.
+
+        Returns:
+            The trace.
+
+        Example:
+            TraceFile.FromRecorder(recorder)
+        """
+        return cls(recorder.times, recorder.joints, recorder.poses)
+
+    def Resample(self, sample:int=50):
+        """
+        Resample the trace to a fixed period with linear interpolation. The last recorded point is always kept, so the last interval can be shorter.
+
+        Args:
+            sample (int): Sampling interval as given to StartPath(). Unit: ms. Range: [8,1000]. Default is 50.
+
+        Returns:
+            The resampled trace.
+
+        Raises:
+            ValueError: If the sample interval is invalid or the trace is empty.
+
+        Example:
+            trace = trace.Resample(8)
+        """
+        if not 8 <= sample <= 1000:
+            raise ValueError(f"Invalid sample interval {sample}. Range: [8,1000] ms.")
+        if not len(self):
+            raise ValueError("Cannot resample an empty trace.")
+        times = np.arange(0, self.times[-1] + 1e-9, sample / 1000)
+        if self.times[-1] - times[-1] > 1e-9:
+            times = np.append(times, self.times[-1])  # Keep the taught end point
+        joints = np.column_stack([np.interp(times, self.times, column) for column in self.joints.T])
+        poses = None
+        if self.poses is not None:
+            # Unwrapped so interpolation does not pass through the ±180° jump
+            unwrapped = np.hstack((self.poses[:, :3], np.degrees(np.unwrap(np.radians(self.poses[:, 3:]), axis=0))))
+            poses = np.column_stack([np.interp(times, self.times, column) for column in unwrapped.T])
+            poses[:, 3:] = (poses[:, 3:] + 180) % 360 - 180
+        return TraceFile(times, joints, poses)
+
+    def Validate(self, model:MotionModel=None, lower=-360.0, upper=360.0) -> list:
+        """
+        Check the trace against the joint limits and the velocity and acceleration bounds of a motion model.
+
+        Args:
+            model (MotionModel): Model with the joint velocity and acceleration bounds (VelJ, AccJ and SpeedFactor are ignored). Default is a MotionModel with default limits.
+            lower (float | list): Lower joint limits. Unit: degree. Default is -360.
+            upper (float | list): Upper joint limits. Unit: degree. Default is 360.
+
+        Returns:
+            List of problems found. Empty if the trace is valid.
+
+        Example:
+            problems = trace.Validate(MotionModel(jointVelocity=[180,180,180,225,225,225]))
+        """
+        model = model if model is not None else MotionModel()
+        problems = []
+        if len(self) < 4:
+            problems.append(f"StartPath needs at least 4 points, the trace has {len(self)}.")
+        if np.any(np.diff(self.times) <= 0):
+            problems.append("The times are not strictly increasing.")
+            return problems
+        (lower, upper) = (np.broadcast_to(lower, (6,)), np.broadcast_to(upper, (6,)))
+        for joint in range(6):
+            outside = np.flatnonzero((self.joints[:, joint] < lower[joint]) | (self.joints[:, joint] > upper[joint]))
+            if len(outside):
+                problems.append(f"J{joint + 1} exceeds its limits [{lower[joint]}, {upper[joint]}] at {len(outside)} points, first at point {outside[0]}.")
+        if len(self) < 2:
+            return problems
+        velocity = np.diff(self.joints, axis=0) / np.diff(self.times)[:, None]
+        acceleration = np.diff(velocity, axis=0) / np.diff(self.times)[1:, None] if len(self) > 2 else np.zeros((0, 6))
+        for (name, values, bound) in (("velocity", velocity, model.jointVelocity), ("acceleration", acceleration, model.jointAcceleration)):
+            exceeded = np.abs(values) > bound
+            for joint in np.flatnonzero(exceeded.any(axis=0)):
+                problems.append(f"J{joint + 1} {name} reaches {np.abs(values[:, joint]).max():.1f}, bound {bound[joint]:.1f}, first at point {np.argmax(exceeded[:, joint])}.")
+        return problems
+
+    def Preview(self, isConst:int=0, multi:float=1.0) -> np.ndarray:
+        """
+        Predict when every point is reached during StartPath() playback.
+
+        isConst 0 plays the recorded timing scaled by 1/multi. For isConst 1 the controller's constant speed is not documented; the preview assumes the mean TCP speed of the recording (or the mean joint speed without poses), which keeps the total duration.
+
+        Args:
+            isConst (int): 0: variable speed as recorded, 1: constant speed. Default is 0.
+            multi (float): Playback speed multiplier. Valid only when isConst is 0. Range: 0.25~2. Default is 1.
+
+        Returns:
+            Time of every point from the start of the playback. Unit: s.
+
+        Example:
+            Preview(0, 2)[-1]  # duration at double speed
+        """
+        if isConst:
+            points = self.poses[:, :3] if self.poses is not None else self.joints
+            path = np.concatenate(([0], np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))))
+            return path / path[-1] * self.times[-1] if path[-1] > 0 else self.times.copy()
+        if not 0.25 <= multi <= 2:
+            raise ValueError(f"Invalid speed multiplier {multi}. Range: 0.25~2.")
+        return self.times / multi
+
+    def Write(self, path:str) -> None:
+        """
+        Write the trace to a CSV file. Copy it to /dobot/userdata/project/process/trajectory/ on the controller to play it with StartPath().
+
+        Args:
+            path (string): The file path.
+
+        Returns:
+            None
+
+        Example:
+            Write("dispense1.csv")
+        """
+        poses = self.poses if self.poses is not None else np.full((len(self), 6), np.nan)
+        np.savetxt(path, np.column_stack((np.round(self.times * 1000), self.joints, poses)), delimiter=",", header=",".join(self.columns), comments="", fmt="%.6f")
+
+    @classmethod
+    def Read(cls, path:str):
+        """
+        Read a trace file written with Write().
+
+        Args:
+            path (string): The file path.
+
+        Returns:
+            The trace.
+
+        Example:
+            TraceFile.Read("dispense1.csv")
         """
-        feedback_dict = {}
-
-        # Remove brackets and convert to a list if comma-separated.
-        def parse_value(value):
-            if isinstance(value, tuple):
-                # Flatten single-value tuples and keep lists for multiple values
-                if len(value) == 1:
-                    return value[0]
-                return list(value)
-            return value
-
-        # Helper function to unpack data and assign it a key
-        def unpack(offset, fmt, key):
-            size = struct.calcsize(fmt)
-            value = struct.unpack_from(fmt, data, offset)
-            feedback_dict[key] = parse_value(value)  # Parse value into clean format
-            return offset + size
-
-        # Parse fields based on their "Meaning" in the TCP protocol
-        offset = 0
-        offset = unpack(offset, 'H', 'MessageSize')                        # Message size (2 bytes)
-        offset += 6                                                        # Reserved (6 bytes)
-        offset = unpack(offset, 'Q', 'DigitalInputs')                      # Digital inputs (8 bytes)
-        offset = unpack(offset, 'Q', 'DigitalOutputs')                     # Digital outputs (8 bytes)
-        offset = unpack(offset, 'Q', 'RobotMode')                          # Robot mode (8 bytes)
-        offset = unpack(offset, 'Q', 'TimeStamp')                          # Timestamp in milliseconds (8 bytes)
-        offset = unpack(offset, 'Q', 'RunTime')                            # Robot running time in milliseconds (8 bytes)
-        offset = unpack(offset, 'Q', 'TestValue')                          # Memory test value (8 bytes)
-        offset += 8                                                        # Reserved (8 bytes)
-        offset = unpack(offset, 'd', 'SpeedScaling')                       # Speed scaling (8 bytes)
-        offset += 16                                                       # Reserved (16 bytes)
-        offset = unpack(offset, 'd', 'VRobot')                             # Robot voltage (8 bytes)
-        offset = unpack(offset, 'd', 'IRobot')                             # Robot current (8 bytes)
-        offset = unpack(offset, 'd', 'ProgramState')                       # Script running status (8 bytes)
-        offset = unpack(offset, '2B', 'SafetyIOIn')                        # Safety IO input (2 bytes)
-        offset = unpack(offset, '2B', 'SafetyIOOut')                       # Safety IO output (2 bytes)
-        offset += 76                                                       # Reserved (76 bytes)
-
-        # Joint data
-        offset = unpack(offset, '6d', 'QTarget')                           # Target joint position (6 doubles)
-        offset = unpack(offset, '6d', 'QDTarget')                          # Target joint speed (6 doubles)
-        offset = unpack(offset, '6d', 'QDDTarget')                         # Target joint acceleration (6 doubles)
-        offset = unpack(offset, '6d', 'ITarget')                           # Target joint current (6 doubles)
-        offset = unpack(offset, '6d', 'MTarget')                           # Target joint torque (6 doubles)
-        offset = unpack(offset, '6d', 'QActual')                           # Actual joint position (6 doubles)
-        offset = unpack(offset, '6d', 'QDActual')                          # Actual joint speed (6 doubles)
-        offset = unpack(offset, '6d', 'IActual')                           # Actual joint current (6 doubles)
-        offset = unpack(offset, '6d', 'ActualTCPForce')                    # TCP actual force (6 doubles)
-        offset = unpack(offset, '6d', 'ToolVectorActual')                  # TCP actual Cartesian (6 doubles)
-        offset = unpack(offset, '6d', 'TCPSpeedActual')                    # TCP actual speed (6 doubles)
-        offset = unpack(offset, '6d', 'TCPForce')                          # TCP force (6 doubles)
-        offset = unpack(offset, '6d', 'ToolVectorTarget')                  # TCP target Cartesian (6 doubles)
-        offset = unpack(offset, '6d', 'TCPSpeedTarget')                    # TCP target speed (6 doubles)
-        offset = unpack(offset, '6d', 'MotorTemperatures')                 # Joint temperatures (6 doubles)
-        offset = unpack(offset, '6d', 'JointModes')                        # Joint modes (6 doubles)
-        offset = unpack(offset, '6d', 'VActual')                           # Joint voltage (6 doubles)
-        offset += 4                                                        # Reserved (4 bytes)
-        offset = unpack(offset, 'B', 'UserCoordinateSystem')               # User coordinate system (1 byte)
-        offset = unpack(offset, 'B', 'ToolCoordinateSystem')               # Tool coordinate system (1 byte)
-        offset = unpack(offset, 'B', 'RunQueuedCmd')                       # Run queued command flag (1 byte)
-        offset = unpack(offset, 'B', 'PauseCmdFlag')                       # Pause command flag (1 byte)
-        offset = unpack(offset, 'B', 'VelocityRatio')                      # Joint velocity ratio (1 byte)
-        offset = unpack(offset, 'B', 'AccelerationRatio')                  # Joint acceleration ratio (1 byte)
-        offset += 1                                                        # Reserved (1 byte)
-        offset = unpack(offset, 'B', 'XYZVelocityRatio')                   # Cartesian velocity ratio (1 byte)
-        offset = unpack(offset, 'B', 'RVelocityRatio')                     # Cartesian posture speed ratio (1 byte)
-        offset = unpack(offset, 'B', 'XYZAccelerationRatio')               # Cartesian acceleration ratio (1 byte)
-        offset = unpack(offset, 'B', 'RAccelerationRatio')                 # Cartesian posture acceleration ratio (1 byte)
-        offset = unpack(offset, 'B', 'BrakeStatus')                        # Brake status (1 byte)
-        offset = unpack(offset, 'B', 'EnableStatus')                       # Enable status (1 byte)
-        offset = unpack(offset, 'B', 'DragStatus')                         # Drag status (1 byte)
-        offset = unpack(offset, 'B', 'RunningStatus')                      # Running status (1 byte)
-        offset = unpack(offset, 'B', 'ErrorStatus')                        # Error status (1 byte)
-        offset = unpack(offset, 'B', 'JogStatus')                          # Jog status (1 byte)
-        offset = unpack(offset, 'B', 'RobotType')                          # Robot type (1 byte)
-        offset = unpack(offset, 'B', 'DragButtonSignal')                   # Drag button signal (1 byte)
-        offset = unpack(offset, 'B', 'EnableButtonSignal')                 # Enable button signal (1 byte)
-        offset = unpack(offset, 'B', 'RecordButtonSignal')                 # Record button signal (1 byte)
-        offset = unpack(offset, 'B', 'ReappearButtonSignal')               # Playback signal (1 byte)
-        offset = unpack(offset, 'B', 'JawButtonSignal')                    # Gripper control signal (1 byte)
-        offset = unpack(offset, 'B', 'SixForceOnline')                     # Six-axis force sensor status (1 byte)
-        offset = unpack(offset, 'B', 'CollisionState')                     # Collision state (1 byte)
-        offset = unpack(offset, 'B', 'ArmApproachState')                   # Forearm approach pause (1 byte)
-        offset = unpack(offset, 'B', 'J4ApproachState')                    # J4 approach pause (1 byte)
-        offset = unpack(offset, 'B', 'J5ApproachState')                    # J5 approach pause (1 byte)
-        offset = unpack(offset, 'B', 'J6ApproachState')                    # J6 approach pause (1 byte)
-        offset += 61                                                       # Reserved (61 bytes)
-        offset = unpack(offset, 'd', 'ZAxisJitter')                        # Z-axis jitter displacement (8 bytes)
-        offset = unpack(offset, 'Q', 'CurrentCommandID')                   # Current command ID (8 bytes)
-        offset = unpack(offset, '6d', 'ActualTorque')                      # Actual torque (6 doubles)
-        offset = unpack(offset, 'd', 'Payload')                            # Payload (8 bytes)
-        offset = unpack(offset, 'd', 'CenterX')                            # Eccentric X (8 bytes)
-        offset = unpack(offset, 'd', 'CenterY')                            # Eccentric Y (8 bytes)
-        offset = unpack(offset, 'd', 'CenterZ')                            # Eccentric Z (8 bytes)
-        offset = unpack(offset, '6d', 'UserCoordinates')                   # User coordinates (6 doubles)
-        offset = unpack(offset, '6d', 'ToolCoordinates')                   # Tool coordinates (6 doubles)
-        offset += 8                                                        # Reserved (8 bytes)
-        offset = unpack(offset, '6d', 'SixAxisForce')                      # Six-axis force (6 doubles)
-        offset = unpack(offset, '4d', 'TargetQuaternion')                  # Target quaternion (4 doubles)
-        offset = unpack(offset, '4d', 'ActualQuaternion')                  # Actual quaternion (4 doubles)
-        offset = unpack(offset, '2B', 'AutoManualMode')                    # Manual/Automatic mode (2 bytes)
-        offset = unpack(offset, 'H', 'ExportStatus')                       # USB export status (2 bytes)
-        offset = unpack(offset, 'B', 'SafetyStatus')                       # Safety status (1 byte)
-
-        return feedback_dict
\ No newline at end of file
+        rows = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+        poses = None if np.isnan(rows[:, 7:13]).all() else rows[:, 7:13]
+        return cls(rows[:, 0] / 1000, rows[:, 1:7], poses)
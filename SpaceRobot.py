@@ -1,15 +1,600 @@
+import argparse
+import queue
 import threading
 import tkinter as tk
 from tkinter import StringVar, ttk, Canvas
 import pyspacemouse
 import time
 import keyboard
+import numpy as np
+from collections import namedtuple
+
+from DobotTCP import Dobot, Feedback, FeedbackFrame
+
+# Snapshot of the SpaceMouse: axes (x, y, z, pitch, roll, yaw), buttons (bitmask of held buttons), presses (rising edge count per button)
+SpaceMouseState = namedtuple("SpaceMouseState", ["seq", "timestamp", "axes", "buttons", "presses"])
+
+class SpaceMouseSlot:
+    """Latest-value slot for SpaceMouse snapshots. One thread publishes, any number of threads read without locking."""
+
+    def __init__(self, buttons=2):
+        self.state = SpaceMouseState(0, 0.0, (0.0,) * 6, 0, (0,) * buttons)
+
+    def publish(self, axes, buttons, timestamp=None):
+        """Publish a new sample. Rising button edges are counted so readers do not miss presses between their ticks."""
+        previous = self.state
+        rising = buttons & ~previous.buttons
+        presses = tuple(count + ((rising >> i) & 1) for (i, count) in enumerate(previous.presses))
+        # Replacing the reference is atomic, readers always see a complete snapshot
+        self.state = SpaceMouseState(previous.seq + 1, time.perf_counter() if timestamp is None else timestamp, tuple(axes), buttons, presses)
+        return self.state
+
+    def latest(self):
+        """Get the latest snapshot."""
+        return self.state
+
+    def changed(self, seq):
+        """Get the latest snapshot if it is newer than seq, otherwise None."""
+        state = self.state
+        return state if state.seq != seq else None
+
+class TeleopEngine:
+    """Continuous teleoperation: maps the analog SpaceMouse axes to Cartesian or joint velocities and streams ServoP/ServoJ setpoints in a fixed-rate loop."""
+
+    joint_axes = ["J1", "J2", "J3", "J4", "J5", "J6"]
+    cartesian_axes = ["X", "Y", "Z", "Rx", "Ry", "Rz"]
+
+    def __init__(self, robot, feedback=None, rate=50, deadzone=0.1, linear_speed=100, angular_speed=30, joint_speed=30, linear_acceleration=400, angular_acceleration=120, joint_acceleration=120):
+        self.robot = robot
+        self.feedback = feedback
+        self.period = 1 / rate
+        self.deadzone = deadzone
+        self.max_speed = {"linear": linear_speed, "angular": angular_speed, "joint": joint_speed}  # mm/s, °/s, °/s
+        self.max_acceleration = {"linear": linear_acceleration, "angular": angular_acceleration, "joint": joint_acceleration}  # mm/s², °/s², °/s²
+        self.mapping = [(axis, 1) for axis in self.joint_axes]  # SpaceMouse axis i -> (robot axis, sign)
+        self.frame = "Joint"  # Joint, User or Tool
+        self.mask = [True] * 6  # False for locked SpaceMouse axes
+        self.speed_scale = 1.0
+        self.source = None  # Callable returning the latest SpaceMouseState
+        self.monitor = None  # Optional LatencyMonitor timing the setpoints
+        self.space = None  # "joint" or "cartesian" while moving
+        self.setpoint = None
+        self.velocity = np.zeros(6)
+        self.running = False
+        self.thread = None
+        self.error = None
+
+    def set_mapping(self, mapping, frame):
+        """Set the axis mapping [(robot axis, sign), ...] and the frame (Joint, User or Tool)."""
+        self.mapping = list(mapping)
+        self.frame = frame
+
+    def shape(self, values):
+        """Apply the deadzone and rescale so the output starts at zero at the deadzone edge."""
+        values = np.clip(np.asarray(values, dtype=float), -1, 1) * np.asarray(self.mask, dtype=float)
+        magnitude = np.maximum(np.abs(values) - self.deadzone, 0) / (1 - self.deadzone)
+        return np.sign(values) * magnitude
+
+    def target_velocity(self, values):
+        """Map shaped SpaceMouse values to a velocity in joint or Cartesian space. Mixed mappings follow the largest deflection."""
+        joint = np.zeros(6)
+        cartesian = np.zeros(6)
+        for (value, (axis, sign)) in zip(values, self.mapping):
+            if axis in self.joint_axes:
+                joint[self.joint_axes.index(axis)] += sign * value
+            else:
+                cartesian[self.cartesian_axes.index(axis)] += sign * value
+        space = "joint" if np.abs(joint).max() >= np.abs(cartesian).max() else "cartesian"
+        if space == "joint":
+            return space, np.clip(joint, -1, 1) * self.max_speed["joint"] * self.speed_scale
+        speed = np.array([self.max_speed["linear"]] * 3 + [self.max_speed["angular"]] * 3)
+        return space, np.clip(cartesian, -1, 1) * speed * self.speed_scale
+
+    def limit_acceleration(self, target, dt):
+        """Move the current velocity towards the target velocity within the acceleration limits."""
+        if self.space == "joint":
+            limit = np.full(6, self.max_acceleration["joint"])
+        else:
+            limit = np.array([self.max_acceleration["linear"]] * 3 + [self.max_acceleration["angular"]] * 3)
+        self.velocity = self.velocity + np.clip(target - self.velocity, -limit * dt, limit * dt)
+        return self.velocity
+
+    def current_position(self, space):
+        """Get the actual joint angles or pose, from the feedback if available."""
+        if self.feedback is not None and self.feedback.data:
+            return np.array(self.feedback.data.get('QActual' if space == "joint" else 'ToolVectorActual'), dtype=float)
+        (_, response, _) = self.robot.GetAngle() if space == "joint" else self.robot.GetPose()
+        return np.array([float(value) for value in response.split(",")])
+
+    @staticmethod
+    def rotation_matrix(rx, ry, rz):
+        """Rotation matrix of Rx, Ry, Rz (rotations about the fixed X, Y and Z axes)."""
+        (a, b, c) = np.radians([rx, ry, rz])
+        x = np.array([[1, 0, 0], [0, np.cos(a), -np.sin(a)], [0, np.sin(a), np.cos(a)]])
+        y = np.array([[np.cos(b), 0, np.sin(b)], [0, 1, 0], [-np.sin(b), 0, np.cos(b)]])
+        z = np.array([[np.cos(c), -np.sin(c), 0], [np.sin(c), np.cos(c), 0], [0, 0, 1]])
+        return z @ y @ x
+
+    @staticmethod
+    def euler_angles(matrix):
+        """Rx, Ry, Rz of a rotation matrix."""
+        ry = -np.arcsin(np.clip(matrix[2, 0], -1, 1))
+        rx = np.arctan2(matrix[2, 1], matrix[2, 2])
+        rz = np.arctan2(matrix[1, 0], matrix[0, 0])
+        return np.degrees([rx, ry, rz])
+
+    def integrate(self, dt):
+        """Advance the setpoint by the current velocity."""
+        step = self.velocity * dt
+        if self.space == "joint":
+            self.setpoint = self.setpoint + step
+            return
+        rotation = self.rotation_matrix(*self.setpoint[3:])
+        delta = self.rotation_matrix(*step[3:])
+        if self.frame == "Tool":
+            self.setpoint[:3] += rotation @ step[:3]
+            rotation = rotation @ delta
+        else:
+            self.setpoint[:3] += step[:3]
+            rotation = delta @ rotation
+        self.setpoint[3:] = self.euler_angles(rotation)
+
+    def step(self, dt):
+        """Run one control cycle. Returns True if a setpoint was sent."""
+        sample = self.source() if self.source is not None else None
+        values = self.shape(sample.axes) if sample is not None else np.zeros(6)
+        (space, target) = self.target_velocity(values)
+        if self.space is not None and space != self.space:
+            target = np.zeros(6)  # Stop in the old space before switching
+        if self.space is None:
+            if not target.any():
+                return False
+            self.space = space
+            self.setpoint = self.current_position(space)
+        self.limit_acceleration(target, dt)
+        if not self.velocity.any():
+            self.space = None  # Standing still, resync from the actual position on the next deflection
+            return False
+        self.integrate(dt)
+        send = self.robot.ServoJ if self.space == "joint" else self.robot.ServoP
+        if self.monitor is not None and sample is not None:
+            self.monitor.command(sample.timestamp, send, *self.setpoint.tolist(), t=self.period)
+        else:
+            send(*self.setpoint.tolist(), t=self.period)
+        return True
+
+    def run(self):
+        """Fixed-rate control loop."""
+        deadline = time.perf_counter()
+        try:
+            while self.running:
+                self.step(self.period)
+                deadline += self.period
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    deadline = time.perf_counter()  # Overrun, do not catch up with a burst
+        except Exception as e:
+            self.error = e
+            print(f"Teleop error: {e}")
+        finally:
+            self.running = False
+
+    def start(self):
+        """Start the control loop thread."""
+        if self.running:
+            return
+        self.running = True
+        self.error = None
+        self.space = None
+        self.velocity = np.zeros(6)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the control loop thread."""
+        self.running = False
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(1)
+        self.thread = None
+        self.space = None
+        self.velocity = np.zeros(6)
+
+class FeedbackDisplay:
+    """Show streamed feedback in Tk labels. Frames are only stored by the feedback thread; the Tk main loop picks up the newest one at the display rate and updates only changed labels."""
+
+    def __init__(self, root, feedback, labels, select, rate=30, on_error=None):
+        self.root = root
+        self.feedback = feedback
+        self.labels = labels
+        self.select = select  # Callable returning the values to show from a frame
+        self.interval = int(1000 / rate)
+        self.on_error = on_error  # Called with the exception if the feedback thread failed
+        self.raw = None  # Newest raw frame, written by the feedback thread
+        self.shown = None  # Raw frame currently displayed
+        self.texts = [label.cget("text") for label in labels]
+        self.running = False
+
+    def receive(self, rawdata):
+        """Feedback listener storing the newest frame."""
+        self.raw = rawdata
+
+    def start(self):
+        """Register the listener and start refreshing the labels."""
+        self.running = True
+        self.feedback.AddListener(self.receive)
+        self.root.after(self.interval, self.refresh)
+
+    def stop(self):
+        """Stop refreshing the labels."""
+        self.running = False
+        self.feedback.RemoveListener(self.receive)
+
+    def refresh(self):
+        """Apply the newest frame to the labels. Runs in the Tk main loop."""
+        if not self.running:
+            return
+        if self.feedback.error is not None and self.on_error is not None:
+            self.on_error(self.feedback.error)
+        raw = self.raw
+        if raw is not None and raw is not self.shown:
+            self.shown = raw
+            self.update(self.select(FeedbackFrame(raw)))
+        self.root.after(self.interval, self.refresh)
+
+    def update(self, values):
+        """Set the label texts that changed."""
+        for (i, value) in enumerate(values):
+            text = f"{value:.2f}"
+            if text != self.texts[i]:
+                self.texts[i] = text
+                self.labels[i].config(text=text)
+
+    def redraw(self):
+        """Show the current frame again, e.g. after the selected values changed."""
+        self.shown = None
+
+class LatencyMonitor:
+    """Measure the teleop latency from a SpaceMouse sample to the first feedback frame showing motion, split into stages."""
+
+    stages = ["input->send", "send->response", "response->motion", "motion->feedback", "input->motion"]
+
+    def __init__(self, speed_threshold=0.01, timeout=2.0, window=10.0):
+        self.speed_threshold = speed_threshold  # Joint speed (°/s) above which the robot counts as moving
+        self.timeout = timeout  # Commands without motion after this time (s) are dropped
+        self.window = window  # Time (s) after which the clock offset estimate is renewed to follow drift
+        self.samples = {stage: [] for stage in self.stages}  # Latencies in ms
+        self.pending = None  # (input, sent, response) host times of the command waiting for motion
+        self.moving = False
+        self.missed = 0
+        self.offset = None  # Host time minus controller TimeStamp in ms, minimum over the last windows
+        self.window_offset = None
+        self.window_start = None
+        self.lock = threading.Lock()
+
+    def attach(self, feedback):
+        """Receive the frames of a feedback connection."""
+        feedback.AddListener(self.receive)
+
+    def now(self):
+        """Host clock in ms, the same clock as the SpaceMouse sample timestamps."""
+        return time.perf_counter() * 1000
+
+    def command(self, input_time, send, *args, **kwargs):
+        """Send a motion command and time it. input_time is the perf_counter time (s) of the SpaceMouse sample it is based on."""
+        sent = self.now()
+        result = send(*args, **kwargs)
+        response = self.now()
+        with self.lock:
+            if self.pending is None and not self.moving:
+                self.pending = (input_time * 1000, sent, response)  # Motion starts from rest, wait for it
+        return result
+
+    def clock(self, stamp, received):
+        """Update the offset between the controller TimeStamp and the host clock. The smallest difference has the least transport delay."""
+        difference = received - stamp
+        if self.window_start is None or received - self.window_start > self.window * 1000:
+            self.offset = self.window_offset if self.window_offset is not None else difference
+            self.window_offset = difference
+            self.window_start = received
+        self.window_offset = min(self.window_offset, difference)
+        self.offset = min(self.offset, difference)
+
+    def receive(self, rawdata):
+        """Feedback listener detecting the first frame with motion."""
+        received = self.now()
+        frame = FeedbackFrame(rawdata)
+        stamp = frame['TimeStamp']
+        self.clock(stamp, received)
+        moving = frame['JogStatus'] != 0 or max(abs(speed) for speed in frame['QDActual']) > self.speed_threshold
+        with self.lock:
+            self.moving = moving
+            if self.pending is None:
+                return
+            (input_time, sent, response) = self.pending
+            if moving:
+                motion = stamp + self.offset  # Controller time of the motion on the host clock
+                for (stage, latency) in zip(self.stages, [sent - input_time, response - sent, motion - response, received - motion, motion - input_time]):
+                    self.samples[stage].append(latency)
+                self.pending = None
+            elif received - sent > self.timeout * 1000:
+                self.missed += 1
+                self.pending = None
+
+    def histogram(self, stage, bins=10):
+        """Get the histogram (counts, bin edges in ms) of a stage."""
+        return np.histogram(self.samples[stage], bins=bins)
+
+    def summary(self):
+        """Get count, mean, percentiles and maximum in ms per stage."""
+        summary = {}
+        for stage in self.stages:
+            values = np.array(self.samples[stage])
+            if not len(values):
+                continue
+            (p50, p90, p99) = np.percentile(values, [50, 90, 99])
+            summary[stage] = {"count": len(values), "mean": values.mean(), "p50": p50, "p90": p90, "p99": p99, "max": values.max()}
+        return summary
+
+    def report(self, width=40):
+        """Print the latency histograms of all stages."""
+        print(f"Teleop latency ({self.missed} commands without motion)")
+        for (stage, stats) in self.summary().items():
+            print(f"{stage}: n={stats['count']} mean={stats['mean']:.1f} p50={stats['p50']:.1f} p90={stats['p90']:.1f} p99={stats['p99']:.1f} max={stats['max']:.1f} ms")
+            (counts, edges) = self.histogram(stage)
+            for (count, low, high) in zip(counts, edges[:-1], edges[1:]):
+                print(f"  {low:7.1f} - {high:7.1f} ms | {'#' * round(width * count / counts.max())} {count}")
+
+class TeleopService:
+    """Headless SpaceMouse to robot control loop. Reads the SpaceMouse and moves the robot in its own fixed-rate threads; a GUI is an optional client that edits the settings and shows the state."""
+
+    modes = ["Simulation", "Joints", "User", "Tool", "Custom"]
+    axis_names = ["X", "Y", "Z", "Pitch", "Roll", "Yaw"]
+
+    axis_dict = {
+        "Joint 1": "J1+",
+        "Joint 1 inverse": "J1",
+        "Joint 2": "J2",
+        "Joint 2 inverse": "J2",
+        "Joint 3": "J3",
+        "Joint 3 inverse": "J3",
+        "Joint 4": "J4",
+        "Joint 4 inverse": "J4",
+        "Joint 5": "J5",
+        "Joint 5 inverse": "J5",
+        "Joint 6": "J6",
+        "Joint 6 inverse": "J6",
+        "X": "X",
+        "X inverse": "X",
+        "Y": "Y",
+        "Y inverse": "Y",
+        "Z": "Z",
+        "Z inverse": "Z",
+        "Rx": "Rx",
+        "Rx inverse": "Rx",
+        "Ry": "Ry",
+        "Ry inverse": "Ry",
+        "Rz": "Rz",
+        "Rz inverse": "Rz"
+    }
+
+    joint_dir = ["J1-", "J1+", "J2+", "J2-", "J3-", "J3+", "J4+", "J4-", "J5+", "J5-", "J6+", "J6-"]
+    tool_dir = ["X+", "X-", "Y-", "Y+", "Z-", "Z+", "Rx+", "Rx-", "Ry+", "Ry-", "Rz+", "Rz-"]
+    user_dir = ["Y+", "Y-", "X-", "X+", "Z+", "Z-", "Rx+", "Rx-", "Ry+", "Ry-", "Rz+", "Rz-"]
+
+    def __init__(self, robot, feedback=None, rate=100):
+        self.robot = robot
+        self.feedback = feedback
+        self.period = 1 / rate
+        self.spacemouse = SpaceMouseSlot(buttons=2)
+        self.engine = TeleopEngine(robot, feedback)
+        self.engine.source = self.spacemouse.latest
+        self.monitor = None  # Optional LatencyMonitor
+
+        # Settings, written by the client (GUI or command line) and read by the control loop
+        self.mode = "Simulation"
+        self.custom_axes = ["Y", "X inverse", "Z", "Joint 4", "Joint 5", "Joint 1 inverse"]
+        self.threshold = 0.25
+        self.lock_translation = False
+        self.lock_rotation = False
+        self.proportional = False
+        self.speed = 100
+        self.button_actions = ["Toggle Tool", "Pickup"]
+        self.user_command = ""
+
+        self.axis_states = dict.fromkeys(self.axis_names, "inactive")  # Track axis activity states
+        self.last_state = self.spacemouse.latest()  # Snapshot handled by the last control step
+        self.tool_state = 0
+        self.error = None  # Last error of the control loop or the teleop engine, cleared by the client once shown
+        self.running = False
+        self.threads = []
 
-from DobotTCP import Dobot, Feedback
+    def locked(self, i):
+        """Check if SpaceMouse axis i is locked."""
+        return self.lock_rotation if i >= 3 else self.lock_translation
+
+    def jog_command(self, i, direction, ctrl_held=False):
+        """Get the MoveJog axis and coordinate type for SpaceMouse axis i moving in direction (positive or negative)."""
+        idx = 2 * i + (0 if direction == "positive" else 1)
+        match self.mode:
+            case "Joints":
+                return self.joint_dir[idx], 0
+            case "Tool":
+                return self.tool_dir[idx], 2
+            case "User":
+                return self.user_dir[idx], 1
+            case "Custom":
+                direc = "+" if direction == "positive" else "-"
+                if i == 5 and ctrl_held:
+                    return "J6" + direc, 0
+                axName = self.custom_axes[i]
+                axis = self.axis_dict[axName].rstrip("+")
+                if "inverse" in axName: direc = "-" if direction == "positive" else "+"
+                return axis + direc, 0 if axis.startswith("J") else 1
+        return None, None  # Simulation does not move the robot
+
+    def teleop_mapping(self):
+        """Get the axis mapping [(robot axis, sign), ...] and frame of the current mode for the teleop engine."""
+        match self.mode:
+            case "Joints":
+                (directions, frame) = (self.joint_dir, "Joint")
+            case "Tool":
+                (directions, frame) = (self.tool_dir, "Tool")
+            case "User":
+                (directions, frame) = (self.user_dir, "User")
+            case "Custom":
+                mapping = []
+                for axName in self.custom_axes:
+                    mapping.append((self.axis_dict[axName].rstrip("+"), -1 if "inverse" in axName else 1))
+                return mapping, "User"
+            case _:
+                return None, None
+        return [(directions[2 * i][:-1], 1 if directions[2 * i].endswith("+") else -1) for i in range(6)], frame
+
+    def update_engine(self):
+        """Pass the settings to the teleop engine."""
+        (mapping, frame) = self.teleop_mapping()
+        if mapping is None:  # Simulation mode does not move the robot
+            self.engine.mask = [False] * 6
+            return
+        self.engine.set_mapping(mapping, frame)
+        self.engine.mask = [not self.lock_translation] * 3 + [not self.lock_rotation] * 3
+        self.engine.speed_scale = self.speed / 100
+
+    def stop_jog(self):
+        """Stop all active jog motions."""
+        if "active" in self.axis_states.values():
+            self.robot.MoveJog()
+        for axis_name in self.axis_states:
+            if self.axis_states[axis_name] == "active":
+                self.axis_states[axis_name] = "zero"
+
+    def set_monitor(self, monitor):
+        """Time the motion commands with a LatencyMonitor."""
+        self.monitor = monitor
+        self.engine.monitor = monitor
+
+    def jog(self, state):
+        """Start or stop MoveJog when an axis crosses the threshold."""
+        for i, (value, axis_name) in enumerate(zip(state.axes, self.axis_names)):
+            if self.locked(i):
+                value = 0  # Locked axes stop like released ones
+            if abs(value) > self.threshold:  # Above threshold
+                if self.axis_states[axis_name] != "active":
+                    direction = "positive" if value > 0 else "negative"
+                    ctrl_held = i == 5 and keyboard.is_pressed("ctrl")
+                    (cmd, coord) = self.jog_command(i, direction, ctrl_held)
+                    if cmd is not None:
+                        self.axis_states[axis_name] = "active"  # Mark as active
+                        if self.monitor is not None:
+                            self.monitor.command(state.timestamp, self.robot.MoveJog, cmd, coord)
+                        else:
+                            self.robot.MoveJog(cmd, coord)
+            elif self.axis_states[axis_name] == "active":  # Only stop if previously active
+                self.axis_states[axis_name] = "zero"  # Mark as zero
+                self.robot.MoveJog()
+
+    def button_action(self, selected_value):
+        """Run the action assigned to a SpaceMouse button."""
+        match selected_value:
+            case "Toggle Tool":
+                self.tool_state = 1 - self.tool_state
+                self.robot.SetSucker(self.tool_state)
+            case "Home":
+                self.robot.Home()
+            case "Pack":
+                self.robot.Pack()
+            case "Pickup":
+                self.robot.MoveJJ(48,34,83,-26,-90,0)
+            case "Toggle Mode":
+                # Cycle through the moving modes
+                self.mode = self.modes[self.modes.index(self.mode) % (len(self.modes) - 1) + 1]
+            case "User Command":
+                self.robot.SendCommand(self.user_command)
+
+    def step(self):
+        """Run one control cycle on the latest SpaceMouse snapshot."""
+        state = self.spacemouse.latest()
+        for i in range(len(state.presses)):
+            # Act on every press since the last cycle, even if the button was already released again
+            for _ in range(state.presses[i] - self.last_state.presses[i]):
+                print(f"Button {i} pressed. Selected action: {self.button_actions[i]}")
+                self.button_action(self.button_actions[i])
+        self.last_state = state
+
+        if self.proportional and self.engine.error is not None:
+            # The engine stopped itself, e.g. on a lost connection. Do not restart it until the client enables it again.
+            self.error = self.engine.error
+            self.engine.error = None
+            self.proportional = False
+            print(f"Proportional control stopped: {self.error}")
+        if self.proportional:
+            self.stop_jog()
+            self.update_engine()
+            if not self.engine.running:
+                self.engine.start()
+        else:
+            if self.engine.running:
+                self.engine.stop()
+            self.jog(state)
+
+    def set_speed(self, speed):
+        """Set the global speed rate in percent."""
+        self.speed = speed
+        self.robot.SpeedFactor(speed)
+
+    def read_spacemouse(self):
+        """Read data from the SpaceMouse."""
+        success = pyspacemouse.open()
+        if success:
+            while self.running:
+                state = pyspacemouse.read()
+                buttons = sum(1 << i for (i, pressed) in enumerate(state.buttons[:2]) if pressed)
+                self.spacemouse.publish((state.x, state.y, state.z, state.pitch, state.roll, state.yaw), buttons)
+                time.sleep(0.005)  # 5 ms delay
+        else:
+            print("Failed to connect to SpaceMouse")
+
+    def run(self):
+        """Fixed-rate control loop."""
+        deadline = time.perf_counter()
+        while self.running:
+            try:
+                self.step()
+            except Exception as e:
+                if str(e) != str(self.error):
+                    print(f"Teleop error: {e}")  # Report a persistent fault once
+                self.error = e
+            deadline += self.period
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                deadline = time.perf_counter()  # Overrun, do not catch up with a burst
+
+    def start(self):
+        """Start reading the SpaceMouse and the control loop."""
+        if self.running:
+            return
+        self.running = True
+        self.threads = [threading.Thread(target=self.read_spacemouse, daemon=True), threading.Thread(target=self.run, daemon=True)]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        """Stop the threads and any motion."""
+        self.running = False
+        for thread in self.threads:
+            thread.join(1)
+        self.threads = []
+        self.engine.stop()
+        self.stop_jog()
 
 class SpaceMouseGUI:
-    def __init__(self, root):
+    def __init__(self, root, service):
         self.root = root
+        self.service = service  # Teleop service moving the robot, the GUI only edits its settings and shows its state
         self.root.title("SpaceRobot GUI")
 
         window_width = 500
@@ -20,61 +605,18 @@ class SpaceMouseGUI:
         y = (screen_height // 2) - (window_height // 2)
 
         self.root.geometry(f"{window_width}x{window_height}+{x}+{y}")
-        self.toolState = 0
         self.initialized = False
+        self.feedback_display = None  # Created once the feedback is connected
+        self.robot_modes = queue.Queue()  # Robot mode changes from the feedback thread, shown by the Tk main loop
         self.isEnabled = False
         self.robotState = -1
-        self.robotMode = 0
         self.mode = tk.StringVar(value="Simulation")
         self.goto_JL = tk.StringVar(value="Joint")
-        self.axis_states = {  # Track axis activity states
-            "X": "inactive",
-            "Y": "inactive",
-            "Z": "inactive",
-            "Pitch": "inactive",
-            "Roll": "inactive",
-            "Yaw": "inactive",
-        }
-
-        self.axisDict = {
-            "Joint 1": "J1+",
-            "Joint 1 inverse": "J1",
-            "Joint 2": "J2",
-            "Joint 2 inverse": "J2",
-            "Joint 3": "J3",
-            "Joint 3 inverse": "J3",
-            "Joint 4": "J4",
-            "Joint 4 inverse": "J4",
-            "Joint 5": "J5",
-            "Joint 5 inverse": "J5",
-            "Joint 6": "J6",
-            "Joint 6 inverse": "J6",
-            "X": "X",
-            "X inverse": "X",
-            "Y": "Y",
-            "Y inverse": "Y",
-            "Z": "Z",
-            "Z inverse": "Z",
-            "Rx": "Rx",
-            "Rx inverse": "Rx",
-            "Ry": "Ry",
-            "Ry inverse": "Ry",
-            "Rz": "Rz",
-            "Rz inverse": "Rz"
-        }
-
-        self.jointDir = ["J1-", "J1+", "J2+", "J2-", "J3-", "J3+", "J4+", "J4-", "J5+", "J5-", "J6+", "J6-"]
-        self.toolDir = ["X+", "X-", "Y-", "Y+", "Z-", "Z+", "Rx+", "Rx-", "Ry+", "Ry-", "Rz+", "Rz-"]
-        self.userDir = ["Y+", "Y-", "X-", "X+", "Z+", "Z-", "Rx+", "Rx-", "Ry+", "Ry-", "Rz+", "Rz-"]
-
         self.jointRange = [360, 135, 154, 160, 173, 360]
         self.carthesianRange = [450, 450, 450, 450, 450, 450]
         self.jointPositions = [0, 0, 0, 0, 0, 0]
 
-        # Variables to store SpaceMouse data
-        self.axis_data = [0, 0, 0]
-        self.rotation_data = [0, 0, 0]  # Pitch, Roll, Yaw
-        self.button_data = "Button 0: Released, Button 1: Released"
+        self.service_mode = service.mode  # Mode last passed to the service, to notice changes made by the service
 
         # Add top button row
         top_button_frame = tk.Frame(self.root)
@@ -155,6 +697,11 @@ class SpaceMouseGUI:
         rotation_checkbox = tk.Checkbutton(controls_frame, text="Lock Rotation", variable=self.lock_rotation)
         rotation_checkbox.pack(side=tk.LEFT, padx=5)
 
+        # Proportional control streams ServoP/ServoJ setpoints instead of threshold jogging
+        self.proportional = tk.BooleanVar(value=False)  # Default: threshold jogging
+        proportional_checkbox = tk.Checkbutton(controls_frame, text="Proportional", variable=self.proportional, command=self.on_proportional_changed)
+        proportional_checkbox.pack(side=tk.LEFT, padx=5)
+
         # Add horizontal separator
         separator = ttk.Separator(self.root, orient="horizontal")
         separator.pack(fill="x", pady=5)
@@ -279,9 +826,6 @@ class SpaceMouseGUI:
             canvas.pack(side=tk.LEFT, padx=5)
             self.button_indicators.append((canvas, circle))
 
-        # Track button press states
-        self.button_states = {"Button 0": False, "Button 1": False}
-
         # Bind the callback to update the textbox state
         self.comboboxes[6].bind("<<ComboboxSelected>>", lambda event: self.update_textbox_state())
         self.comboboxes[7].bind("<<ComboboxSelected>>", lambda event: self.update_textbox_state())
@@ -337,21 +881,16 @@ class SpaceMouseGUI:
         self.status_label = tk.Label(self.root, text="")
         self.status_label.pack(anchor="w")
 
-        # Running flag for thread
+        # Running flag for the update loop
         self.running = True
 
-        # Start SpaceMouse thread
-        self.spacemouse_thread = threading.Thread(target=self.read_spacemouse)
-        self.spacemouse_thread.daemon = True
-        self.spacemouse_thread.start()
-
         # Start GUI update loop
         self.update_gui()
 
     def on_speed_changed(self, event):
         """Handle speed slider change."""
         speed = int(self.global_speed.get())
-        robot.SpeedFactor(speed)
+        self.service.set_speed(speed)
 
     def copy_label_to_textbox(self, idx):
         """Copy the text of the clicked joint label to the corresponding textbox."""
@@ -487,21 +1026,8 @@ class SpaceMouseGUI:
         for i, label in enumerate(self.joint_name_labels):
             label.config(text=labels[i])  # Update the label text
 
-    def read_spacemouse(self):
-        """Read data from the SpaceMouse."""
-        success = pyspacemouse.open()
-        if success:
-            while self.running:
-                state = pyspacemouse.read()
-                self.axis_data = [state.x, state.y, state.z]
-                self.rotation_data = [state.pitch, state.roll, state.yaw]
-                self.button_data = (
-                    f"Button 0: {'Pressed' if state.buttons[0] else 'Released'}, "
-                    f"Button 1: {'Pressed' if state.buttons[1] else 'Released'}"
-                )
-                time.sleep(0.005)  # 10 ms delay
-        else:
-            print("Failed to connect to SpaceMouse")
+        if self.feedback_display is not None:
+            self.feedback_display.redraw()  # Show the values of the new mode without waiting for a change
 
     def update_indicator(self, canvas, circle, value):
         """Update the color of an indicator based on the value."""
@@ -509,283 +1035,54 @@ class SpaceMouseGUI:
         color = "green" if value > threshold else "red" if value < -threshold else "white"
         canvas.itemconfig(circle, fill=color)
     
-    def on_translation_x_active(self, direction):
-        axName = self.comboboxes[0].get()
-        axis = self.axisDict[axName]
-        direc = "+" if direction == "positive" else "-"
-        cmd = ""
-        coord = 0
-        idx = 0 if direction == "positive" else 1
-        if direction == "zero":
-            robot.MoveJog()
-            return
-        match self.mode.get():
-            case "Joints":
-                cmd = self.jointDir[idx]
-                coord = 0
-            case "Tool":
-                cmd = self.toolDir[idx]
-                coord = 2
-            case "User":
-                cmd = self.userDir[idx]
-                coord = 1
-            case "Custom":
-                if "inverse" in axName: direc = "-" if direction == "positive" else "+"
-                cmd = axis + direc
-                coord = 0 if axis.startswith("J") else 1
-        robot.MoveJog(cmd, coord)
-    
-    def on_translation_y_active(self, direction):
-        axName = self.comboboxes[1].get()
-        axis = self.axisDict[axName]
-        direc = "+" if direction == "positive" else "-"
-        cmd = ""
-        coord = 0
-        idx = 2 if direction == "positive" else 3
-        if direction == "zero":
-            robot.MoveJog()
-            return
-        match self.mode.get():
-            case "Joints":
-                cmd = self.jointDir[idx]
-                coord = 0
-            case "Tool":
-                cmd = self.toolDir[idx]
-                coord = 2
-            case "User":
-                cmd = self.userDir[idx]
-                coord = 1
-            case "Custom":
-                if "inverse" in axName: direc = "-" if direction == "positive" else "+"
-                cmd = axis + direc
-                coord = 0 if axis.startswith("J") else 1
-        robot.MoveJog(cmd, coord)
-    
-    def on_translation_z_active(self, direction):
-        axName = self.comboboxes[2].get()
-        axis = self.axisDict[axName]
-        direc = "+" if direction == "positive" else "-"
-        cmd = ""
-        coord = 0
-        idx = 4 if direction == "positive" else 5
-        if direction == "zero":
-            robot.MoveJog()
-            return
-        match self.mode.get():
-            case "Joints":
-                cmd = self.jointDir[idx]
-                coord = 0
-            case "Tool":
-                cmd = self.toolDir[idx]
-                coord = 2
-            case "User":
-                cmd = self.userDir[idx]
-                coord = 1
-            case "Custom":
-                if "inverse" in axName: direc = "-" if direction == "positive" else "+"
-                cmd = axis + direc
-                coord = 0 if axis.startswith("J") else 1
-        robot.MoveJog(cmd, coord)
-    
-    def on_rotation_pitch_active(self, direction):
-        axName = self.comboboxes[3].get()
-        axis = self.axisDict[axName]
-        direc = "+" if direction == "positive" else "-"
-        cmd = ""
-        coord = 0
-        idx = 6 if direction == "positive" else 7
-        if direction == "zero":
-            robot.MoveJog()
-            return
-        match self.mode.get():
-            case "Joints":
-                cmd = self.jointDir[idx]
-                coord = 0
-            case "Tool":
-                cmd = self.toolDir[idx]
-                coord = 2
-            case "User":
-                cmd = self.userDir[idx]
-                coord = 1
-            case "Custom":
-                if "inverse" in axName: direc = "-" if direction == "positive" else "+"
-                cmd = axis + direc
-                coord = 0 if axis.startswith("J") else 1
-        robot.MoveJog(cmd, coord)
-
-    def on_rotation_roll_active(self, direction):
-        axName = self.comboboxes[4].get()
-        axis = self.axisDict[axName]
-        direc = "+" if direction == "positive" else "-"
-        cmd = ""
-        coord = 0
-        idx = 8 if direction == "positive" else 9
-        if direction == "zero":
-            robot.MoveJog()
-            return
-        match self.mode.get():
-            case "Joints":
-                cmd = self.jointDir[idx]
-                coord = 0
-            case "Tool":
-                cmd = self.toolDir[idx]
-                coord = 2
-            case "User":
-                cmd = self.userDir[idx]
-                coord = 1
-            case "Custom":
-                if "inverse" in axName: direc = "-" if direction == "positive" else "+"
-                cmd = axis + direc
-                coord = 0 if axis.startswith("J") else 1
-        robot.MoveJog(cmd, coord)
-
-    def on_rotation_yaw_active(self, direction, ctrl_held):
-        axName = self.comboboxes[5].get()
-        axis = self.axisDict[axName]
-        direc = "+" if direction == "positive" else "-"
-        cmd = ""
-        coord = 0
-        idx = 10 if direction == "positive" else 11
-        if direction == "zero":
-            robot.MoveJog()
-            return
-        match self.mode.get():
-            case "Joints":
-                cmd = self.jointDir[idx]
-                coord = 0
-            case "Tool":
-                cmd = self.toolDir[idx]
-                coord = 2
-            case "User":
-                cmd = self.userDir[idx]
-                coord = 1
-            case "Custom":
-                if "inverse" in axName: direc = "-" if direction == "positive" else "+"
-                cmd = axis + direc
-                coord = 0 if axis.startswith("J") else 1
-                if ctrl_held:
-                    direc = "+" if direction == "positive" else "-"
-                    cmd = "J6" + direc
-                    coord = 0
-        robot.MoveJog(cmd, coord)
-
-    def on_button_0_pressed(self):
-        selected_value = self.comboboxes[6].get()
-        print(f"Button 0 pressed. Selected action: {selected_value}")
-        self.button_action(selected_value)
-
-    def on_button_1_pressed(self):
-        selected_value = self.comboboxes[7].get()
-        print(f"Button 0 pressed. Selected action: {selected_value}")
-        self.button_action(selected_value)
-
-    def button_action(self, selected_value):
-        match selected_value:
-            case "Toggle Tool":
-                if self.toolState == 0:
-                    robot.SetSucker(1)
-                    self.toolState = 1
-                else:
-                    robot.SetSucker(0)
-                    self.toolState = 0
-            case "Home":
-                robot.Home()
-            case "Pack":
-                robot.Pack()
-            case "Pickup":
-                robot.MoveJJ(48,34,83,-26,-90,0)
-            case "Toggle Mode":
-                self.robotMode += 1
-                if self.robotMode == 5: self.robotMode = 1
-                match self.robotMode:
-                    case 0:
-                        self.mode.set("Simulation")
-                    case 1:
-                        self.mode.set("Joints")
-                    case 2:
-                        self.mode.set("User")
-                    case 3:
-                        self.mode.set("Tool")
-                    case 4:
-                        self.mode.set("Custom")
-            case "User Command":
-                command = self.user_command.get()
-                robot.SendCommand(command)
+    def apply_settings(self):
+        """Pass the GUI settings to the teleop service and take over a mode changed by the service."""
+        if self.service.mode != self.service_mode:
+            self.service_mode = self.service.mode
+            self.mode.set(self.service.mode)  # Changed by a SpaceMouse button
+        self.service.custom_axes = [combobox.get() for combobox in self.comboboxes[:6]]
+        self.service.button_actions = [combobox.get() for combobox in self.comboboxes[6:8]]
+        self.service.user_command = self.user_command.get()
+        self.service.threshold = self.threshold.get()
+        self.service.lock_translation = self.lock_translation.get()
+        self.service.lock_rotation = self.lock_rotation.get()
+        if self.service.error is not None:
+            self.set_status(f"Teleop error: {self.service.error}", isError=True)
+            self.service.error = None
+        if self.proportional.get() != self.service.proportional:
+            self.proportional.set(self.service.proportional)  # Switched off by the service after an error
+        self.service_mode = self.mode.get()
+        self.service.mode = self.service_mode
+
+    def on_proportional_changed(self):
+        """Switch the service between threshold jogging and proportional control."""
+        self.service.proportional = self.proportional.get()
 
     def update_gui(self):
         """Update the GUI with the latest SpaceMouse data."""
-        values = self.axis_data + self.rotation_data
-        axis_names = ["X", "Y", "Z", "Pitch", "Roll", "Yaw"]
+        self.apply_settings()
+        self.show_robot_modes()
+        state = self.service.spacemouse.latest()
 
-        for i, (value, axis_name) in enumerate(zip(values, axis_names)):
-            if (axis_name in ["X", "Y", "Z"] and self.lock_translation.get()) or (axis_name in ["Roll", "Pitch", "Yaw"] and self.lock_rotation.get()):
+        for i, value in enumerate(state.axes):
+            if self.service.locked(i):
                 continue  # Skip locked movements
             self.update_indicator(self.indicators[i][0], self.indicators[i][1], value)  # Update indicators
 
-            # Get current threshold
-            threshold = self.threshold.get()
-
-            # Handle state transitions
-            if abs(value) > threshold:  # Above threshold
-                if self.axis_states[axis_name] != "active":
-                    self.axis_states[axis_name] = "active"  # Mark as active
-                    direction = "positive" if value > 0 else "negative"
-
-                    if axis_name == "X":
-                        self.on_translation_x_active(direction)
-                    elif axis_name == "Y":
-                        self.on_translation_y_active(direction)
-                    elif axis_name == "Z":
-                        self.on_translation_z_active(direction)
-                    elif axis_name == "Pitch":
-                        self.on_rotation_pitch_active(direction)
-                    elif axis_name == "Roll":
-                        self.on_rotation_roll_active(direction)
-                    elif axis_name == "Yaw":
-                        ctrl_held = keyboard.is_pressed("ctrl")
-                        self.on_rotation_yaw_active(direction, ctrl_held)
-
-            elif abs(value) <= threshold:  # Zero or below threshold
-                if self.axis_states[axis_name] == "active":  # Only trigger zero if previously active
-                    self.axis_states[axis_name] = "zero"  # Mark as zero
-                    if axis_name == "X":
-                        self.on_translation_x_active("zero")
-                    elif axis_name == "Y":
-                        self.on_translation_y_active("zero")
-                    elif axis_name == "Z":
-                        self.on_translation_z_active("zero")
-                    elif axis_name == "Pitch":
-                        self.on_rotation_pitch_active("zero")
-                    elif axis_name == "Roll":
-                        self.on_rotation_roll_active("zero")
-                    elif axis_name == "Yaw":
-                        self.on_rotation_yaw_active("zero", False)
-
-        button_states = self.button_data.split(", ")
         for i, (canvas, circle) in enumerate(self.button_indicators):
-            is_pressed = "Pressed" in button_states[i] if i < len(button_states) else False
+            is_pressed = bool(state.buttons & (1 << i))
             color = "green" if is_pressed else "white"
             canvas.itemconfig(circle, fill=color)
 
-            # Debouncing logic
-            button_name = f"Button {i}"
-            if is_pressed and not self.button_states[button_name]:
-                self.button_states[button_name] = True  # Update state
-                if i == 0:
-                    self.on_button_0_pressed()
-                elif i == 1:
-                    self.on_button_1_pressed()
-            elif not is_pressed:
-                self.button_states[button_name] = False  # Reset state when released
-
         if not self.initialized:
             self.initialized = True
 
         # Schedule the next update
-        self.root.after(50, self.update_gui)
+        if self.running:
+            self.root.after(50, self.update_gui)
 
     def stop(self):
-        """Stop the SpaceMouse thread."""
+        """Stop the GUI update loop."""
         self.running = False
 
     def on_enable(self):
@@ -829,45 +1126,93 @@ class SpaceMouseGUI:
         self.set_status("EMERGENCY STOP")
         robot.EmergencyStop(1)
 
-    def fetch_robot_feedback(self):
-        """Function to fetch feedback from the robot."""
-        global robotMode
-        global jointPositions
-        while (1):
-            try:
-                feedback.Get()
-                robotMode = feedback.data.get('RobotMode')
-                if robotMode == 9: # Uncleared Errors
-                    self.set_status("Uncleared Errors", isError=True)
-                elif robotMode == 11: # Collision Detected
-                    self.set_status("Collision Detected", isError=True)
-                else:
-                    print(f"Robot Mode: {robotMode}")
-                    self.set_status("Status: " + robot.ParseRobotMode(robotMode).split(":")[1].strip())
-
-                if self.mode.get() == "Joints" or self.mode.get() == "Simulation":
-                    jointPositions = feedback.data.get('QActual')
-                else:
-                    jointPositions = feedback.data.get('ToolVectorActual')
-                for i in range(6):
-                    self.joint_labels[i].config(text=f"{jointPositions[i]:.2f}")
-                time.sleep(0.5)
-            except Exception as e:
-                self.set_status(f"Error: {e}" , isError=True)
-                time.sleep(0.5)
+    def on_robot_mode_changed(self, event):
+        """Pass a new robot mode from the feedback thread to the Tk main loop."""
+        self.robot_modes.put(event.new)
+
+    def show_robot_modes(self):
+        """Show the robot mode changes received since the last update. Runs in the Tk main loop."""
+        while not self.robot_modes.empty():
+            self.show_robot_mode(self.robot_modes.get_nowait())
+
+    def show_robot_mode(self, robotMode):
+        """Update the status for a robot mode."""
+        if robotMode == 9: # Uncleared Errors
+            self.set_status("Uncleared Errors", isError=True)
+        elif robotMode == 11: # Collision Detected
+            self.set_status("Collision Detected", isError=True)
+        else:
+            print(f"Robot Mode: {robotMode}")
+            message = robot.ParseRobotMode(robotMode)
+            (_, _, description) = message.partition(":")  # Unknown modes have no "NAME:" prefix
+            self.set_status("Status: " + (description.strip() or message))
+
+    def feedback_values(self, frame):
+        """Select the feedback values shown for the current mode."""
+        if self.mode.get() == "Joints" or self.mode.get() == "Simulation":
+            return frame['QActual']
+        return frame['ToolVectorActual']
+
+    def on_feedback_error(self, error):
+        """Show an error of the feedback thread."""
+        self.set_status(f"Error: {error}", isError=True)
+
+def run_headless(service, feedback):
+    """Run the teleop service without GUI until Ctrl+C."""
+    print(f"Teleop running headless in {service.mode} mode. Press Ctrl+C to stop.")
+    service.start()
+    try:
+        while service.running:
+            time.sleep(0.5)
+            if service.error is not None:
+                print(f"Teleop error: {service.error}. Stopping.")
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        feedback.Stop()
 
 if __name__ == "__main__":
     global robotMode
-    root = tk.Tk()
-    app = SpaceMouseGUI(root)
+    parser = argparse.ArgumentParser(description="Control a Dobot robot with a SpaceMouse.")
+    parser.add_argument("--headless", action="store_true", help="run the teleop service without GUI")
+    parser.add_argument("--mode", choices=TeleopService.modes[1:], default="Joints", help="teleop mode when running headless")
+    parser.add_argument("--proportional", action="store_true", help="use proportional control when running headless")
+    parser.add_argument("--latency", action="store_true", help="measure the teleop latency and print it on exit")
+    args = parser.parse_args()
+
     robot = Dobot()
     feedback = Feedback(robot)
+    service = TeleopService(robot, feedback)
+    monitor = LatencyMonitor() if args.latency else None
+    if monitor is not None:
+        monitor.attach(feedback)
+        service.set_monitor(monitor)
+
+    if args.headless:
+        robot.Connect()
+        feedback.Connect()
+        robot.SetDebugLevel(0)
+        feedback.Start()
+        service.mode = args.mode
+        service.proportional = args.proportional
+        run_headless(service, feedback)
+        if monitor is not None:
+            monitor.report()
+        raise SystemExit
+
+    root = tk.Tk()
+    app = SpaceMouseGUI(root, service)
 
     # Ensure clean exit
     def on_closing():
-        app.running = False
         app.stop()
+        service.stop()
+        feedback.Stop()
         root.destroy()
+        if monitor is not None:
+            monitor.report()
 
     app.set_status("Connecting to robot...")
     robot.Connect()
@@ -890,8 +1235,13 @@ if __name__ == "__main__":
         print(f"Unknown robot mode ({robotMode}).")
         app.set_status("Unknown State", isError=True)
 
-    app.feedback_thread = threading.Thread(target=app.fetch_robot_feedback, daemon=True)
-    app.feedback_thread.start()
+    # React to robot mode changes (errors, collisions) within one feedback frame
+    feedback.OnChange('RobotMode', app.on_robot_mode_changed, initial=True)
+    feedback.Start()
+    service.start()
+
+    app.feedback_display = FeedbackDisplay(root, feedback, app.joint_labels, app.feedback_values, rate=30, on_error=app.on_feedback_error)
+    app.feedback_display.start()
 
     root.protocol("WM_DELETE_WINDOW", on_closing)
     root.mainloop()
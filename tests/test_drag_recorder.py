@@ -0,0 +1,30 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from DobotTCP import Dobot, DragRecorder
+
+
+def recorder():
+    recorder = DragRecorder()
+    recorder.times = np.linspace(0, 2, 201)
+    recorder.poses = np.column_stack([np.linspace(300, 400, 201), np.zeros(201), np.full(201, 200.0), np.full(201, 180.0), np.zeros(201), np.full(201, -1e-7)])
+    recorder.joints = np.zeros((201, 6))
+    return recorder
+
+
+def test_format_point():
+    assert Dobot.FormatPoint([200, 0.5, 1e-7, -1e-7, 180.1234, -90]) == "{200,0.5,0,0,180.123,-90}"
+
+
+def test_program_of_straight_line():
+    assert recorder().Program(0.5) == ["MovL(pose={300,0,200,180,0,0},cp=0)", "MovL(pose={400,0,200,180,0,0},cp=0)"]
+
+
+def test_compress_rejects_zero_tolerance():
+    with pytest.raises(ValueError):
+        recorder().Compress(1.0, angleTolerance=0)
@@ -0,0 +1,39 @@
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from DobotTCP import FeedbackDecoder
+
+
+def frame(stamp, mode=5, size=1440):
+    """Build a raw feedback frame with the header fields checked by the decoder."""
+    data = bytearray(size)
+    struct.pack_into('<H', data, 0, size)
+    struct.pack_into('<Q', data, FeedbackDecoder.robotModeOffset, mode)
+    struct.pack_into('<Q', data, FeedbackDecoder.timeStampOffset, stamp)
+    return bytes(data)
+
+
+def test_frames_in_order():
+    decoder = FeedbackDecoder()
+    for stamp in (1000, 1008, 1016):
+        decoder.Feed(frame(stamp))
+        assert decoder.Next() == frame(stamp)
+    assert decoder.dropped == 0
+
+
+def test_recovers_after_timestamp_jump():
+    decoder = FeedbackDecoder()
+    decoder.Feed(frame(1000))
+    assert decoder.Next() is not None
+    received = []
+    for stamp in range(71000, 71000 + 8 * 20, 8):
+        decoder.Feed(frame(stamp))
+        data = decoder.Next()
+        if data is not None:
+            received.append(struct.unpack_from('<Q', data, FeedbackDecoder.timeStampOffset)[0])
+    # Only the frames up to re-anchoring are lost
+    assert received == list(range(71000 + 8 * FeedbackDecoder.maxFailures, 71000 + 8 * 20, 8))
+    assert decoder.failures == 0
@@ -0,0 +1,89 @@
+import os
+import struct
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from DobotTCP import Feedback, FeedbackFrame
+
+# Field layout of the TCP protocol as decoded field by field before FeedbackFrame. Reserved bytes have no name.
+reference_layout = [
+    ('MessageSize', 'H'), (None, 6), ('DigitalInputs', 'Q'), ('DigitalOutputs', 'Q'), ('RobotMode', 'Q'),
+    ('TimeStamp', 'Q'), ('RunTime', 'Q'), ('TestValue', 'Q'), (None, 8), ('SpeedScaling', 'd'), (None, 16),
+    ('VRobot', 'd'), ('IRobot', 'd'), ('ProgramState', 'd'), ('SafetyIOIn', '2B'), ('SafetyIOOut', '2B'), (None, 76),
+    ('QTarget', '6d'), ('QDTarget', '6d'), ('QDDTarget', '6d'), ('ITarget', '6d'), ('MTarget', '6d'),
+    ('QActual', '6d'), ('QDActual', '6d'), ('IActual', '6d'), ('ActualTCPForce', '6d'), ('ToolVectorActual', '6d'),
+    ('TCPSpeedActual', '6d'), ('TCPForce', '6d'), ('ToolVectorTarget', '6d'), ('TCPSpeedTarget', '6d'),
+    ('MotorTemperatures', '6d'), ('JointModes', '6d'), ('VActual', '6d'), (None, 4),
+    ('UserCoordinateSystem', 'B'), ('ToolCoordinateSystem', 'B'), ('RunQueuedCmd', 'B'), ('PauseCmdFlag', 'B'),
+    ('VelocityRatio', 'B'), ('AccelerationRatio', 'B'), (None, 1), ('XYZVelocityRatio', 'B'), ('RVelocityRatio', 'B'),
+    ('XYZAccelerationRatio', 'B'), ('RAccelerationRatio', 'B'), ('BrakeStatus', 'B'), ('EnableStatus', 'B'),
+    ('DragStatus', 'B'), ('RunningStatus', 'B'), ('ErrorStatus', 'B'), ('JogStatus', 'B'), ('RobotType', 'B'),
+    ('DragButtonSignal', 'B'), ('EnableButtonSignal', 'B'), ('RecordButtonSignal', 'B'), ('ReappearButtonSignal', 'B'),
+    ('JawButtonSignal', 'B'), ('SixForceOnline', 'B'), ('CollisionState', 'B'), ('ArmApproachState', 'B'),
+    ('J4ApproachState', 'B'), ('J5ApproachState', 'B'), ('J6ApproachState', 'B'), (None, 61),
+    ('ZAxisJitter', 'd'), ('CurrentCommandID', 'Q'), ('ActualTorque', '6d'), ('Payload', 'd'), ('CenterX', 'd'),
+    ('CenterY', 'd'), ('CenterZ', 'd'), ('UserCoordinates', '6d'), ('ToolCoordinates', '6d'), (None, 8),
+    ('SixAxisForce', '6d'), ('TargetQuaternion', '4d'), ('ActualQuaternion', '4d'), ('AutoManualMode', '2B'),
+    ('ExportStatus', 'H'), ('SafetyStatus', 'B'),
+]
+
+
+def reference_decode(data):
+    """Decode a frame field by field in little endian, like the original ParseFeedback."""
+    decoded = {}
+    offset = 0
+    for (key, fmt) in reference_layout:
+        if key is None:
+            offset += fmt
+            continue
+        value = struct.unpack_from('<' + fmt, data, offset)
+        decoded[key] = value[0] if len(value) == 1 else list(value)
+        offset += struct.calcsize('<' + fmt)
+    return decoded
+
+
+def random_frames(count, seed=0):
+    """Random frames with finite doubles, so values can be compared with ==."""
+    generator = np.random.default_rng(seed)
+    frames = []
+    for _ in range(count):
+        data = bytearray(generator.integers(0, 256, Feedback.frameSize, dtype=np.uint8).tobytes())
+        offset = 0
+        for (key, fmt) in reference_layout:
+            if key is not None and fmt.endswith('d'):
+                count_d = struct.calcsize('<' + fmt) // 8
+                struct.pack_into(f'<{count_d}d', data, offset, *generator.normal(0, 1000, count_d))
+            offset += fmt if key is None else struct.calcsize('<' + fmt)
+        frames.append(bytes(data))
+    return frames
+
+
+def test_reference_layout_size():
+    assert sum(fmt if key is None else struct.calcsize('<' + fmt) for (key, fmt) in reference_layout) <= Feedback.frameSize
+
+
+def test_to_dict_matches_reference():
+    for data in random_frames(5):
+        expected = reference_decode(data)
+        decoded = FeedbackFrame(data).ToDict()
+        assert list(decoded) == list(expected)
+        for key in expected:
+            assert decoded[key] == expected[key], key
+
+
+def test_parse_feedback_matches_reference():
+    data = random_frames(1, seed=1)[0]
+    assert dict(Feedback(None).ParseFeedback(data)) == reference_decode(data)
+
+
+def test_to_array_matches_reference():
+    frames = random_frames(4, seed=2)
+    array = FeedbackFrame.ToArray(b"".join(frames))
+    assert len(array) == len(frames)
+    for (row, data) in zip(array, frames):
+        expected = reference_decode(data)
+        for key in expected:
+            assert np.array_equal(np.asarray(row[key]).ravel(), np.asarray(expected[key]).ravel()), key
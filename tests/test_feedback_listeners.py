@@ -0,0 +1,22 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from DobotTCP import Feedback
+
+from test_feedback_decoder import frame
+
+
+def test_rate_limited_listener_after_timestamps_go_back():
+    feedback = Feedback(None)
+    stamps = []
+    feedback.AddListener(lambda rawdata: stamps.append(len(stamps)), rate=25)
+    for stamp in range(100000, 102000, 8):
+        feedback.Dispatch(frame(stamp))
+    before = len(stamps)
+    # Seek back in a replay
+    for stamp in range(1000, 3000, 8):
+        feedback.Dispatch(frame(stamp))
+    assert before == 50
+    assert len(stamps) - before == 50
@@ -0,0 +1,40 @@
+import os
+import sys
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from DobotTCP import FeedbackStatistics
+from test_feedback_subscriptions import frame
+
+
+def test_summary_is_consistent_during_updates():
+    statistics = FeedbackStatistics(fields=['VRobot'], window=10)
+    stop = threading.Event()
+
+    def update():
+        while not stop.is_set():
+            statistics.Update(frame(VRobot=1.0))
+
+    thread = threading.Thread(target=update)
+    thread.start()
+    try:
+        for _ in range(200):
+            summary = statistics.Summary()['VRobot']
+            if summary['count'] > 0:
+                assert summary['mean'] == 1.0
+                assert summary['min'] == summary['max'] == 1.0
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_percentile_over_window():
+    statistics = FeedbackStatistics(fields=['VRobot'], window=4)
+    assert np.isnan(statistics.Percentile('VRobot', 50))
+    for value in range(10):
+        statistics.Update(frame(VRobot=float(value)))
+    assert statistics.Percentile('VRobot', [0, 100]).tolist() == [6.0, 9.0]
+    assert statistics.Summary()['VRobot']['count'] == 10
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from DobotTCP import Feedback, FeedbackFrame
+
+
+def frame(stamp=1000, **fields):
+    """Build a raw 1440-byte feedback frame with the given field values."""
+    data = bytearray(Feedback.frameSize)
+    FeedbackFrame.fields['MessageSize'][1].pack_into(data, FeedbackFrame.fields['MessageSize'][0], Feedback.frameSize)
+    for (key, value) in dict(TimeStamp=stamp, **fields).items():
+        (offset, unpacker, single) = FeedbackFrame.fields[key]
+        unpacker.pack_into(data, offset, *([value] if single else value))
+    return bytes(data)
+
+
+def feed(feedback, key, values):
+    for (i, value) in enumerate(values):
+        feedback.Dispatch(frame(1000 + 8 * i, **{key: value}))
+
+
+def test_on_change_fires_once_per_change():
+    feedback = Feedback(None)
+    events = []
+    feedback.OnChange('RobotMode', events.append)
+    feed(feedback, 'RobotMode', [5, 5, 7, 7, 7, 5, 9])
+    assert [(event.old, event.new) for event in events] == [(5, 7), (7, 5), (5, 9)]
+
+
+def test_on_change_initial():
+    feedback = Feedback(None)
+    events = []
+    feedback.OnChange('RobotMode', events.append, initial=True)
+    feed(feedback, 'RobotMode', [5, 5, 7])
+    assert [(event.old, event.new) for event in events] == [(None, 5), (5, 7)]
+
+
+def test_on_rising_and_falling_fire_once_per_edge():
+    feedback = Feedback(None)
+    (rising, falling) = ([], [])
+    feedback.OnRising('CollisionState', rising.append)
+    feedback.OnFalling('CollisionState', falling.append)
+    feed(feedback, 'CollisionState', [1, 1, 0, 0, 1, 1, 1, 0])
+    assert len(rising) == 1 and len(falling) == 2
+
+
+def test_on_rising_initial():
+    feedback = Feedback(None)
+    (default, initial) = ([], [])
+    feedback.OnRising('CollisionState', default.append)
+    feedback.OnRising('CollisionState', initial.append, initial=True)
+    feed(feedback, 'CollisionState', [1, 1, 0])
+    assert len(default) == 0 and len(initial) == 1
+
+
+def test_on_condition_fires_when_it_becomes_true():
+    feedback = Feedback(None)
+    (default, initial) = ([], [])
+    feedback.OnCondition('RobotMode', lambda mode: mode in (9, 11), default.append)
+    feedback.OnCondition('RobotMode', lambda mode: mode in (9, 11), initial.append, initial=True)
+    feed(feedback, 'RobotMode', [9, 9, 11, 5, 11, 11])
+    assert [event.new for event in default] == [11]
+    assert [event.new for event in initial] == [9, 11]
+
+
+def test_failing_callback_does_not_stop_the_stream():
+    feedback = Feedback(None)
+    events = []
+    received = []
+    subscription = feedback.OnChange('RobotMode', lambda event: 1 / 0)
+    feedback.OnChange('RobotMode', events.append)
+    feedback.AddListener(received.append)
+    feed(feedback, 'RobotMode', [5, 7, 9])
+    assert subscription.errors == 2
+    assert len(events) == 2 and len(received) == 3
+
+
+def test_asyncio_queue():
+    async def main():
+        feedback = Feedback(None)
+        events = asyncio.Queue()
+        feedback.OnChange('RobotMode', events, initial=True)
+        # Frames arrive on the feedback thread
+        await asyncio.to_thread(feed, feedback, 'RobotMode', [5, 7])
+        first = await asyncio.wait_for(events.get(), 1)
+        second = await asyncio.wait_for(events.get(), 1)
+        return (first.new, second.new, events.empty())
+    assert asyncio.run(main()) == (5, 7, True)
@@ -0,0 +1,54 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from DobotTCP import Dobot, FlexGripper
+
+
+class OfflineDobot(Dobot):
+    """Dobot recording the sent commands instead of using a connection."""
+
+    def __init__(self):
+        super().__init__()
+        self.debugLevel = 0
+        self.sent = []
+
+    def SendCommand(self, command):
+        self.sent.append([command])
+        return (self.error_codes[0], "1", command)
+
+    def SendCommands(self, commands):
+        self.sent.append(list(commands))
+        return [(self.error_codes[0], "1", command) for command in commands]
+
+
+def test_batch_merges_outputs():
+    robot = OfflineDobot()
+    with robot.IOBatch() as batch:
+        assert robot.DO(1, 1) == (robot.error_codes[0], "", "DO(1,1)")
+        robot.DO(2, 0)
+    assert robot.sent == [["DOGroup(1,1,2,0)"]]
+    assert batch.response == (robot.error_codes[0], "1", "DOGroup(1,1,2,0)")
+
+
+def test_nested_batch_returns_placeholder():
+    robot = OfflineDobot()
+    gripper = FlexGripper(robot)
+    with robot.IOBatch():
+        response = gripper.SetOutputs(1, 0)
+        assert response == (robot.error_codes[0], "", "DO(2,0)")
+        robot.ToolDO(1, 1)
+    assert robot.sent == [["DOGroup(1,1,2,0)", "ToolDO(1,1)"]]
+
+
+def test_batch_is_per_thread():
+    robot = OfflineDobot()
+    with robot.IOBatch():
+        robot.DO(1, 1)
+        thread = threading.Thread(target=robot.DO, args=(3, 1))
+        thread.start()
+        thread.join()
+        assert robot.sent == [["DO(3,1)"]]
+    assert robot.sent == [["DO(3,1)"], ["DOGroup(1,1)"]]
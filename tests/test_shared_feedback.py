@@ -0,0 +1,31 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from DobotTCP import FeedbackPublisher, SharedFeedback
+
+from test_feedback_decoder import frame
+
+
+def test_take_times_out_on_unfinished_write():
+    name = f"DobotFeedback_test_{os.getpid()}"
+    publisher = FeedbackPublisher(name)
+    publisher.Open()
+    try:
+        publisher.Write(frame(1000))
+        reader = SharedFeedback(name, timeout=0.05)
+        reader.Connect()
+        assert reader.Take()[1] == frame(1000)
+        # Publisher died in the middle of a write
+        FeedbackPublisher.header.pack_into(publisher.memory.buf, 0, publisher.sequence + 1)
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            reader.Take()
+        assert time.monotonic() - started < 1
+        reader.Disconnect()
+    finally:
+        publisher.Close()
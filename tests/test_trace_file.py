@@ -0,0 +1,22 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from DobotTCP import TraceFile
+
+
+def test_resample_keeps_end_point():
+    times = np.linspace(0, 0.13, 14)
+    joints = np.outer(times, np.ones(6)) * 100
+    trace = TraceFile(times, joints).Resample(50)
+    assert np.allclose(trace.times, [0, 0.05, 0.1, 0.13])
+    assert np.allclose(trace.joints[-1], joints[-1])
+
+
+def test_resample_empty_trace():
+    with pytest.raises(ValueError):
+        TraceFile([], np.zeros((0, 6))).Resample(50)